@@ -1,19 +1,35 @@
 from __future__ import annotations
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, send_file
 from typing import Any, Dict, List, Tuple, Callable
 from pathlib import Path
-import os, csv, datetime
+import datetime, time, base64, itertools, zlib
 
 from auto_provision import provision_probe
-from core.storage import normalize_payload, append_row
+from core.storage import CsvStorage, ts_to_epoch, csv_schema
+from core.rollups import ROLLUPS, RESOLUTIONS, pick_resolution
+from core.events import EVENTS, SSE_HEADERS
+from core.live_buffer import LIVE
+from api.service import ApiService
 
+READINGS_LIMIT = 5000        # default page size for /api/readings
+READINGS_MAX_LIMIT = 50000
 
-def create_api(cfg: Any, csv_path: str, discovery: Any, public_base: Callable[[], str], server_token: str = "") -> Blueprint:
+
+def create_api(cfg: Any, csv_path: str, discovery: Any, public_base: Callable[[], str], server_token: str = "",
+               writer: Any = None, storage: Any = None, service: ApiService | None = None) -> Blueprint:
     bp = Blueprint("api", __name__, url_prefix="/api")
+    svc = service or ApiService(cfg, csv_path, discovery, writer=writer, storage=storage, server_token=server_token)
 
     TOKEN = (server_token or "").strip()
     CSV_PATH = Path(csv_path)
 
+    def _reply(r):
+        status, body, headers = r
+        resp = jsonify(body)
+        resp.status_code = status
+        resp.headers.update(headers)
+        return resp
+
     # --- authentication helper ---
     if not TOKEN:
         def _check_auth() -> bool:
@@ -22,82 +38,24 @@ def create_api(cfg: Any, csv_path: str, discovery: Any, public_base: Callable[[]
         def _check_auth() -> bool:
             tok = request.headers.get("X-Token") or request.args.get("token")
             if not tok and request.is_json:
-                data = request.get_json(silent=True) or {}
-                tok = data.get("token")
+                data = request.get_json(silent=True)
+                tok = data.get("token") if isinstance(data, dict) else None
             return tok == TOKEN
 
-    # --- discovery listing ---
-    def _iter_probes() -> List[Dict[str, Any]]:
-        if discovery is None:
-            return []
-        try:
-            vals = discovery.list_probes().values()
-        except Exception:
-            vals = []
-        out: List[Dict[str, Any]] = []
-        for obj in vals:
-            is_dict = isinstance(obj, dict)
-            get = (lambda k, d=None: (obj.get(k, d) if is_dict else getattr(obj, k, d)))
-            props = get("properties", {}) or {}
-            host = get("host")
-            ip = get("ip")
-            port = get("port", 80) or 80
-            name = get("name") or get("id") or props.get("name")
-            pid = props.get("id") or get("probe_id") or get("id") or name
-            out.append({
-                "host": host,
-                "ip": ip,
-                "port": port,
-                "name": name,
-                "probe_id": pid,
-                "last_seen": get("last_seen")
-            })
-        # stable sort by name/ip for UI consistency
-        return sorted(out, key=lambda p: (p.get("name") or "", p.get("ip") or ""))
-
     # --- endpoints ---
     @bp.get("/health")
     def health():
         return jsonify(
             ok=True,
-            probes=len(_iter_probes()),
+            probes=len(svc.probes()),
             base=public_base(),
             time=datetime.datetime.now().isoformat(timespec="seconds")
         )
 
     @bp.get("/config")
     def get_config():
-        """Return config as JSON.
-
-        Supports:
-          - dict config
-          - Config-like object with .data (and optional .lock)
-          - objects implementing .to_dict()
-        """
-        # Plain dict
-        if isinstance(cfg, dict):
-            return jsonify(cfg)
-
-        # Prefer to_dict() if present
-        if hasattr(cfg, "to_dict"):
-            try:
-                return jsonify(cfg.to_dict())
-            except Exception:
-                pass
-
-        # Prefer cfg.data if present (your Config class)
-        if hasattr(cfg, "data"):
-            try:
-                lock = getattr(cfg, "lock", None)
-                data_obj = getattr(cfg, "data") or {}
-                if lock:
-                    with lock:
-                        return jsonify(dict(data_obj))
-                return jsonify(dict(data_obj))
-            except Exception:
-                pass
-
-        return jsonify({})
+        """Return config as JSON (dict config, .to_dict(), or a Config-like .data)."""
+        return jsonify(svc.config())
 
     @bp.post("/config")
     def set_config():
@@ -153,7 +111,161 @@ def create_api(cfg: Any, csv_path: str, discovery: Any, public_base: Callable[[]
 
     @bp.get("/probes")
     def list_probes():
-        return jsonify(_iter_probes())
+        return jsonify(svc.probes())
+
+    @bp.get("/metrics")
+    def metrics():
+        """Ingest counters: write-behind queue, per-probe seq dedup / packet loss, rate limiting."""
+        return jsonify(svc.metrics())
+
+    @bp.get("/stream")
+    def stream():
+        """Server-Sent Events: `readings` (new points, coalesced) and `probes` (discovery
+        or online-state changes). The dashboard refreshes on these instead of polling."""
+        client = EVENTS.open()
+        if client is None:
+            return jsonify(ok=False, error="too many stream clients"), 503
+        return Response(EVENTS.stream(client, lambda: LIVE.generation), mimetype="text/event-stream",
+                        headers=SSE_HEADERS)
+
+    @bp.get("/stats")
+    def stats():
+        """min/max/mean/count/last for one probe over [from, to) (default: last 24 h),
+        from the coarsest rollup that still fills `width` buckets (exact from raw
+        records with the records backend)."""
+        probe_id = request.args.get("probe_id") or ""
+        try:
+            t1 = ts_to_epoch(request.args["to"]) if request.args.get("to") else time.time()
+            t0 = ts_to_epoch(request.args["from"]) if request.args.get("from") else t1 - 86400
+            width = int(request.args.get("width") or 1000)
+        except ValueError:
+            return jsonify(ok=False, error="invalid from/to/width"), 400
+        if storage is not None and storage.name == "records":
+            # exact, from the mapped raw records: a binary-searched slice, no parsing
+            ts, cs = storage.series(probe_id, t0, t1)
+            out = {"resolution": 0, "min": round(float(cs.min()), 3), "max": round(float(cs.max()), 3),
+                   "mean": round(float(cs.mean(dtype="float64")), 4), "count": int(len(cs)),
+                   "last": round(float(cs[-1]), 3)} if len(cs) else {"count": 0}
+            return jsonify(ok=True, probe_id=probe_id, **out)
+        out = ROLLUPS.stats(probe_id, t0, t1, width) or {"count": 0}
+        return jsonify(ok=True, probe_id=probe_id, **out)
+
+    @bp.get("/readings")
+    def readings():
+        """Time-range query with cursor pagination, as columnar JSON.
+
+        ?probe_id=&from=&to=&resolution=raw|1m|1h|1d|auto&width=&limit=&cursor=
+        `from`/`to` accept ISO timestamps or epoch seconds. Raw rows come from the
+        storage backend (SQLite index / partition pruning); other resolutions come
+        from the rollups. Pass `next_cursor` back as `cursor` for the next page.
+        The CSV and partitioned backends page through the log in file (arrival)
+        order, so late or back-dated rows are neither skipped nor repeated; the
+        others return rows in time order.
+        """
+        args = request.args
+        probe_id = args.get("probe_id") or None
+        try:
+            t1 = ts_to_epoch(args["to"]) if args.get("to") else None
+            t0 = ts_to_epoch(args["from"]) if args.get("from") else None
+            limit = min(READINGS_MAX_LIMIT, max(1, int(args.get("limit") or READINGS_LIMIT)))
+            after = _decode_cursor(args.get("cursor"))
+            width = int(args.get("width") or 1000)
+        except (ValueError, TypeError):
+            return jsonify(ok=False, error="invalid from/to/limit/width/cursor"), 400
+        res_name = (args.get("resolution") or "raw").lower()
+        labels = {label: res for res, label in RESOLUTIONS.items()}
+        if res_name == "auto":
+            hi = t1 if t1 is not None else time.time()
+            lo = t0 if t0 is not None else hi - 86400
+            res = pick_resolution(lo, hi, width)
+        elif res_name == "raw":
+            res = 0
+        elif res_name in labels:
+            res = labels[res_name]
+        else:
+            return jsonify(ok=False, error="resolution must be raw, 1m, 1h, 1d or auto"), 400
+
+        if res == 0 and (storage is None or not storage.time_ordered):
+            if after is not None and not isinstance(after, list):
+                return jsonify(ok=False, error="invalid cursor"), 400
+            src = storage if storage is not None else CsvStorage(CSV_PATH)
+            page, next_cursor = _page_positions(src.iter_positions(probe_id, t0, t1, after), limit)
+            return jsonify(_columns(page, "raw", ("c",), next_cursor))
+        if isinstance(after, list):
+            return jsonify(ok=False, error="invalid cursor"), 400
+
+        lo = t0
+        if after is not None:
+            lo = after[0] if lo is None else max(lo, after[0])
+        if res == 0:
+            rows = storage.iter_rows(probe_id, lo, t1)
+            records = ((ts_to_epoch(ts), pid, (round(t_c, 3),)) for ts, t_c, _t_f, pid in rows)
+            fields = ("c",)
+        else:
+            pids = [probe_id] if probe_id is not None else ROLLUPS.probes()
+            merged = []
+            for pid in pids:
+                sr = ROLLUPS.series(pid, res, lo, t1)
+                merged.extend((t, pid, (round(m, 3), round(mn, 3), round(mx, 3), n, round(last, 3)))
+                              for t, m, mn, mx, n, last in zip(sr["t"], sr["mean"], sr["min"], sr["max"], sr["count"], sr["last"]))
+            merged.sort(key=lambda r: (r[0], r[1]))
+            records = iter(merged)
+            fields = ("c", "min", "max", "count", "last")
+
+        page, next_cursor = _page(records, after, limit)
+        return jsonify(_columns(page, RESOLUTIONS.get(res, "raw"), fields, next_cursor))
+
+    @bp.get("/export.csv")
+    def export_csv():
+        """Streamed CSV export: ?probe_id=&from=&to= (all optional).
+
+        Rows are generated in chunks, so memory stays flat and the first bytes go
+        out immediately. Gzip is used when the client accepts it. The generated
+        body is deterministic for a given data version (the ETag), so Range
+        requests resume an interrupted download: the body is generated again and
+        the requested bytes are cut out of it. An unfiltered export of a legacy
+        CSV log is served straight from the file.
+        """
+        args = request.args
+        probe_id = args.get("probe_id") or None
+        try:
+            t0 = ts_to_epoch(args["from"]) if args.get("from") else None
+            t1 = ts_to_epoch(args["to"]) if args.get("to") else None
+        except ValueError:
+            return jsonify(ok=False, error="invalid from/to"), 400
+        name = CSV_PATH.stem + (f"_{probe_id}" if probe_id else "") + ".csv"
+        gzip_ok = "gzip" in (request.headers.get("Accept-Encoding") or "").lower()
+        src = storage if storage is not None else CsvStorage(CSV_PATH)
+        raw_file = (probe_id is None and t0 is None and t1 is None and src.name == "csv"
+                    and csv_schema(CSV_PATH) == "legacy")
+        if raw_file and (request.range is not None or not gzip_ok):
+            return send_file(CSV_PATH, mimetype="text/csv", as_attachment=True, download_name=name, conditional=True)
+
+        def body():
+            chunks = src.iter_csv(probe_id, t0, t1)
+            return _gzip_chunks(chunks) if gzip_ok else (c.encode("utf-8") for c in chunks)
+
+        headers = {"Content-Disposition": f"attachment; filename={name}", "Vary": "Accept-Encoding"}
+        if gzip_ok:
+            headers["Content-Encoding"] = "gzip"  # ranges then count bytes of the gzip stream
+        version = src.version()
+        if version is None:
+            return Response(body(), mimetype="text/csv", headers=headers)
+        view = f"{src.name}|{probe_id}|{t0}|{t1}|{gzip_ok}".encode()
+        etag = f'"{version}-{zlib.crc32(view):08x}"'
+        headers.update({"ETag": etag, "Accept-Ranges": "bytes"})
+        rng = request.range
+        if rng is not None and request.headers.get("If-Range", etag) != etag:
+            rng = None  # the data changed since the first part: send it all again
+        if rng is None or len(rng.ranges) != 1:
+            return Response(body(), mimetype="text/csv", headers=headers)
+        total = sum(len(b) for b in body())  # a counting pass; memory stays flat
+        span = rng.range_for_length(total)
+        if span is None:
+            return Response(status=416, headers={"Content-Range": f"bytes */{total}"})
+        start, stop = span
+        headers.update({"Content-Range": f"bytes {start}-{stop - 1}/{total}", "Content-Length": str(stop - start)})
+        return Response(_byte_slice(body(), start, stop), status=206, mimetype="text/csv", headers=headers)
 
     @bp.post("/provision")
     def provision():
@@ -170,7 +282,7 @@ def create_api(cfg: Any, csv_path: str, discovery: Any, public_base: Callable[[]
         if host:
             targets.append((host, port))
         else:
-            for p in _iter_probes():
+            for p in svc.probes():
                 target = (p.get("ip") or p.get("host") or "").rstrip(".")
                 if target:
                     targets.append((target, int(p.get("port") or 80)))
@@ -201,113 +313,123 @@ def create_api(cfg: Any, csv_path: str, discovery: Any, public_base: Callable[[]
         if not _check_auth():
             return jsonify(ok=False, error="unauthorized"), 401
         data = request.get_json(silent=True) or {}
-        try:
-            ts, t_c, t_f = normalize_payload(data)
-        except Exception:
-            return jsonify(ok=False, error="temperature value required"), 400
         probe_id = request.headers.get("X-Probe-ID") or (data.get("probe_id") or "")
-        try:
-            append_row(CSV_PATH, ts, t_c, t_f, probe_id=probe_id)
-            # mark probe as seen
-            try:
-                if discovery and probe_id:
-                    import time
-                    probes = discovery.list_probes()
-                    matched = False
-                    for key, v in probes.items():
-                        if not v:
-                            continue
-                        # Match by key, id, name, host, or properties.id
-                        if key == probe_id or any(str(probe_id) in str(getattr(v, x, '')) for x in ('name','host')) or str(probe_id) in str(getattr(v, 'properties', {}).get('id', '')):
-                            try:
-                                if hasattr(v, 'last_seen'):
-                                    v.last_seen = time.time()
-                                else:
-                                    v['last_seen'] = time.time()
-                            except Exception:
-                                pass
-                            matched = True
-                            break
-                    if not matched:
-                        try:
-                            from probe_discovery import ProbeInfo
-                            probes[probe_id] = ProbeInfo(
-                                name=probe_id,
-                                host=data.get('host') or request.remote_addr,
-                                ip=request.remote_addr,
-                                port=80,
-                                properties={'id': probe_id},
-                                last_seen=time.time()
-                            )
-                        except Exception:
-                            pass
-                    probes = discovery.list_probes()
-                    matched = False
-                    for key, v in probes.items():
-                        if not v:
-                            continue
-                        # Match by key, id, name, host, or properties.id
-                        if key == probe_id or any(str(probe_id) in str(v.get(x, '')) for x in ('id','name','host')) or str(probe_id) in str(v.get('properties', {}).get('id', '')):
-                            v['last_seen'] = datetime.datetime.now().isoformat(timespec='seconds')
-                            matched = True
-                            break
-                    if not matched:
-                        # fallback: create/update temporary record
-                        probes[probe_id] = {
-                            'id': probe_id,
-                            'host': data.get('host') or request.remote_addr,
-                            'last_seen': datetime.datetime.now().isoformat(timespec='seconds')
-                        }
-            except Exception:
-                pass
-        except Exception:
-            _append_csv(str(CSV_PATH), t_c, probe_id)
-        return jsonify(ok=True)
+        return _reply(svc.ingest_one(data, probe_id, request.headers.get("X-Seq") or data.get("seq"),
+                                     request.remote_addr or ""))
+
+    @bp.post("/ingest_batch")
+    def ingest_batch():
+        """Many readings in one request: a JSON array, {"probe_id": ..., "readings": [...]},
+        NDJSON (one JSON object per line), or binary records (see core/binproto.py).
+        Each row may carry its own probe_id and timestamp; otherwise X-Probe-ID /
+        the top-level probe_id and the arrival time are used.
+        Accepted rows are committed together in one storage write.
+        """
+        if not _check_auth():
+            return jsonify(ok=False, error="unauthorized"), 401
+        return _reply(svc.ingest_batch(request.get_data(cache=False), request.content_type,
+                                       request.headers.get("X-Probe-ID") or "", request.remote_addr or ""))
 
     @bp.get("/ingest")
     def ingest_query():
         if not _check_auth():
             return jsonify(ok=False, error="unauthorized"), 401
         data = {k: v for k, v in request.args.items()}
-        try:
-            ts, t_c, t_f = normalize_payload(data)
-        except Exception:
-            return jsonify(ok=False, error="temperature value required"), 400
-        probe_id = request.args.get("probe_id") or ""
-        try:
-            append_row(CSV_PATH, ts, t_c, t_f, probe_id=probe_id)
-        except Exception:
-            _append_csv(str(CSV_PATH), t_c, probe_id)
-        return jsonify(ok=True)
+        return _reply(svc.ingest_one(data, data.get("probe_id") or "", request.headers.get("X-Seq") or data.get("seq"),
+                                     request.remote_addr or ""))
 
     @bp.post("/ingest_csv")
     def ingest_csv():
+        """Plain CSV upload. Without a header each line is `temperature_c[,probe_id]`;
+        with a header row, the columns are named (timestamp, temperature_c or
+        temperature_f, probe_id) in any order. Parsed in one pass and committed
+        as one storage write; malformed lines are reported by 0-based line index.
+        """
         if not _check_auth():
             return jsonify(ok=False, error="unauthorized"), 401
-        text = request.data.decode("utf-8", "ignore")
-        n = 0
-        for line in text.splitlines():
-            parts = [p.strip() for p in line.split(",")]
-            if not parts:
-                continue
-            try:
-                t_c = float(parts[0])
-            except Exception:
-                continue
-            pid = parts[1] if len(parts) > 1 else ""
-            _append_csv(str(CSV_PATH), t_c, pid)
-            n += 1
-        return jsonify(ok=True, rows=n)
+        return _reply(svc.ingest_csv(request.get_data(as_text=True), request.headers.get("X-Probe-ID") or "",
+                                     request.remote_addr or ""))
 
     return bp
 
 
-def _append_csv(csv_path: str, t_c: float, probe_id: str) -> None:
-    exists = os.path.exists(csv_path)
-    with open(csv_path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if not exists:
-            w.writerow(["timestamp", "temperature_c", "temperature_f", "probe_id"])
-        t_f = (t_c * 9.0 / 5.0) + 32.0
-        ts = datetime.datetime.now().isoformat(timespec="seconds")
-        w.writerow([ts, f"{t_c:.3f}", f"{t_f:.3f}", probe_id])
+# --- /api/readings pagination ---
+# Keyset cursor: (epoch of the last row returned, rows at that exact epoch
+# already returned), so a page boundary inside a burst of equal timestamps is safe.
+# File-order backends use a position cursor instead: [file name, byte offset].
+def _encode_cursor(t: float, n_same: int) -> str:
+    return base64.urlsafe_b64encode(f"{t!r}:{n_same}".encode()).decode().rstrip("=")
+
+
+def _encode_pos(pos: list) -> str:
+    return base64.urlsafe_b64encode(f"@{pos[0]}:{int(pos[1])}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str | None) -> Tuple[float, int] | list | None:
+    if not cursor:
+        return None
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    if raw.startswith("@"):
+        name, offset = raw[1:].rsplit(":", 1)
+        return [name, int(offset)]
+    t, n = raw.split(":", 1)
+    return float(t), int(n)
+
+
+def _columns(page, resolution: str, fields, next_cursor) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"ok": True, "resolution": resolution, "rows": len(page)}
+    out["t"] = [r[0] for r in page]
+    out["probe_id"] = [r[1] for r in page]
+    for i, name in enumerate(fields):
+        out[name] = [r[2][i] for r in page]
+    out["next_cursor"] = next_cursor
+    return out
+
+
+def _page_positions(items, limit: int):
+    """Page of (position, row) items; the cursor is the position after the last row."""
+    page = list(itertools.islice(items, limit + 1))
+    more = len(page) > limit
+    page = page[:limit]
+    records = [(ts_to_epoch(ts), pid, (round(t_c, 3),)) for _pos, (ts, t_c, _t_f, pid) in page]
+    return records, (_encode_pos(page[-1][0]) if more else None)
+
+
+def _page(records, after: Tuple[float, int] | None, limit: int):
+    """Take `limit` records (t, probe_id, values) after the cursor; returns (page, next_cursor)."""
+    if after is not None:
+        skip = after[1]
+        records = itertools.dropwhile(lambda r: r[0] < after[0], records)
+        records = (r for i, r in enumerate(records) if not (i < skip and r[0] == after[0]))
+    page = list(itertools.islice(records, limit + 1))
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    t_last = page[-1][0]
+    n_same = sum(1 for r in page if r[0] == t_last)
+    if after is not None and after[0] == t_last:
+        n_same += after[1]
+    return page, _encode_cursor(t_last, n_same)
+
+
+def _byte_slice(chunks, start: int, stop: int):
+    """Bytes [start, stop) of a stream of byte chunks."""
+    pos = 0
+    for chunk in chunks:
+        end = pos + len(chunk)
+        if end > start:
+            yield chunk[max(0, start - pos):stop - pos]
+        if end >= stop:
+            return
+        pos = end
+
+
+def _gzip_chunks(chunks):
+    # Incremental gzip; a sync flush per chunk keeps bytes flowing instead of
+    # letting zlib buffer the start of a large export.
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = z.compress(chunk.encode("utf-8")) + z.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield z.flush()
@@ -0,0 +1,333 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import csv, time, json, math
+
+from core.storage import Row, normalize_payload, client_ts_ms, append_row, append_csv_rows
+from core.live_buffer import LIVE
+from core import binproto
+from core.dedup import SEQS, SEQ_MOD_BINARY
+from core.ratelimit import LIMITER
+from core.events import EVENTS
+from core.snapcache import SNAPSHOTS
+
+BATCH_MAX_ROWS = 10000       # per /api/ingest_batch request
+BATCH_MAX_ERRORS = 100       # per-row errors echoed back
+CSV_MAX_ROWS = 100000        # per /api/ingest_csv request
+
+# (HTTP status, JSON body, extra headers)
+Reply = Tuple[int, Dict[str, Any], Dict[str, str]]
+
+
+class ApiService:
+    """Framework-neutral ingest / probe / config handlers.
+
+    api/routes.py (Flask, under app.py) and asgi.py (Starlette/uvicorn) are
+    thin adapters around one instance, so both servers share the same
+    writer, live buffer, dedup and rate-limit state. Handlers never block on
+    disk: rows are handed to the write-behind writer.
+    """
+    def __init__(self, cfg: Any, csv_path: str, discovery: Any = None, writer: Any = None,
+                 storage: Any = None, server_token: str = ""):
+        self.cfg = cfg
+        self.csv_path = Path(csv_path)
+        self.discovery = discovery
+        self.writer = writer
+        self.storage = storage
+        self.token = (server_token or "").strip()
+        self.queue_high_water = float(cfg.get("ingest_queue_high_water", 0.9) or 0)
+        self._touch = getattr(discovery, "touch", None)
+        self._subs: List[Any] = []
+
+    # --- auth ---
+    def authorized(self, tok: Optional[str]) -> bool:
+        return not self.token or tok == self.token
+
+    # --- storage: enqueue on the write-behind writer, else write synchronously ---
+    def store_many(self, rows: List[Row]) -> None:
+        for ts, t_c, _t_f, pid in rows:
+            LIVE.append(pid, ts, t_c)  # live dashboard source, no disk round-trip
+        if self.writer is not None:
+            rows = rows[self.writer.submit_many(rows):]
+            if not rows:
+                return
+        try:
+            if self.storage is not None:
+                self.storage.append_many(rows)
+            else:
+                for ts, t_c, t_f, pid in rows:
+                    append_row(self.csv_path, ts, t_c, t_f, probe_id=pid)
+        except Exception:
+            if self.storage is None or self.storage.name == "csv":
+                for _ts, t_c, _t_f, pid in rows:
+                    _append_csv(str(self.csv_path), t_c, pid)
+            return
+        for fn in self._subs:
+            try:
+                fn(rows)
+            except Exception:
+                pass
+
+    def subscribe(self, fn) -> None:
+        """Call fn(rows) after rows bypassed the writer (queue full or no writer) and were written here."""
+        self._subs.append(fn)
+
+    # --- admission control: per-probe token bucket + write queue high-water mark ---
+    def admit(self, probe_id: str, ip: str = "") -> Optional[Reply]:
+        """None if the request may proceed, else a 429 reply with Retry-After."""
+        w = self.writer
+        if w is not None and self.queue_high_water > 0 and w.depth() >= self.queue_high_water * w.queue_max:
+            LIMITER.queue_full += 1
+            wait = max(1.0, w.flush_interval_sec)
+        else:
+            wait = LIMITER.admit(probe_id or ip or "")
+        if not wait:
+            return None
+        return (429, {"ok": False, "error": "too many requests", "retry_after": round(wait, 3)},
+                {"Retry-After": str(max(1, int(math.ceil(wait))))})
+
+    # --- mark a probe as seen in discovery ---
+    def mark_seen(self, probe_id: str, ip: str = "") -> None:
+        if not probe_id:
+            return
+        binproto.remember(probe_id)  # so binary records can name this probe
+        if self._touch is not None:
+            try:
+                self._touch(probe_id, ip=ip or "")
+            except Exception:
+                pass
+
+    # --- ingest ---
+    def ingest_one(self, data: Dict[str, Any], probe_id: str, seq: Any = None, ip: str = "") -> Reply:
+        """One reading (POST JSON body or GET query args)."""
+        try:
+            ts, t_c, t_f = normalize_payload(data)  # a bad client timestamp falls back to arrival time
+        except Exception:
+            return 400, {"ok": False, "error": "temperature value required"}, {}
+        self.mark_seen(probe_id, ip)
+        busy = self.admit(probe_id, ip)
+        if busy is not None:
+            return busy
+        if not SEQS.accept(probe_id, seq, stamp=_client_stamp(data, ts)):
+            return 200, {"ok": True, "duplicate": True}, {}  # a retry of a stored reading
+        self.store_many([(ts, t_c, t_f, probe_id)])
+        return 200, {"ok": True}, {}
+
+    def ingest_batch(self, body: bytes, content_type: Optional[str], probe_id: str = "", ip: str = "") -> Reply:
+        """JSON array, {"probe_id": ..., "readings": [...]}, NDJSON, or binary records."""
+        busy = self.admit(probe_id, ip)
+        if busy is not None:
+            return busy
+        if binproto.layout(content_type):
+            return self._ingest_binary(body, content_type or "", probe_id, ip)
+        try:
+            items, default_pid = _parse_batch(body.decode("utf-8", "replace"))
+        except ValueError:
+            return 400, {"ok": False, "error": "body must be a JSON array or NDJSON"}, {}
+        if len(items) > BATCH_MAX_ROWS:
+            return 413, {"ok": False, "error": f"too many rows (max {BATCH_MAX_ROWS})"}, {}
+        default_pid = probe_id or default_pid or ""
+
+        rows: List[Row] = []
+        errors: List[Dict[str, Any]] = []
+        duplicates = 0
+        for i, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("row must be a JSON object")
+                ts, t_c, t_f = normalize_payload(item)
+            except Exception as e:
+                errors.append({"index": i, "error": str(e) or "invalid row"})
+                continue
+            pid = str(item.get("probe_id") or default_pid)
+            if not SEQS.accept(pid, item.get("seq"), stamp=_client_stamp(item, ts)):
+                duplicates += 1
+                continue
+            rows.append((ts, t_c, t_f, pid))
+        self._commit(rows, ip)
+        return 200, {"ok": bool(rows) or duplicates > 0 or not items, "accepted": len(rows),
+                     "rejected": len(errors), "duplicates": duplicates, "errors": errors[:BATCH_MAX_ERRORS]}, {}
+
+    def _ingest_binary(self, body: bytes, content_type: str, probe_id: str, ip: str) -> Reply:
+        if probe_id:
+            binproto.remember(probe_id)
+        if len(body) > BATCH_MAX_ROWS * 16:
+            return 413, {"ok": False, "error": f"too many rows (max {BATCH_MAX_ROWS})"}, {}
+        try:
+            records = list(binproto.decode(body, content_type))
+        except ValueError as e:
+            return 400, {"ok": False, "error": str(e)}, {}
+        now = time.time()
+        rows: List[Row] = []
+        duplicates = 0
+        for h, epoch, t_c, seq in records:
+            pid = binproto.resolve(h)
+            if not SEQS.accept(pid, seq, SEQ_MOD_BINARY, stamp=epoch or None):
+                duplicates += 1
+                continue
+            t_c = round(t_c, 3)
+            rows.append((int((epoch or now) * 1000), t_c, t_c * 9.0 / 5.0 + 32.0, pid))
+        self._commit(rows, ip)
+        return 200, {"ok": True, "accepted": len(rows), "rejected": 0, "duplicates": duplicates, "errors": []}, {}
+
+    def ingest_csv(self, text: str, probe_id: str = "", ip: str = "") -> Reply:
+        """Headerless `temperature_c[,probe_id]` lines, or a header row naming the columns."""
+        busy = self.admit(probe_id, ip)
+        if busy is not None:
+            return busy
+        rows, errors = _parse_csv_body(text, probe_id)
+        if len(rows) + len(errors) > CSV_MAX_ROWS:
+            return 413, {"ok": False, "error": f"too many rows (max {CSV_MAX_ROWS})"}, {}
+        self._commit(rows, ip)
+        return 200, {"ok": True, "rows": len(rows), "accepted": len(rows), "rejected": len(errors),
+                     "errors": errors[:BATCH_MAX_ERRORS]}, {}
+
+    def _commit(self, rows: List[Row], ip: str) -> None:
+        if rows:
+            self.store_many(rows)
+            for pid in {r[3] for r in rows}:
+                self.mark_seen(pid, ip)
+
+    # --- read-only views ---
+    def probes(self) -> List[Dict[str, Any]]:
+        if self.discovery is None:
+            return []
+        try:
+            vals = self.discovery.list_probes().values()
+        except Exception:
+            vals = []
+        out: List[Dict[str, Any]] = []
+        for obj in vals:
+            is_dict = isinstance(obj, dict)
+            get = (lambda k, d=None: (obj.get(k, d) if is_dict else getattr(obj, k, d)))
+            props = get("properties", {}) or {}
+            host = get("host")
+            ip = get("ip")
+            port = get("port", 80) or 80
+            name = get("name") or get("id") or props.get("name")
+            pid = props.get("id") or get("probe_id") or get("id") or name
+            out.append({
+                "host": host,
+                "ip": ip,
+                "port": port,
+                "name": name,
+                "probe_id": pid,
+                "last_seen": get("last_seen")
+            })
+        # stable sort by name/ip for UI consistency
+        return sorted(out, key=lambda p: (p.get("name") or "", p.get("ip") or ""))
+
+    def config(self) -> Dict[str, Any]:
+        """Config as a plain dict: dict config, .to_dict(), or a Config-like .data (+ .lock)."""
+        cfg = self.cfg
+        if isinstance(cfg, dict):
+            return dict(cfg)
+        if hasattr(cfg, "to_dict"):
+            try:
+                return cfg.to_dict()
+            except Exception:
+                pass
+        if hasattr(cfg, "data"):
+            try:
+                lock = getattr(cfg, "lock", None)
+                data_obj = getattr(cfg, "data") or {}
+                if lock:
+                    with lock:
+                        return dict(data_obj)
+                return dict(data_obj)
+            except Exception:
+                pass
+        return {}
+
+    def metrics(self) -> Dict[str, Any]:
+        """Ingest counters: write-behind queue, per-probe seq dedup / packet loss, rate limiting,
+        event stream clients, dashboard snapshot cache hit rate."""
+        out: Dict[str, Any] = {"ok": True, "seq": SEQS.stats(), "limits": LIMITER.stats(), "stream": EVENTS.stats(),
+                               "snapshots": SNAPSHOTS.stats()}
+        w = self.writer
+        if w is not None:
+            out["writer"] = {"depth": w.depth(), "rows_written": w.rows_written, "flushes": w.flushes,
+                             "rejected": w.rejected, "write_errors": w.write_errors}
+        return out
+
+
+def _client_stamp(data: Dict[str, Any], ts_ms: int) -> Optional[int]:
+    # The reading's own timestamp identifies a retry; an arrival time would not.
+    return ts_ms if client_ts_ms(data.get("timestamp") or data.get("ts")) is not None else None
+
+
+def _parse_batch(text: str) -> Tuple[List[Any], str]:
+    """Body of /api/ingest_batch -> (rows, top-level probe_id). Raises ValueError."""
+    text = text.strip()
+    if not text:
+        return [], ""
+    try:
+        doc = json.loads(text)
+    except ValueError:
+        # NDJSON: one object per non-empty line (a bad line becomes a rejected row)
+        rows: List[Any] = []
+        for line in text.splitlines():
+            if line.strip():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    rows.append(None)
+        if rows and all(r is None for r in rows):
+            raise
+        return rows, ""
+    if isinstance(doc, list):
+        return doc, ""
+    if isinstance(doc, dict) and isinstance(doc.get("readings"), list):
+        return doc["readings"], str(doc.get("probe_id") or "")
+    if isinstance(doc, dict):
+        return [doc], ""
+    raise ValueError("unsupported batch body")
+
+
+_CSV_ALIASES = {
+    "timestamp": "ts", "ts": "ts", "time": "ts",
+    "temperature_c": "c", "temp_c": "c", "t_c": "c", "c": "c",
+    "temperature_f": "f", "temp_f": "f", "t_f": "f", "f": "f",
+    "probe_id": "pid", "probe": "pid",
+}
+
+
+def _parse_csv_body(text: str, default_pid: str = "") -> Tuple[List[Row], List[Dict[str, Any]]]:
+    """Body of /api/ingest_csv -> (rows, errors). Rows without a timestamp share the arrival time."""
+    now = int(time.time() * 1000)
+    cols = {"c": 0, "pid": 1}  # legacy headerless layout
+    rows: List[Row] = []
+    errors: List[Dict[str, Any]] = []
+    first = True
+    for i, rec in enumerate(csv.reader(text.splitlines())):
+        rec = [p.strip() for p in rec]
+        if not any(rec):
+            continue
+        if first:
+            first = False
+            named = {_CSV_ALIASES[h.lower()]: k for k, h in enumerate(rec) if h.lower() in _CSV_ALIASES}
+            if "c" in named or "f" in named:
+                cols = named
+                continue
+        try:
+            i_c, i_f = cols.get("c"), cols.get("f")
+            if i_c is not None and i_c < len(rec) and rec[i_c]:
+                t_c = float(rec[i_c])
+                t_f = float(rec[i_f]) if i_f is not None and i_f < len(rec) and rec[i_f] else t_c * 9.0 / 5.0 + 32.0
+            elif i_f is not None and i_f < len(rec) and rec[i_f]:
+                t_f = float(rec[i_f])
+                t_c = (t_f - 32.0) * 5.0 / 9.0
+            else:
+                raise ValueError("no temperature value")
+            ts = rec[cols["ts"]] if "ts" in cols and cols["ts"] < len(rec) else ""
+            ts = client_ts_ms(ts) or now  # ISO or epoch s/ms, parsed once; else arrival time
+        except ValueError as e:
+            errors.append({"index": i, "error": str(e) or "invalid row"})
+            continue
+        pid = rec[cols["pid"]] if "pid" in cols and cols["pid"] < len(rec) else ""
+        rows.append((ts, t_c, t_f, pid or default_pid))
+    return rows, errors
+
+
+def _append_csv(csv_path: str, t_c: float, probe_id: str) -> None:
+    append_csv_rows(Path(csv_path), [(int(time.time() * 1000), t_c, t_c * 9.0 / 5.0 + 32.0, probe_id)])
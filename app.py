@@ -1,26 +1,87 @@
 import os
+import gzip
+import atexit
 import socket
 from pathlib import Path
 import dash
 from dash import Dash, html, Input, Output
 import dash_bootstrap_components as dbc
-from flask import Flask
+from flask import Flask, request
 
 from core.config import Config
-from core.storage import ensure_csv
+from core.storage import open_storage, csv_schema
+from core.writer import IngestWriter
+from core.live_buffer import LIVE
+from core.dedup import SEQS
+from core.ratelimit import LIMITER
+from core.events import EVENTS
+from core.snapcache import SNAPSHOTS
+from core.tailer import CsvTailer
+from core.rollups import ROLLUPS, RESOLUTIONS
+from core import binproto
 from core.mdns_advert import MdnsAdvert
 from probe_discovery import ProbeDiscovery
+from auto_provisioner import AutoProvisioner
 from api.routes import create_api
+from api.service import ApiService
 from components.layout_main import LAYOUT, serve_page, register_all_callbacks
 from components.help_modal import register_help_callbacks
 
 BASE_DIR = Path(__file__).resolve().parent
 CSV_FILE = Path(os.getenv('CSV_FILE', str(BASE_DIR / 'temperature_log.csv')))
+SQLITE_FILE = Path(os.getenv('SQLITE_FILE', str(BASE_DIR / 'temperature_log.db')))
+LOG_DIR = Path(os.getenv('LOG_DIR', str(BASE_DIR / 'logs')))
+REC_DIR = Path(os.getenv('REC_DIR', str(BASE_DIR / 'records')))
+ROLLUP_DIR = Path(os.getenv('ROLLUP_DIR', str(BASE_DIR / 'rollups')))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'csv')
+CSV_SCHEMA = os.getenv('CSV_SCHEMA', '')
 CONFIG_FILE = BASE_DIR / 'config.json'
 
-ensure_csv(CSV_FILE)
+storage = open_storage(STORAGE_BACKEND, CSV_FILE, SQLITE_FILE, LOG_DIR,
+                       max_bytes=int(os.getenv('LOG_MAX_BYTES', '0')),
+                       retention_days=int(os.getenv('LOG_RETENTION_DAYS', '0')), csv_schema=CSV_SCHEMA,
+                       rec_dir=REC_DIR)
 cfg = Config(CONFIG_FILE)
+LIVE.configure(capacity=cfg.get('live_capacity', 3600), window_sec=cfg.get('live_window_sec', 3600),
+               max_probes=cfg.get('live_max_probes', 256))
+SEQS.configure(window=cfg.get('dedup_window', 1024), max_probes=cfg.get('dedup_max_probes', 4096))
+LIMITER.configure(rate_per_sec=cfg.get('ingest_rate_per_sec', 2.0), burst=cfg.get('ingest_burst', 10))
+EVENTS.configure(max_clients=cfg.get('stream_max_clients', 32), coalesce_sec=cfg.get('stream_coalesce_ms', 500) / 1000.0,
+                 heartbeat_sec=cfg.get('stream_heartbeat_sec', 15), refresh_ms=cfg.get('stream_refresh_ms', 2000))
+SNAPSHOTS.configure(max_entries=cfg.get('snapshot_cache_entries', 64),
+                    tick_sec=cfg.get('snapshot_tick_ms', 1000) / 1000.0)
+LIVE.subscribe(EVENTS.reading)  # new points -> /api/stream
+# 1 min / 1 h / 1 day rollups; rebuilt from the raw log if the files are missing.
+ROLLUPS.open(ROLLUP_DIR, storage, keep={60: cfg.get('rollup_keep_1m', 2880), 3600: cfg.get('rollup_keep_1h', 2160),
+                                        86400: cfg.get('rollup_keep_1d', 3650)})
+# names for binary records from every probe in the history (the daily buckets go back furthest)
+binproto.remember_many(set().union(*(ROLLUPS.probes(res) for res in RESOLUTIONS)))
+writer = IngestWriter.from_config(storage, cfg)
+writer.start()
+atexit.register(storage.close)  # last: saves the partition manifest after the final flush
+atexit.register(ROLLUPS.close)
+atexit.register(writer.stop)  # flush queued rows on interpreter exit (runs before ROLLUPS.close)
+# Follow the log for rows written by other writers (PullLogger, other processes)
+# and to backfill the live buffer after a restart without parsing all history.
+# With a CSV log the tailer also feeds the rollups, since it sees every row
+# that reaches the file (writer flushes, the synchronous fallback, PullLogger).
+tailer = None
+if storage.name == 'csv':
+    tailer = CsvTailer(CSV_FILE, backfill_bytes=int(cfg.get('tail_backfill_bytes', 4_000_000)))
+    tailer.subscribe(LIVE.add_rows)
+    ROLLUPS.add_new_rows(tailer.poll())  # rows appended while the hub was down
+    tailer.subscribe(ROLLUPS.add_rows)
+    tailer.start(period_sec=float(cfg.get('tail_interval_sec', 1.0)))
+else:
+    import time as _time
+    writer.subscribe(ROLLUPS.add_rows)
+    LIVE.extend((pid, ts, t_c) for ts, t_c, _f, pid in storage.iter_rows(t0=_time.time() - LIVE.window_sec))
 finder = ProbeDiscovery()
+def _probes_changed(probes):
+    binproto.remember_many(i for p in probes.values() for i in ((p.properties or {}).get('id'), p.name))
+    EVENTS.probes_changed(probes)
+
+finder.on_change = _probes_changed
 try: finder.start()
 except Exception: pass
 
@@ -46,20 +107,54 @@ def _public_base() -> str:
     port = int(os.getenv("PORT", "8080"))
     return f"http://{_detect_lan_ip()}:{port}"
 
-api_bp = create_api(cfg, str(CSV_FILE), finder, _public_base, os.getenv('SERVER_TOKEN', ''))
+# Keep discovered probes pointed at this hub; throttled probes get a longer interval.
+# auto_provision / provision_token / interval_sec are re-read from cfg every cycle.
+provisioner = AutoProvisioner(finder, _public_base, token=os.getenv('SERVER_TOKEN', ''), limiter=LIMITER, cfg=cfg)
+provisioner.start()
+
+# Ingest/probe/config handlers; shared with asgi.py when served that way.
+api_service = ApiService(cfg, str(CSV_FILE), finder, writer=writer, storage=storage,
+                         server_token=os.getenv('SERVER_TOKEN', ''))
+if tailer is None:
+    api_service.subscribe(ROLLUPS.add_rows)  # rows written synchronously when the writer queue is full
+api_bp = create_api(cfg, str(CSV_FILE), finder, _public_base, os.getenv('SERVER_TOKEN', ''), writer=writer,
+                    storage=storage, service=api_service)
 server.register_blueprint(api_bp)
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.CYBORG], server=server, suppress_callback_exceptions=True)
 app.title = 'Temperature Hub'
 app.layout = LAYOUT
 
+
+@server.after_request
+def _gzip_callbacks(resp):
+    # Callback responses (figures) are the bulk of a refresh; gzip shrinks
+    # them several-fold. Static assets and /api/* are left as they are.
+    try:
+        if (request.path.endswith(('/_dash-update-component', '/_dash-layout'))
+                and resp.status_code == 200 and not resp.direct_passthrough
+                and 'Content-Encoding' not in resp.headers
+                and 'gzip' in (request.headers.get('Accept-Encoding') or '').lower()):
+            body = resp.get_data()
+            if len(body) >= 1024:
+                resp.set_data(gzip.compress(body, compresslevel=5))
+                resp.headers['Content-Encoding'] = 'gzip'
+                resp.vary.add('Accept-Encoding')
+    except Exception:
+        pass
+    return resp
+
 # --- CSV Download Route ---
-from flask import send_file
+from flask import send_file, Response
 from werkzeug.utils import safe_join
 
 @server.route('/download/<path:filename>')
 def download_csv(filename):
     try:
+        if Path(filename).name == CSV_FILE.name and (storage.name != 'csv' or csv_schema(CSV_FILE) != 'legacy'):
+            # Non-CSV backend or compact log: export in the usual Excel-friendly layout on the fly.
+            return Response(storage.iter_csv(), mimetype='text/csv',
+                            headers={'Content-Disposition': f'attachment; filename={CSV_FILE.name}'})
         full_path = safe_join(BASE_DIR, filename)
         return send_file(full_path, as_attachment=True)
     except Exception as e:
@@ -70,7 +165,7 @@ def download_csv(filename):
 def display_page(pathname):
     return serve_page(pathname)
 
-register_all_callbacks(app, finder, cfg)
+register_all_callbacks(app, finder, cfg, storage)
 register_help_callbacks(app)
 
 if __name__ == '__main__':
@@ -83,6 +178,11 @@ if __name__ == '__main__':
             print(f'[mDNS] Advertising http://temps-hub.local:{port} (ip {ip})')
         app.run(host=host, port=port, debug=False)
     finally:
+        writer.stop()
+        ROLLUPS.close()
+        if tailer: tailer.stop()
+        if provisioner: provisioner.stop()
+        storage.close()
         if mdns: mdns.stop()
         try: finder.stop()
         except Exception: pass
@@ -0,0 +1,189 @@
+"""
+ASGI entry point for busy deployments.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8080      (or: python asgi.py)
+
+Ingest, probe, config-read, metrics and event-stream endpoints run as async handlers on the
+event loop and call the same ApiService as the Flask blueprint (same writer,
+live buffer, dedup and rate-limit state). Single readings are an enqueue on
+the loop; batch and CSV parsing, and any synchronous write when the queue is
+full, run in the thread pool, so probe POSTs are answered promptly while Dash
+callbacks render. Everything else
+(the Dash UI, /api/readings, /api/export.csv, POST /api/config, downloads) is
+the unchanged Flask app, mounted as WSGI and run in the server's thread pool.
+
+Needs `starlette` and `uvicorn` (plus `a2wsgi` if available); app.py alone does not.
+"""
+from __future__ import annotations
+import asyncio, contextlib, datetime, json, os
+
+try:
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Mount, Route
+except ImportError as e:  # pragma: no cover
+    raise SystemExit("asgi.py needs Starlette and uvicorn: pip install -r requirements.txt") from e
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+import app as hub
+from core.events import EVENTS, SSE_HEADERS
+from core.live_buffer import LIVE
+
+svc = hub.api_service
+
+
+def _reply(r) -> JSONResponse:
+    status, body, headers = r
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+def _ip(request: Request) -> str:
+    return request.client.host if request.client else ""
+
+
+def _authorized(request: Request, data=None) -> bool:
+    tok = request.headers.get("X-Token") or request.query_params.get("token")
+    if not tok and isinstance(data, dict):
+        tok = data.get("token")
+    return svc.authorized(tok)
+
+
+def _writer_full() -> bool:
+    # Without room in the write queue the service writes synchronously (disk I/O).
+    w = svc.writer
+    return w is None or w.depth() >= w.queue_max
+
+
+def _unauthorized() -> JSONResponse:
+    return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+
+
+async def ingest(request: Request):
+    if request.method == "GET":
+        data = dict(request.query_params)
+        if not _authorized(request):
+            return _unauthorized()
+        probe_id = data.get("probe_id") or ""
+    else:
+        try:
+            data = json.loads(await request.body() or b"{}")
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        if not _authorized(request, data):
+            return _unauthorized()
+        probe_id = request.headers.get("X-Probe-ID") or (data.get("probe_id") or "")
+    args = (data, probe_id, request.headers.get("X-Seq") or data.get("seq"), _ip(request))
+    # One reading is just an enqueue: stay on the loop unless it would hit the disk.
+    if _writer_full():
+        return _reply(await run_in_threadpool(svc.ingest_one, *args))
+    return _reply(svc.ingest_one(*args))
+
+
+async def ingest_batch(request: Request):
+    if not _authorized(request):
+        return _unauthorized()
+    body = await request.body()
+    # Parsing up to BATCH_MAX_ROWS rows (and a possible synchronous write) runs in
+    # the thread pool, so one large batch does not stall every other request.
+    return _reply(await run_in_threadpool(svc.ingest_batch, body, request.headers.get("content-type"),
+                                          request.headers.get("X-Probe-ID") or "", _ip(request)))
+
+
+async def ingest_csv(request: Request):
+    if not _authorized(request):
+        return _unauthorized()
+    text = (await request.body()).decode("utf-8", "replace")
+    return _reply(await run_in_threadpool(svc.ingest_csv, text, request.headers.get("X-Probe-ID") or "", _ip(request)))
+
+
+async def health(request: Request):
+    return JSONResponse({"ok": True, "probes": len(svc.probes()), "base": hub._public_base(),
+                         "time": datetime.datetime.now().isoformat(timespec="seconds")})
+
+
+async def probes(request: Request):
+    return JSONResponse(svc.probes())
+
+
+async def config(request: Request):
+    return JSONResponse(svc.config())
+
+
+async def metrics(request: Request):
+    return JSONResponse(svc.metrics())
+
+
+async def stream(request: Request):
+    """Same events as the Flask /api/stream, without holding a thread per client."""
+    client = EVENTS.open()
+    if client is None:
+        return JSONResponse({"ok": False, "error": "too many stream clients"}, status_code=503)
+
+    async def events():
+        try:
+            yield EVENTS.hello(LIVE.generation)
+            tick = max(0.05, EVENTS.coalesce_sec or 0.25)
+            idle = 0.0
+            while not client.closed:
+                await asyncio.sleep(tick)
+                if client.q:
+                    idle = 0.0
+                    chunk = EVENTS.drain(client, LIVE.generation)
+                    if chunk:
+                        yield chunk
+                else:
+                    idle += tick
+                    if idle >= EVENTS.heartbeat_sec:
+                        idle = 0.0
+                        yield ": ping\n\n"
+        finally:
+            EVENTS.close(client)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    yield
+    EVENTS.close_all()
+    hub.writer.stop()
+    hub.ROLLUPS.close()
+    if hub.tailer: hub.tailer.stop()
+    if hub.provisioner: hub.provisioner.stop()
+    hub.storage.close()
+    try: hub.finder.stop()
+    except Exception: pass
+
+
+app = Starlette(routes=[
+    Route("/api/ingest", ingest, methods=["GET", "POST"]),
+    Route("/api/ingest_batch", ingest_batch, methods=["POST"]),
+    Route("/api/ingest_csv", ingest_csv, methods=["POST"]),
+    Route("/api/health", health, methods=["GET"]),
+    Route("/api/probes", probes, methods=["GET"]),
+    Route("/api/config", config, methods=["GET"]),
+    Route("/api/metrics", metrics, methods=["GET"]),
+    Route("/api/stream", stream, methods=["GET"]),
+    Mount("/", app=WSGIMiddleware(hub.server)),  # Dash UI and the rest of the Flask API
+], lifespan=lifespan)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', '8080'))
+    mdns = hub.MdnsAdvert() if (os.getenv('MDNS_ENABLE', '1') not in ('0','false','False')) else None
+    try:
+        if mdns:
+            ip = mdns.start(port)
+            print(f'[mDNS] Advertising http://temps-hub.local:{port} (ip {ip})')
+        uvicorn.run(app, host=host, port=port, timeout_graceful_shutdown=5)  # don't wait forever on open streams
+    finally:
+        if mdns: mdns.stop()
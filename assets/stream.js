@@ -0,0 +1,107 @@
+/* Live updates from /api/stream (Server-Sent Events).
+ *
+ * Each `readings` / `probes` event is pushed into a dcc.Store
+ * (stream-readings / stream-probes), so the page callbacks that listen to
+ * those stores only hit the server when something changed. `readings`
+ * events arrive every stream_coalesce_ms under steady traffic; they are
+ * merged here and handed to the page at most once per `refresh_ms` (sent in
+ * the `hello` event), so a busy hub does not cost each tab a server callback
+ * per event. `stream-state` tells the pages to switch their polling Intervals
+ * off (or slow them down) while connected; EventSource reconnects on its own
+ * after an error, and polling resumes in the meantime.
+ */
+(function () {
+    if (!window.EventSource) return;
+
+    var pending = {};   // latest value per store, until Dash has rendered the layout
+    var timer = null;
+
+    function ready() {
+        return window.dash_clientside && window.dash_clientside.set_props &&
+            document.getElementById('page-content');
+    }
+
+    function flush() {
+        timer = null;
+        if (!ready()) {
+            timer = setTimeout(flush, 250);
+            return;
+        }
+        var ids = Object.keys(pending);
+        for (var i = 0; i < ids.length; i++) {
+            try {
+                window.dash_clientside.set_props(ids[i], {data: pending[ids[i]]});
+            } catch (e) { /* store not mounted */ }
+        }
+        pending = {};
+    }
+
+    function push(id, data) {
+        pending[id] = data;
+        if (!timer) flush();
+    }
+
+    var seq = 0;
+    function parse(e) {
+        var data = {};
+        try { data = JSON.parse(e.data); } catch (err) { /* keep {} */ }
+        return data;
+    }
+
+    function onProbes(e) {
+        var data = parse(e);
+        data.n = ++seq;   // always a new value, so the callback fires
+        push('stream-probes', data);
+    }
+
+    // readings: merged until refresh_ms has passed since the last hand-off
+    var refreshMs = 2000;
+    var held = null, lastSent = 0, holdTimer = null;
+
+    function sendReadings() {
+        holdTimer = null;
+        if (!held) return;
+        held.n = ++seq;
+        lastSent = Date.now();
+        push('stream-readings', held);
+        held = null;
+    }
+
+    function onReadings(e) {
+        var data = parse(e);
+        held = {
+            gen: data.gen,
+            resync: !!data.resync || !!(held && held.resync),
+            count: (data.rows ? data.rows.length : 0) + (held ? held.count : 0)
+        };
+        var wait = lastSent + refreshMs - Date.now();
+        if (wait <= 0) {
+            sendReadings();
+        } else if (!holdTimer) {
+            holdTimer = setTimeout(sendReadings, wait);
+        }
+    }
+
+    function connect() {
+        var es = new EventSource('/api/stream');
+        es.addEventListener('hello', function (e) {
+            var data = parse(e);
+            if (typeof data.refresh_ms === 'number') refreshMs = data.refresh_ms;
+            push('stream-state', {connected: true});
+        });
+        es.onerror = function () {
+            push('stream-state', {connected: false});
+            if (es.readyState === EventSource.CLOSED) {  // refused (e.g. 503): retry later
+                setTimeout(connect, 30000);
+            }
+        };
+        es.addEventListener('readings', onReadings);
+        es.addEventListener('probes', onProbes);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', connect);
+    } else {
+        connect();
+    }
+})();
@@ -2,9 +2,10 @@ from __future__ import annotations
 import requests, socket
 
 def provision_probe(base_host: str, port: int, server_base: str, token: str = "",
-                    interval_ms: int = 5000, timeout: float = 3.0) -> bool:
+                    interval_ms: int = 5000, timeout: float = 3.0, verbose: bool = True) -> bool:
     """
     Try both IP and hostname to reach /provision so Windows .local issues don't block it.
+    verbose=False leaves logging to the caller (the background provisioner).
     """
     h = (base_host or "").rstrip(".")
     body = {
@@ -27,10 +28,10 @@ def provision_probe(base_host: str, port: int, server_base: str, token: str = ""
         try:
             r = requests.post(url, json=body, timeout=timeout)
             if r.ok:
-                print(f"[provision] {url} OK")
+                if verbose: print(f"[provision] {url} OK")
                 return True
-            else:
+            elif verbose:
                 print(f"[provision] {url} failed -> {r.status_code}")
         except Exception as e:
-            print(f"[provision] {url} exception: {e}")
+            if verbose: print(f"[provision] {url} exception: {e}")
     return False
\ No newline at end of file
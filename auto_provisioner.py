@@ -1,41 +1,87 @@
 from __future__ import annotations
 import threading, time
-from typing import Callable
+from typing import Callable, Dict, Tuple
 from auto_provision import provision_probe
 
+MAX_INTERVAL_MS = 600_000   # backoff ceiling for throttled probes (10 min)
+BACKOFF_HOLD_SEC = 3600     # a backed-off probe returns to the configured interval after this long unthrottled
+
 class AutoProvisioner(threading.Thread):
     """Background worker that keeps probes provisioned with the hub's ingest URL.
 
-    It provisions each discovered probe by IP (preferred) with fallback to hostname.
+    It provisions each discovered probe by IP (preferred) with fallback to hostname,
+    and only when what it would send (URL, token, interval) differs from what the
+    probe last accepted, so intervals set on a probe by hand are not overwritten
+    every cycle. `cfg` (auto_provision, provision_token, interval_sec) is read on
+    every cycle. A probe the ingest rate limiter throttled since its last push
+    gets double its interval, up to MAX_INTERVAL_MS.
     """
-    def __init__(self, discovery, public_base_func: Callable[[], str], token: str = "", interval_ms: int = 2000, period_sec: int = 10):
+    def __init__(self, discovery, public_base_func: Callable[[], str], token: str = "", interval_ms: int = 2000, period_sec: int = 10,
+                 limiter=None, cfg=None):
         super().__init__(daemon=True)
+        self.limiter = limiter
+        self.cfg = cfg
         self.discovery = discovery
         self.public_base_func = public_base_func
         self.token = token or ""
         self.interval_ms = int(interval_ms)
         self.period_sec = int(period_sec)
+        self._sent: Dict[str, Tuple[str, str, int]] = {}   # probe -> (url base, token, interval) it accepted
+        self._sent_at: Dict[str, float] = {}
+        self._backoff: Dict[str, Tuple[int, float]] = {}    # probe -> (interval ms, monotonic time set)
+        self._failing: set = set()
         self._stop = False
 
     def stop(self):
         self._stop = True
 
+    def _settings(self) -> Tuple[bool, str, int]:
+        if self.cfg is None:
+            return True, self.token, self.interval_ms
+        return (bool(self.cfg.get("auto_provision", True)), self.cfg.get("provision_token") or self.token,
+                int(float(self.cfg.get("interval_sec", 5)) * 1000))
+
+    def cycle(self) -> None:
+        """One provisioning pass over the discovered probes."""
+        enabled, token, interval_ms = self._settings()
+        base = (self.public_base_func() or "").rstrip("/")
+        if not enabled or not base:
+            return
+        now = time.monotonic()
+        throttled = set(self.limiter.recently_throttled(self.period_sec)) if self.limiter else set()
+        probes = self.discovery.list_probes()
+        for key in [k for k in self._sent if k not in probes]:
+            self._sent.pop(key, None); self._sent_at.pop(key, None); self._backoff.pop(key, None)
+        for key, p in probes.items():
+            host = (getattr(p, "ip", None) or getattr(p, "host", None) or "").rstrip('.')
+            if not host:
+                continue
+            port = int(getattr(p, "port", 80) or 80)
+            sent = self._sent.get(key)
+            ids = {getattr(p, "ip", None), getattr(p, "name", None), (getattr(p, "properties", None) or {}).get("id")}
+            if sent and throttled & ids and now - self._sent_at[key] >= self.period_sec:
+                floor = 2 * self.limiter.min_interval_ms()
+                self._backoff[key] = (min(MAX_INTERVAL_MS, max(interval_ms, floor, 2 * sent[2])), now)
+            backoff = self._backoff.get(key)
+            if backoff and now - backoff[1] > BACKOFF_HOLD_SEC:
+                self._backoff.pop(key)
+                backoff = None
+            want = (base, token, max(interval_ms, backoff[0]) if backoff else interval_ms)
+            if want == sent:
+                continue
+            # Provision to <base>/api/ingest using probe IP/host
+            if provision_probe(host, port, base, token=token, interval_ms=want[2], verbose=False):
+                self._sent[key], self._sent_at[key] = want, now
+                self._failing.discard(key)
+                print(f"[provision] {key} ({host}:{port}) -> {base}/api/ingest every {want[2]} ms")
+            elif key not in self._failing:
+                self._failing.add(key)  # logged once; retried quietly every cycle
+                print(f"[provision] {key} ({host}:{port}) unreachable; retrying")
+
     def run(self):
         while not self._stop:
             try:
-                base = (self.public_base_func() or "").rstrip("/")
-                if base:
-                    for p in self.discovery.list_probes().values():
-                        host = getattr(p, "ip", None) or getattr(p, "host", None) or ""
-                        host = host.rstrip('.')
-                        port = int(getattr(p, "port", 80) or 80)
-                        if host:
-                            try:
-                                # Provision to <base>/api/ingest using probe IP/host
-                                provision_probe(host, port, base, token=self.token, interval_ms=self.interval_ms)
-                            except Exception:
-                                # best-effort; we'll retry next cycle
-                                pass
+                self.cycle()
             except Exception:
-                pass
+                pass  # best-effort; we'll retry next cycle
             time.sleep(self.period_sec)
@@ -1,10 +1,15 @@
-from dash import html, dcc, Output, Input, no_update
+from dash import html, dcc, ctx, Output, Input, State, Patch, no_update
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
-import pandas as pd, os, datetime
-from urllib.parse import quote
+import bisect
+import datetime
+import time
 
-CSV_FILE = os.getenv('CSV_FILE', 'temperature_log.csv')
+from core.live_buffer import LIVE
+from core.downsample import lttb, point_budget
+from core.rollups import ROLLUPS, RESOLUTIONS, pick_resolution
+from core.snapcache import SNAPSHOTS
+from components.temp_graph import live_cursor, live_extend, local_ms, typed_xy
 
 # --- Gauge Card ---
 GaugeCard = dbc.Card(
@@ -46,7 +51,21 @@ MetricsRow = dbc.Row([
 # --- Graph Card ---
 GraphCard = dbc.Card(
     dbc.CardBody([
-        html.H5('Temperature History'),
+        html.Div([
+            html.H5('Temperature History', className='mb-0'),
+            dbc.RadioItems(
+                id='graph-range',
+                options=[{'label': label, 'value': value} for value, label in
+                         (('live', 'Live'), ('1h', '1h'), ('24h', '24h'), ('7d', '7d'), ('30d', '30d'))],
+                value='live',
+                inline=True,
+                persistence=True,
+                className='btn-group',
+                inputClassName='btn-check',
+                labelClassName='btn btn-outline-secondary btn-sm',
+                labelCheckedClassName='active'
+            )
+        ], className='d-flex justify-content-between align-items-center mb-2'),
         dcc.Graph(id='graph-temp', style={'height': '360px'}),
         html.Div(
             dbc.Button('📥 Download CSV', id='download-btn',
@@ -55,7 +74,9 @@ GraphCard = dbc.Card(
             className='text-end'
         ),
         html.Small(id='heartbeat', className='text-muted mt-2 d-block'),
-        dcc.Interval(id='dash-refresh', interval=5000, n_intervals=0)
+        dcc.Interval(id='dash-refresh', interval=5000, n_intervals=0),
+        dcc.Store(id='graph-width'),
+        dcc.Store(id='graph-cursor')  # what the browser's traces already hold
     ]),
     className='h-100 graph-card'
 )
@@ -70,63 +91,244 @@ DashboardLayout = html.Div([
 ])
 
 
+# --- Figure helpers ---
+def _gauge_figure(t_c):
+    gauge = go.Figure(go.Indicator(
+        mode='gauge+number',
+        value=t_c,
+        number={'suffix': ' °C'},
+        gauge={'axis': {'range': [0, 100]},
+               'bar': {'color': '#00bcd4'}},
+        domain={'x': [0, 1], 'y': [0, 1]}
+    ))
+    gauge.update_layout(
+        margin=dict(t=10, b=30, l=10, r=10),
+        height=250,
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white'
+    )
+    return gauge
+
+
+def _newest_bucket(pid, res):
+    t = ROLLUPS.series(pid, res)['t']
+    return t[-1] if t else None
+
+
+def _history_figure(window, budget, uirevision='history'):
+    """One trace per probe: raw live points LTTB-reduced to what the plot width
+    can show. Traces are in sorted probe order (see live_cursor)."""
+    fig = go.Figure()
+    for pid, (xs, ys) in sorted(window.items()):
+        xs, ys = typed_xy(*lttb(xs, ys, budget))
+        fig.add_trace(go.Scatter(
+            x=xs,
+            y=ys,
+            mode='lines',
+            name=pid or '°C'
+        ))
+    fig.update_layout(
+        margin=dict(t=20, b=20, l=0, r=10),
+        template='plotly_dark',
+        xaxis_title='Time',
+        xaxis_type='date',
+        yaxis_title='Temp °C',
+        uirevision=uirevision  # keep zoom/legend state when the figure is replaced
+    )
+    return fig
+
+
+def _raw_snapshot(key, budget, since=None, uirevision='history'):
+    window = LIVE.window(since=since)
+    return _history_figure(window, budget, uirevision).to_dict(), live_cursor(window, key)
+
+
+def _newest_marker(res, last_epoch):
+    """Changes when the chart for a long range needs redrawing: a new rollup
+    bucket per probe, or (raw rows from storage) once a minute."""
+    if not res:
+        return int(last_epoch // 60)
+    return {pid: _newest_bucket(pid, res) for pid in sorted(set(ROLLUPS.probes()) | set(LIVE.probes()))}
+
+
+RANGE_PRESETS = {'1h': 3600, '24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400}
+
+
+def _pick_res(t0, t1, width_px):
+    """pick_resolution, moved to a coarser rollup when the picked one no longer
+    keeps buckets back to t0 (1 min buckets cover 2 days by default)."""
+    res = pick_resolution(t0, t1, width_px)
+    coarser = [r for r in sorted(RESOLUTIONS) if r > res]
+    while res and coarser and t1 - res * ROLLUPS.keep.get(res, 0) > t0:
+        res = coarser.pop(0)
+    return res
+
+
+def _relayout_range(relayout):
+    """Visible x range (epoch seconds) from a relayoutData event, 'reset' for
+    autoscale/double-click, None for events that don't move the x axis."""
+    if not relayout:
+        return None
+    if relayout.get('xaxis.autorange'):
+        return 'reset'
+    x0, x1 = relayout.get('xaxis.range[0]'), relayout.get('xaxis.range[1]')
+    if x0 is None and relayout.get('xaxis.range'):
+        x0, x1 = relayout['xaxis.range'][:2]
+    if x0 is None or x1 is None:
+        return None
+    try:
+        return [_axis_epoch(x0), _axis_epoch(x1)]
+    except (TypeError, ValueError):
+        return None
+
+
+def _axis_epoch(x):
+    # date axis values are local wall-clock strings ("2026-10-17 08:30:12.5");
+    # .timestamp() applies the offset in force on that date, like utc_offsets()
+    return datetime.datetime.fromisoformat(str(x).replace(' ', 'T')).timestamp()
+
+
+def _range_figure(t0, t1, width_px, budget, storage=None, uirevision='history'):
+    """Traces for [t0, t1) at the resolution the plot width can show: rollup
+    means when they fill the width, else raw points (live buffer when the
+    range is recent enough, otherwise the storage backend)."""
+    res = _pick_res(t0, t1, width_px)
+    live_from = time.time() - LIVE.window_sec
+    fig = go.Figure()
+    pids = sorted(set(ROLLUPS.probes()) | set(LIVE.probes()))
+    stored = {}
+    if not res and t0 < live_from and storage is not None:
+        stored = storage.series_many(pids, t0, t1)  # one pass over the log for the CSV backend
+    for pid in pids:
+        if res:
+            s = ROLLUPS.series(pid, res, t0, t1)
+            xs, ys = s['t'], s['mean']
+        elif t0 >= live_from or storage is None:
+            xs, ys = LIVE.window(pid, since=t0).get(pid, ([], []))
+            k = bisect.bisect_left(xs, t1)
+            xs, ys = xs[:k], ys[:k]
+        else:
+            ts, cs = stored[pid]
+            xs, ys = ts / 1000.0, cs
+        if not len(xs):
+            continue
+        xs, ys = typed_xy(*lttb(xs, ys, budget))
+        fig.add_trace(go.Scatter(x=xs, y=ys, mode='lines', name=pid or '°C'))
+    fig.update_layout(
+        margin=dict(t=20, b=20, l=0, r=10),
+        template='plotly_dark',
+        xaxis_title='Time',
+        xaxis_type='date',
+        yaxis_title='Temp °C',
+        uirevision=uirevision
+    )
+    return fig, res
+
+
 # --- Callbacks ---
-def register_dashboard_callbacks(app, finder, cfg):
+def register_dashboard_callbacks(app, finder, cfg, storage=None):
+    # Report the rendered plot width so the server can size its point budget.
+    app.clientside_callback(
+        """function(_n, _ev) {
+            var el = document.getElementById('graph-temp');
+            return el && el.offsetWidth ? el.offsetWidth : window.dash_clientside.no_update;
+        }""",
+        Output('graph-width', 'data'),
+        Input('dash-refresh', 'n_intervals'),
+        Input('stream-readings', 'data')
+    )
+    # While /api/stream is connected, new readings drive the refresh; no polling.
+    app.clientside_callback(
+        "function(s) { return !!(s && s.connected); }",
+        Output('dash-refresh', 'disabled'),
+        Input('stream-state', 'data')
+    )
+
     @app.callback(
         Output('temp-gauge', 'figure'),
         Output('graph-temp', 'figure'),
+        Output('graph-temp', 'extendData'),
+        Output('graph-cursor', 'data'),
         Output('metric-probes', 'children'),
         Output('metric-lastupdate', 'children'),
         Output('metric-logging', 'children'),
         Output('heartbeat', 'children'),
-        Input('dash-refresh', 'n_intervals')
+        Input('dash-refresh', 'n_intervals'),
+        Input('stream-readings', 'data'),
+        Input('graph-range', 'value'),
+        Input('graph-temp', 'relayoutData'),
+        State('graph-width', 'data'),
+        State('graph-cursor', 'data')
     )
-    def update_dashboard(_):
+    def update_dashboard(_n, ev, preset, relayout, width_px, cursor):
         try:
-            df = pd.read_csv(CSV_FILE)
-            if df.empty:
+            # Everything that only depends on the data version and the view
+            # is built once and shared by all open displays (core/snapcache.py).
+            need = (ev or {}).get('gen') if ctx.triggered_id == 'stream-readings' else None
+            gen = SNAPSHOTS.version(LIVE.generation, need)
+            latest = SNAPSHOTS.get(('latest', gen), LIVE.latest)
+            if latest is None:
                 raise ValueError('No data')
 
-            row = df.tail(1).iloc[0]
-            t_c = float(row['temperature_c'])
-            t_f = float(row['temperature_f'])
-            ts = row['timestamp']
-
-            # Gauge
-            gauge = go.Figure(go.Indicator(
-                mode='gauge+number',
-                value=t_c,
-                number={'suffix': ' °C'},
-                gauge={'axis': {'range': [0, 100]},
-                       'bar': {'color': '#00bcd4'}},
-                domain={'x': [0, 1], 'y': [0, 1]}
-            ))
-            gauge.update_layout(
-                margin=dict(t=10, b=30, l=10, r=10),
-                height=250,
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white'
-            )
+            _pid, last_epoch, t_c = latest
+            last_dt = datetime.datetime.fromtimestamp(last_epoch)
+            ts = last_dt.isoformat(timespec='seconds')
 
-            # Graph
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=df['timestamp'],
-                y=df['temperature_c'],
-                mode='lines',
-                name='°C'
-            ))
-            fig.update_layout(
-                margin=dict(t=20, b=20, l=0, r=10),
-                template='plotly_dark',
-                xaxis_title='Time',
-                yaxis_title='Temp °C'
-            )
+            # Gauge: once built, only its value changes
+            if cursor:
+                gauge = Patch()
+                gauge['data'][0]['value'] = t_c
+            else:
+                gauge = SNAPSHOTS.get(('gauge', gen), lambda: _gauge_figure(t_c).to_dict())
+
+            # Graph. Live (or a recent preset at raw resolution): the full figure
+            # on first load or a view change, then extendData with just the new
+            # points (see live_extend). Longer presets: rollup means or stored
+            # rows for the range, redrawn when a new bucket starts. A zoom or pan
+            # re-queries only the visible range at a resolution for the plot width.
+            width_px = width_px or cfg.get('chart_width_px', 1000)
+            budget = point_budget(width_px, cfg.get('chart_points_per_px', 2.0))
+            resync = bool((ev or {}).get('resync'))
+            preset = preset if preset in RANGE_PRESETS else 'live'
+            zoom = (cursor or {}).get('zoom')
+            if ctx.triggered_id == 'graph-range':
+                zoom = None
+            elif ctx.triggered_id == 'graph-temp':
+                moved = _relayout_range(relayout)
+                if moved is None:
+                    return (no_update,) * 8
+                zoom = None if moved == 'reset' else moved
+            uirev = 'history-' + preset  # a new preset resets the axes; zoom re-queries keep them
+            fig = ext = no_update
+            if zoom:
+                key = ['zoom', preset, zoom, budget]
+                if resync or not cursor or cursor.get('key') != key:
+                    fig = SNAPSHOTS.get(('zoom', round(zoom[0], 3), round(zoom[1], 3), width_px, budget), lambda: (
+                        _range_figure(zoom[0], zoom[1], width_px, budget, storage, uirev)[0].to_dict()))
+                cursor = {'key': key, 'zoom': zoom}
+            else:
+                span = RANGE_PRESETS.get(preset, LIVE.window_sec)
+                res = _pick_res(last_epoch - span, last_epoch, width_px)
+                key = [preset, res, span, budget]
+                if res == 0 and span <= LIVE.window_sec:
+                    since = last_epoch - span if preset != 'live' else None
+                    tail, cursor = (None, None) if resync else live_extend(cursor, budget, key, x_of=local_ms, since=since)
+                    if cursor is None:
+                        fig, cursor = SNAPSHOTS.get(('raw', gen) + tuple(key),
+                                                    lambda: _raw_snapshot(key, budget, since, uirev))
+                    elif tail is not None:
+                        ext = tail
+                else:
+                    marker = SNAPSHOTS.get(('newest', gen, res), lambda: _newest_marker(res, last_epoch))
+                    if resync or not cursor or cursor.get('key') != key or cursor.get('buckets') != marker:
+                        t1 = max(time.time(), last_epoch) + 1.0
+                        fig = SNAPSHOTS.get(('range', str(marker), width_px) + tuple(key), lambda: (
+                            _range_figure(t1 - 1.0 - span, t1, width_px, budget, storage, uirev)[0].to_dict()))
+                    cursor = {'key': key, 'buckets': marker}
 
             # Metrics
-            probes = len((finder.list_probes() or {}))
-            logging_status = 'ON' if cfg.get('pull_enabled', True) else 'OFF'
-            last_dt = datetime.datetime.fromisoformat(ts)
+            probes, logging_status = SNAPSHOTS.get(('metrics', gen), lambda: (
+                len((finder.list_probes() or {})), 'ON' if cfg.get('pull_enabled', True) else 'OFF'))
             delta = (datetime.datetime.now() - last_dt).total_seconds()
             hb = (f'Last sync {int(delta)} s ago'
                   if delta < 60 else
@@ -134,7 +336,7 @@ def register_dashboard_callbacks(app, finder, cfg):
             if delta < 10:
                 hb += ' ✓'
 
-            return gauge, fig, probes, ts, logging_status, hb
+            return gauge, fig, ext, cursor, probes, ts, logging_status, hb
 
         except Exception:
             empty = go.Figure()
@@ -144,14 +346,11 @@ def register_dashboard_callbacks(app, finder, cfg):
                 xaxis={'visible': False},
                 yaxis={'visible': False}
             )
-            return empty, empty, '0', '(no data)', 'OFF', 'No signal'
+            return empty, empty, no_update, None, '0', '(no data)', 'OFF', 'No signal'
 
     # --- CSV Download Button ---
     @app.callback(Output('download-btn', 'href'),
                   Input('dash-refresh', 'n_intervals'))
     def _csv_link(_):
-        try:
-            path = quote(str(CSV_FILE))
-            return f'/download/{path}'
-        except Exception:
-            return None
+        # Streamed export (gzip, resumable when unfiltered); see api/routes.py
+        return '/api/export.csv'
@@ -9,8 +9,17 @@ DevicesLayout = html.Div([
 ])
 
 def register_devices_callbacks(app, finder):
-    @app.callback(Output('device-grid', 'children'), Input('device-refresh', 'n_intervals'))
-    def update_devices(_):
+    # Connected to /api/stream: redraw on probe events, and only poll slowly so
+    # the "x s ago" labels still age.
+    app.clientside_callback(
+        "function(s) { return s && s.connected ? 30000 : 5000; }",
+        Output('device-refresh', 'interval'),
+        Input('stream-state', 'data')
+    )
+
+    @app.callback(Output('device-grid', 'children'), Input('device-refresh', 'n_intervals'),
+                  Input('stream-probes', 'data'))
+    def update_devices(_n, _ev):
         try:
             probes = (finder.list_probes() or {}).values()
             cards = []
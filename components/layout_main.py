@@ -44,13 +44,18 @@ FOOTER = html.Footer(
 
 LAYOUT = html.Div([
     dcc.Location(id='url', refresh=False),
+    # Filled by assets/stream.js from /api/stream; page callbacks listen to these
+    # instead of polling. The page Intervals are the fallback while disconnected.
+    dcc.Store(id='stream-state', data={'connected': False}),
+    dcc.Store(id='stream-readings'),
+    dcc.Store(id='stream-probes'),
     NAVBAR,
     html.Div(id='page-content', className='p-4'),
     HelpModal(),
     FOOTER
 ])
 
-def register_all_callbacks(app, finder, cfg):
+def register_all_callbacks(app, finder, cfg, storage=None):
     from components.dashboard_view import register_dashboard_callbacks
-    register_dashboard_callbacks(app, finder, cfg)
+    register_dashboard_callbacks(app, finder, cfg, storage)
     register_devices_callbacks(app, finder)
@@ -119,12 +119,19 @@ def register_probe_callbacks(app, discovery, cfg):
     except Exception:
         pass
 
+    app.clientside_callback(
+        "function(s) { return s && s.connected ? 30000 : 5000; }",
+        Output("probe-refresh", "interval"),
+        Input("stream-state", "data")
+    )
+
     @app.callback(
         Output("probe-list", "children"),
         Input("probe-refresh", "n_intervals"),
+        Input("stream-probes", "data"),
         prevent_initial_call=False
     )
-    def _refresh_list(_):
+    def _refresh_list(_n, _ev):
         try:
             entries = []
             for p in (discovery.list_probes() or {}).values():
@@ -1,35 +1,69 @@
+import bisect
+import time
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from dash import html, dcc, Input, Output, no_update
+from dash import html, dcc, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 
+from core.live_buffer import LIVE
+from core.downsample import lttb_indices, point_budget
+from core.snapcache import SNAPSHOTS
+
 # ---- UI section -------------------------------------------------------------
 GraphSection = dbc.Card(
     dbc.CardBody([
         html.H5("Temperature Graph"),
         html.Div(id="probe-badges", className="mb-2"),
         dcc.Graph(id="temp-graph", config={"displayModeBar": False}),
+        dcc.Store(id="temp-graph-cursor"),
     ])
 )
 
 # ---- Helpers ----------------------------------------------------------------
 
-def _safe_read(csv_file: Path) -> pd.DataFrame:
-    try:
-        df = pd.read_csv(csv_file)
-        for col in ("timestamp", "temperature_c", "temperature_f"):
-            if col not in df.columns:
-                return pd.DataFrame(columns=["timestamp","temperature_c","temperature_f","probe_id"])  # empty
-        if "probe_id" not in df.columns:
-            df["probe_id"] = "(default)"
-        return df
-    except Exception:
+def _live_frame(window: dict | None = None) -> pd.DataFrame:
+    """Recent readings from the in-memory live buffer (no disk I/O).
+
+    Rows come out sorted by probe id (the trace order live_cursor assumes),
+    then time; `_t` is epoch seconds, so nothing downstream has to parse
+    timestamps again.
+    """
+    ts, c, pids = [], [], []
+    for pid, (xs, ys) in sorted((LIVE.window() if window is None else window).items()):
+        ts.extend(xs)
+        c.extend(ys)
+        pids.extend([pid or "(default)"] * len(xs))
+    if not ts:
         return pd.DataFrame(columns=["timestamp","temperature_c","temperature_f","probe_id"])  # empty
+    t = np.asarray(ts, dtype=np.float64)
+    df = pd.DataFrame({"_t": t, "temperature_c": c, "probe_id": pids})
+    # epoch -> local wall-clock datetime64 (each point with its own UTC offset)
+    df["timestamp"] = pd.to_datetime(t + utc_offsets(t), unit="s")
+    df["temperature_f"] = df["temperature_c"] * 9.0 / 5.0 + 32.0
+    return df
+
+
+def utc_offsets(ts) -> np.ndarray:
+    """Local UTC offset (seconds) at each epoch in `ts`, DST included.
+
+    Zone rules only change on a quarter hour, so the offset is looked up once
+    per distinct quarter hour in the data (a handful for a live window).
+    This is the inverse of reading a naive local time back with
+    datetime.timestamp(), as dashboard_view._axis_epoch does.
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    if not len(ts):
+        return np.zeros(0)
+    quarters, inverse = np.unique(np.floor(ts / 900.0), return_inverse=True)
+    offsets = np.array([time.localtime(q * 900.0).tm_gmtoff for q in quarters.tolist()], dtype=np.float64)
+    return offsets[inverse.reshape(ts.shape)]
 
 
-def _build_figure(df: pd.DataFrame) -> go.Figure:
+def _build_figure(df: pd.DataFrame, max_points: int | None = None) -> go.Figure:
     fig = go.Figure()
+    max_points = max_points or point_budget()
 
     if df.empty:
         fig.update_layout(
@@ -42,24 +76,25 @@ def _build_figure(df: pd.DataFrame) -> go.Figure:
         )
         return fig
 
-    df = df.copy()
-    df["_ts"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df = df.sort_values(["probe_id", "_ts"]).drop(columns=["_ts"])
-
-    for pid, chunk in df.groupby("probe_id"):
+    for pid, chunk in df.groupby("probe_id", sort=False):
+        if len(chunk) > max_points:
+            # LTTB keeps spikes visible while capping the points sent per trace
+            idx = lttb_indices(chunk["_t"].to_numpy(), chunk["temperature_c"].to_numpy(), max_points)
+            chunk = chunk.iloc[idx]
         label = str(pid).strip() if pd.notna(pid) and str(pid).strip() else "(default)"
         fig.add_trace(go.Scatter(
-            x=chunk["timestamp"], y=chunk["temperature_c"],
+            # local epoch ms / float32: sent as base64 typed arrays, not JSON lists
+            x=chunk["timestamp"].to_numpy(dtype="datetime64[ms]").astype(np.float64),
+            y=chunk["temperature_c"].to_numpy(dtype=np.float32),
             mode="lines+markers",
             name=label,
             line=dict(width=2),
             marker=dict(size=6),
             hovertemplate=(
-                "<b>%{text}</b><br>"  # probe id
+                f"<b>{label}</b><br>"
                 "%{x|%Y-%m-%d %H:%M:%S}<br>"
                 "%{y:.2f} °C<extra></extra>"
             ),
-            text=[label] * len(chunk),
         ))
 
     fig.update_layout(
@@ -68,6 +103,7 @@ def _build_figure(df: pd.DataFrame) -> go.Figure:
         height=360,
         legend_title_text="Probe",
         xaxis_title="Time",
+        xaxis_type="date",
         yaxis_title="Temperature (°C)",
     )
     fig.update_xaxes(showgrid=False)
@@ -75,18 +111,89 @@ def _build_figure(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+def live_cursor(window: dict, key=None) -> dict:
+    """What the client holds after a full figure built from LIVE `window`: trace
+    order (sorted probe ids), newest epoch per trace, points appended since."""
+    pids = sorted(window)
+    return {"key": key, "pids": pids, "sent": 0,
+            "last": {pid: (window[pid][0][-1] if window[pid][0] else None) for pid in pids}}
+
+
+def live_extend(cursor: dict | None, max_points: int, key=None, x_of=None, since: float | None = None):
+    """Incremental update for live traces: only the points newer than the client's
+    cursor, as a dcc.Graph `extendData` value ({"x": [...], "y": [...]}, trace
+    indices, maxPoints).
+
+    Returns (extendData or None when nothing is new, new cursor), or (None, None)
+    when a full figure is due instead: first load, another window/width `key`, a
+    probe appeared or vanished, or the raw tail appended since the last full
+    figure reached max_points / 2 and the trace needs downsampling again.
+    `x_of` maps a list of epoch seconds to x values; `since` must be the one
+    the full figure was built with (LIVE.window(since=...)), or quiet probes
+    would have their old points sent again.
+    """
+    if not cursor or cursor.get("key") != key:
+        return None, None
+    window = LIVE.window(since=since)
+    pids = cursor["pids"]
+    if sorted(window) != pids:
+        return None, None
+    last = dict(cursor["last"])
+    xs, ys, idx, n = [], [], [], 0
+    for i, pid in enumerate(pids):
+        t, v = window[pid]
+        k = bisect.bisect_right(t, last[pid]) if last.get(pid) is not None else 0
+        if k < len(t):
+            xs.append(x_of(t[k:]) if x_of else t[k:])
+            ys.append(v[k:])
+            idx.append(i)
+            last[pid] = t[-1]
+            n += len(t) - k
+    sent = cursor.get("sent", 0) + n
+    if sent > max_points // 2:
+        return None, None
+    new = dict(cursor, last=last, sent=sent)
+    if not idx:
+        return None, new
+    # maxPoints leaves room for the whole raw tail on top of the LTTB-reduced
+    # trace: capping at max_points would drop a downsampled point (covering
+    # several seconds) per appended raw one and shrink the visible window
+    return ({"x": xs, "y": ys}, idx, max_points + max_points // 2), new
+
+
+def _full_snapshot(key, max_points):
+    window = LIVE.window()
+    return _build_figure(_live_frame(window), max_points).to_dict(), live_cursor(window, key)
+
+
+def typed_xy(ts, vs):
+    """Trace arrays that Plotly serializes as base64 typed arrays ("bdata"):
+    x as float64 epoch milliseconds shifted to local wall-clock time (the axis
+    is type="date"), y as float32, which is plenty for a temperature. JSON
+    lists of ISO strings and float64 reprs are ~5x larger."""
+    ts = np.asarray(ts, dtype=np.float64)
+    return (ts + utc_offsets(ts)) * 1000.0, np.asarray(vs, dtype=np.float32)
+
+
+def local_ms(ts):
+    """extendData x values: typed_xy's axis units, as a plain list."""
+    return typed_xy(ts, ())[0].tolist()
+
+
+def _local_x(ts):
+    ts = np.asarray(ts, dtype=np.float64)
+    return pd.to_datetime(ts + utc_offsets(ts), unit="s")
+
+
 def _badge_row(df: pd.DataFrame):
     if df.empty:
         return html.Small("(no data yet)", className="text-muted")
 
-    last_by_probe = (
-        df.assign(_ts=pd.to_datetime(df["timestamp"], errors="coerce"))
-          .sort_values(["probe_id","_ts"]).groupby("probe_id").tail(1)
-    )
+    last_by_probe = df.groupby("probe_id", sort=False).tail(1)  # rows are already in time order
     badges = []
     for _, row in last_by_probe.iterrows():
         pid = str(row.get("probe_id", "(default)"))
-        ts  = str(row.get("timestamp", ""))
+        ts  = pd.Timestamp(row["timestamp"]).isoformat(timespec="seconds") if "timestamp" in row else ""
         c   = row.get("temperature_c", None)
         label = f"{pid} — {ts}"
         title = f"Last: {c:.2f}°C at {ts}" if c is not None else label
@@ -99,10 +206,24 @@ def _badge_row(df: pd.DataFrame):
 def register_callbacks(app, csv_path: Path):
     @app.callback(
         Output("temp-graph", "figure"),
+        Output("temp-graph", "extendData"),
+        Output("temp-graph-cursor", "data"),
         Output("probe-badges", "children"),
         Input("ui-refresh", "n_intervals"),
+        State("temp-graph-cursor", "data"),
         prevent_initial_call=False,
     )
-    def _refresh(_n):
-        df = _safe_read(csv_path)
-        return _build_figure(df), _badge_row(df)
+    def _refresh(_n, cursor):
+        # Steady state: append just the new points (payload ~ new readings);
+        # the full figure goes out on first load and when live_extend asks for it.
+        max_points = point_budget()
+        key = [LIVE.window_sec, max_points]
+        ext, new_cursor = live_extend(cursor, max_points, key, x_of=local_ms)
+        badges = _badge_row(pd.DataFrame(
+            [(pid or "(default)", _local_x([t])[0], c, t) for pid, (t, c) in LIVE.last_by_probe().items()],
+            columns=["probe_id", "timestamp", "temperature_c", "_t"]))
+        if new_cursor is not None:
+            return no_update, (ext if ext is not None else no_update), new_cursor, badges
+        fig, new_cursor = SNAPSHOTS.get(("temp-graph", SNAPSHOTS.version(LIVE.generation)) + tuple(key),
+                                        lambda: _full_snapshot(key, max_points))
+        return fig, no_update, new_cursor, badges
@@ -0,0 +1,100 @@
+# core/binproto.py
+"""
+Compact binary ingest format for probes.
+
+The body is a plain concatenation of fixed-size little-endian records with no
+header. The Content-Type selects the layout:
+
+  application/x-temps-v1    12 bytes  "<IIhH"
+      u32  probe   CRC-32 of the probe id (UTF-8), see probe_hash()
+      u32  epoch   Unix seconds (UTC); 0 = "use the hub's arrival time"
+      i16  temp    centi-degrees C (2150 = 21.50 °C; range ±327.67 °C)
+      u16  seq     per-probe sequence number (wraps at 65536)
+
+  application/x-temps-v1f   14 bytes  "<IIfH"
+      same, but temp is a float32 in °C (use for thermocouples above 327 °C)
+
+The hub decodes with struct.iter_unpack over a memoryview of the body, so no
+per-record slicing or copying happens. encode_records() is the reference encoder.
+"""
+from __future__ import annotations
+import struct, threading, zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Tuple
+
+CONTENT_TYPES: Dict[str, Tuple[str, float]] = {
+    "application/x-temps-v1": ("<IIhH", 0.01),
+    "application/x-temps-v1f": ("<IIfH", 1.0),
+}
+
+# (probe_id, epoch seconds, °C, seq)
+Record = Tuple[str, int, float, int]
+
+# hash -> probe id, least recently used first. Seeded at startup from the ids
+# already in storage and kept up to date from discovery (TXT id and name), so
+# binary-only probes keep their names across restarts.
+_names: "OrderedDict[int, str]" = OrderedDict()
+_names_lock = threading.Lock()
+_MAX_NAMES = 4096
+
+
+def probe_hash(probe_id: str) -> int:
+    return zlib.crc32(probe_id.encode("utf-8")) & 0xFFFFFFFF
+
+
+def remember(probe_id: str) -> int:
+    """Record probe_id so its hash can be mapped back when binary records arrive."""
+    h = probe_hash(probe_id)
+    with _names_lock:
+        if _names.get(h) != probe_id:
+            _names[h] = probe_id
+            if len(_names) > _MAX_NAMES:
+                _names.popitem(last=False)
+        else:
+            _names.move_to_end(h)
+    return h
+
+
+def remember_many(probe_ids: Iterable[str]) -> None:
+    for pid in probe_ids:
+        if pid and not pid.startswith("#"):
+            remember(pid)
+
+
+def resolve(h: int) -> str:
+    """Probe id for a hash; unknown hashes become "#1a2b3c4d"."""
+    name = _names.get(h)
+    if name is None:
+        return f"#{h:08x}"
+    with _names_lock:
+        if h in _names:
+            _names.move_to_end(h)
+    return name
+
+
+def layout(content_type: str | None):
+    """(struct format, scale) for a Content-Type, or None if it is not binary ingest."""
+    base = (content_type or "").split(";", 1)[0].strip().lower()
+    return CONTENT_TYPES.get(base)
+
+
+def decode(body: bytes, content_type: str) -> Iterator[Tuple[int, int, float, int]]:
+    """Yield (probe_hash, epoch, °C, seq). Raises ValueError on a truncated body."""
+    fmt, scale = CONTENT_TYPES[content_type.split(";", 1)[0].strip().lower()]
+    size = struct.calcsize(fmt)
+    if len(body) % size:
+        raise ValueError(f"body length {len(body)} is not a multiple of {size}")
+    if scale == 1.0:
+        return struct.iter_unpack(fmt, memoryview(body))
+    return ((h, t, raw * scale, seq) for h, t, raw, seq in struct.iter_unpack(fmt, memoryview(body)))
+
+
+def encode_records(records: Iterable[Record], content_type: str = "application/x-temps-v1") -> bytes:
+    """Reference encoder (what the firmware does), for tests and simulators."""
+    fmt, scale = CONTENT_TYPES[content_type]
+    pack = struct.Struct(fmt).pack
+    out = bytearray()
+    for probe_id, epoch, t_c, seq in records:
+        temp = round(t_c / scale) if scale != 1.0 else float(t_c)
+        out += pack(probe_hash(probe_id), int(epoch), temp, int(seq) & 0xFFFF)
+    return bytes(out)
@@ -7,7 +7,26 @@ class Config:
     def __init__(self, path: Path):
         self.path = path
         self.lock = threading.RLock()
-        self.data = {"interval_sec": 5, "pull_enabled": True, "auto_provision": True, "provision_token": ""}
+        self.data = {"interval_sec": 5, "pull_enabled": True, "auto_provision": True, "provision_token": "",
+                     # write-behind ingest queue (see core/writer.py)
+                     "writer_flush_interval_sec": 1.0, "writer_flush_rows": 500, "writer_queue_max": 20000,
+                     # in-memory live buffer for the dashboard (see core/live_buffer.py)
+                     "live_capacity": 3600, "live_window_sec": 3600, "live_max_probes": 256,
+                     # CSV follower feeding the live buffer (see core/tailer.py)
+                     "tail_interval_sec": 1.0, "tail_backfill_bytes": 4000000,
+                     # chart point budget per trace = plot width * points per px (see core/downsample.py)
+                     "chart_points_per_px": 2.0, "chart_width_px": 1000,
+                     # rollup buckets kept in memory per probe (see core/rollups.py)
+                     "rollup_keep_1m": 2880, "rollup_keep_1h": 2160, "rollup_keep_1d": 3650,
+                     # per-probe seq dedup for retried uploads (see core/dedup.py)
+                     "dedup_window": 1024, "dedup_max_probes": 4096,
+                     # ingest admission control (see core/ratelimit.py); 0 disables
+                     "ingest_rate_per_sec": 2.0, "ingest_burst": 10, "ingest_queue_high_water": 0.9,
+                     # /api/stream Server-Sent Events (see core/events.py)
+                     "stream_coalesce_ms": 500, "stream_heartbeat_sec": 15, "stream_max_clients": 32,
+                     "stream_refresh_ms": 2000,
+                     # shared dashboard figures/metrics per data version (see core/snapcache.py)
+                     "snapshot_cache_entries": 64, "snapshot_tick_ms": 1000}
         if self.path.exists():
             try:
                 self.data.update(json.loads(self.path.read_text(encoding="utf-8")))
@@ -0,0 +1,138 @@
+# core/dedup.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+SEQ_MOD_JSON = 1 << 32    # seq from JSON / X-Seq
+SEQ_MOD_BINARY = 1 << 16  # u16 seq in binary records (core/binproto.py)
+RESTART_SEQ = 16          # a jump back to a seq below this (from well above it) is a reboot
+RECENT_STAMPS = 64        # per probe: client timestamps of the latest seqs, to tell retries from reboots
+
+
+class _Window:
+    """High-water mark plus a bitset of the `window` seqs at and below it
+    (bit i set = seq high - i was received)."""
+    __slots__ = ("high", "bits", "stamps", "received", "duplicates", "lost", "late", "resets")
+
+    def __init__(self, seq: int):
+        self.high = seq
+        self.bits = 1
+        self.stamps: Dict[int, object] = {}  # seq -> the reading's own timestamp (insertion ordered)
+        self.received = 1
+        self.duplicates = 0
+        self.lost = 0      # seqs skipped and not (yet) filled in by a late arrival
+        self.late = 0      # out-of-order arrivals that filled a gap
+        self.resets = 0    # jumps too large to be loss (firmware reboot, counter reset)
+
+    def restart(self, seq: int):
+        self.high, self.bits = seq, 1
+        self.stamps.clear()
+        self.resets += 1
+
+    def stamp(self, seq: int, stamp) -> None:
+        if stamp is None:
+            return
+        self.stamps.pop(seq, None)
+        self.stamps[seq] = stamp
+        if len(self.stamps) > RECENT_STAMPS:
+            del self.stamps[next(iter(self.stamps))]
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"high": self.high, "received": self.received, "duplicates": self.duplicates,
+                "lost": self.lost, "late": self.late, "resets": self.resets}
+
+
+class SeqTracker:
+    """Per-probe duplicate filter for retried uploads.
+
+    O(1) per reading and bounded memory: each probe keeps one int bitset of
+    `window` bits, and at most `max_probes` probes are tracked (least recently
+    seen evicted). A seq more than `window` behind or ahead of the high-water
+    mark is taken as a counter reset and accepted.
+
+    A seq that was already seen is a retry only if it is really the same
+    reading. When the client sent its own timestamp (`stamp`) for both, they
+    must match; a different one means the probe rebooted and restarted its
+    counter. Without stamps, a jump back to a seq below RESTART_SEQ from well
+    above it is taken as a reboot too. A retry that late is rare, and storing
+    it twice is better than silently dropping post-reboot readings.
+    """
+    def __init__(self, window: int = 1024, max_probes: int = 4096):
+        self.lock = threading.Lock()
+        self._probes: "OrderedDict[str, _Window]" = OrderedDict()
+        self.configure(window, max_probes)
+
+    def configure(self, window: int | None = None, max_probes: int | None = None):
+        with self.lock:
+            if window is not None:
+                self.window = max(8, int(window))
+                self._mask = (1 << self.window) - 1
+            if max_probes is not None:
+                self.max_probes = max(1, int(max_probes))
+
+    def accept(self, probe_id: str, seq, mod: int = SEQ_MOD_JSON, stamp=None) -> bool:
+        """False if (probe_id, seq) was already seen; always True without a seq or probe id.
+
+        `stamp` is the reading's client-side timestamp, when it has one.
+        """
+        if seq is None or seq == "" or not probe_id:
+            return True
+        try:
+            seq = int(seq) % mod
+        except (TypeError, ValueError):
+            return True
+        with self.lock:
+            w = self._probes.get(probe_id)
+            if w is None:
+                w = self._probes[probe_id] = _Window(seq)
+                w.stamp(seq, stamp)
+                if len(self._probes) > self.max_probes:
+                    self._probes.popitem(last=False)
+                return True
+            self._probes.move_to_end(probe_id)
+            d = (seq - w.high) % mod
+            if d >= mod // 2:
+                d -= mod
+            if 0 < d <= self.window:
+                w.lost += d - 1
+                w.bits = ((w.bits << d) | 1) & self._mask
+                w.high = seq
+            elif -self.window < d <= 0:
+                bit = 1 << -d
+                if w.bits & bit:
+                    if not self._restarted(w, seq, stamp):
+                        w.duplicates += 1
+                        return False
+                    w.restart(seq)
+                else:
+                    w.bits |= bit
+                    w.lost = max(0, w.lost - 1)
+                    w.late += 1
+            else:
+                w.restart(seq)
+            w.stamp(seq, stamp)
+            w.received += 1
+            return True
+
+    @staticmethod
+    def _restarted(w: _Window, seq: int, stamp) -> bool:
+        # `seq` was seen before: a retry, or a rebooted probe counting again?
+        seen = w.stamps.get(seq)
+        if stamp is not None and seen is not None:
+            return stamp != seen
+        return seq < RESTART_SEQ <= w.high - seq
+
+    def stats(self, probe_id: Optional[str] = None) -> Dict[str, object]:
+        with self.lock:
+            if probe_id is not None:
+                w = self._probes.get(probe_id)
+                return w.as_dict() if w else {}
+            per = {pid: w.as_dict() for pid, w in self._probes.items()}
+        total = {k: sum(p[k] for p in per.values()) for k in ("received", "duplicates", "lost", "late", "resets")}
+        sent = total["received"] + total["lost"]
+        total["loss_ratio"] = round(total["lost"] / sent, 6) if sent else 0.0
+        return {"total": total, "probes": per}
+
+
+SEQS = SeqTracker()
@@ -0,0 +1,59 @@
+# core/downsample.py
+from __future__ import annotations
+import numpy as np
+
+DEFAULT_WIDTH_PX = 1000
+DEFAULT_POINTS_PER_PX = 2.0
+
+
+def point_budget(width_px: int | float | None = None, points_per_px: float | None = None,
+                 floor: int = 100) -> int:
+    """Points per trace for a plot `width_px` wide (more than ~2 per pixel is invisible)."""
+    width = float(width_px or DEFAULT_WIDTH_PX)
+    per_px = float(points_per_px or DEFAULT_POINTS_PER_PX)
+    return max(floor, int(width * per_px))
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the
+    visual shape of (x, y), spikes included. x must be sorted ascending.
+
+    Bucket bounds and next-bucket averages are computed with NumPy in one shot;
+    only the anchor hand-off between buckets is a Python loop (O(n_out)).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x - x[0]  # epoch seconds lose precision in the products below
+
+    # n_out - 2 buckets over the points between the fixed first and last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # mean of the *next* bucket for every bucket (the last one uses the final point)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    nxt_s = np.append(starts[1:], n - 1)
+    nxt_e = np.append(ends[1:], n)
+    cnt = nxt_e - nxt_s
+    avg_x = (cx[nxt_e] - cx[nxt_s]) / cnt
+    avg_y = (cy[nxt_e] - cy[nxt_s]) / cnt
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        s, e = starts[i], ends[i]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x[i]) * (y[s:e] - ay) - (ax - x[s:e]) * (avg_y[i] - ay))
+        a = s + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def lttb(x, y, n_out: int):
+    """Downsampled (x, y) as NumPy arrays; see lttb_indices."""
+    idx = lttb_indices(x, y, n_out)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
@@ -0,0 +1,150 @@
+# core/events.py
+from __future__ import annotations
+import json, threading, time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+class _Client:
+    __slots__ = ("q", "evt", "dropped", "closed")
+
+    def __init__(self, queue_len: int):
+        self.q: Deque[Tuple[str, Any]] = deque(maxlen=queue_len)
+        self.evt = threading.Event()
+        self.dropped = False   # the queue overflowed since the last drain
+        self.closed = False
+
+
+class EventBus:
+    """Fan-out of hub events to /api/stream (Server-Sent Events) clients.
+
+    publish() never blocks and never waits on a client: each connection has a
+    bounded queue, and a slow one loses its oldest events (the next message
+    then carries "resync": true so the page refetches instead of patching).
+    drain() coalesces whatever is queued into at most one `readings` and one
+    `probes` message, so a busy hub sends a couple of small frames per
+    interval rather than one per reading.
+    """
+    def __init__(self, max_clients: int = 32, queue_len: int = 5000, coalesce_sec: float = 0.5,
+                 heartbeat_sec: float = 15.0, refresh_ms: int = 2000):
+        self.lock = threading.Lock()
+        self._clients: List[_Client] = []
+        self.configure(max_clients, queue_len, coalesce_sec, heartbeat_sec, refresh_ms)
+        self.published = 0
+        self.refused = 0
+
+    def configure(self, max_clients: int | None = None, queue_len: int | None = None,
+                  coalesce_sec: float | None = None, heartbeat_sec: float | None = None,
+                  refresh_ms: int | None = None):
+        if max_clients is not None:
+            self.max_clients = max(1, int(max_clients))
+        if queue_len is not None:
+            self.queue_len = max(10, int(queue_len))
+        if coalesce_sec is not None:
+            self.coalesce_sec = max(0.0, float(coalesce_sec))
+        if heartbeat_sec is not None:
+            self.heartbeat_sec = max(1.0, float(heartbeat_sec))
+        if refresh_ms is not None:
+            self.refresh_ms = max(0, int(refresh_ms))
+
+    # --- producers ---
+    def publish(self, kind: str, data: Any) -> None:
+        with self.lock:
+            clients = list(self._clients)
+            self.published += 1
+        for c in clients:
+            if len(c.q) == c.q.maxlen:
+                c.dropped = True
+            c.q.append((kind, data))
+            c.evt.set()
+
+    def reading(self, probe_id: str, t: float, c: float) -> None:
+        """LiveBuffer subscriber: one accepted point."""
+        self.publish("reading", (probe_id, t, c))
+
+    def probes_changed(self, probes: Optional[Dict[str, Any]] = None) -> None:
+        """ProbeDiscovery.on_change: a probe appeared, vanished or came back."""
+        self.publish("probes", sorted(probes or {}))
+
+    # --- consumers ---
+    def open(self) -> Optional[_Client]:
+        """Register a client, or None when max_clients are already connected."""
+        with self.lock:
+            if len(self._clients) >= self.max_clients:
+                self.refused += 1
+                return None
+            c = _Client(self.queue_len)
+            self._clients.append(c)
+            return c
+
+    def close(self, client: _Client) -> None:
+        client.closed = True
+        client.evt.set()
+        with self.lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def close_all(self) -> None:
+        """Wake and end every stream (shutdown)."""
+        with self.lock:
+            clients, self._clients = self._clients, []
+        for c in clients:
+            c.closed = True
+            c.evt.set()
+
+    def drain(self, client: _Client, generation: int = 0) -> str:
+        """Queued events as SSE text ("" if none)."""
+        client.evt.clear()
+        rows: List[list] = []
+        probes: Optional[List[str]] = None
+        while client.q:
+            try:
+                kind, data = client.q.popleft()
+            except IndexError:
+                break
+            if kind == "reading":
+                pid, t, c = data
+                rows.append([pid, round(t, 3), c])
+            elif kind == "probes":
+                probes = data
+        resync, client.dropped = client.dropped, False
+        out = []
+        if rows or resync:
+            out.append(sse("readings", {"gen": generation, "rows": rows, "resync": resync}))
+        if probes is not None or resync:
+            out.append(sse("probes", {"probes": probes or [], "t": round(time.time(), 3)}))
+        return "".join(out)
+
+    def hello(self, generation: int) -> str:
+        # refresh_ms: the page applies `readings` at most this often (assets/stream.js)
+        return sse("hello", {"gen": generation, "retry_ms": 3000, "refresh_ms": self.refresh_ms}, retry=3000)
+
+    def stream(self, client: _Client, generation=lambda: 0) -> Iterator[str]:
+        """Blocking SSE generator for a WSGI response; closes the client when done."""
+        try:
+            yield self.hello(generation())
+            while not client.closed:
+                if not client.evt.wait(self.heartbeat_sec):
+                    yield ": ping\n\n"  # keeps proxies from timing out; detects gone clients
+                    continue
+                if self.coalesce_sec:
+                    time.sleep(self.coalesce_sec)  # gather a burst into one frame
+                chunk = self.drain(client, generation())
+                if chunk:
+                    yield chunk
+        finally:
+            self.close(client)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"clients": len(self._clients), "published": self.published, "refused": self.refused}
+
+
+def sse(event: str, data: Any, retry: Optional[int] = None) -> str:
+    head = f"retry: {retry}\n" if retry else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+EVENTS = EventBus()
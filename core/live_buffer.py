@@ -0,0 +1,159 @@
+# core/live_buffer.py
+from __future__ import annotations
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.storage import ts_to_epoch
+
+Series = Tuple[List[float], List[float]]  # (epoch seconds, °C), oldest first
+
+
+class _Ring:
+    """Fixed-capacity ring of (epoch seconds, °C) backed by two double arrays."""
+    __slots__ = ("ts", "val", "head", "size")
+
+    def __init__(self, capacity: int):
+        self.ts = array("d", bytes(8 * capacity))
+        self.val = array("d", bytes(8 * capacity))
+        self.head = 0   # next write slot
+        self.size = 0
+
+    def _at(self, i: int) -> int:
+        # physical slot of the i-th oldest point
+        cap = len(self.ts)
+        return (self.head - self.size + i) % cap
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        if not self.size:
+            return None
+        j = (self.head - 1) % len(self.ts)
+        return self.ts[j], self.val[j]
+
+    def append(self, t: float, v: float) -> bool:
+        # Keep the ring sorted by time so reads can bisect; late points are dropped,
+        # and so is an exact repeat of the newest point (the same row seen by
+        # both the ingest path and the CSV tailer).
+        last = self.last()
+        if last is not None and (t < last[0] or (t == last[0] and v == last[1])):
+            return False
+        cap = len(self.ts)
+        self.ts[self.head] = t
+        self.val[self.head] = v
+        self.head = (self.head + 1) % cap
+        if self.size < cap:
+            self.size += 1
+        return True
+
+    def since(self, t0: float) -> Series:
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[self._at(mid)] < t0:
+                lo = mid + 1
+            else:
+                hi = mid
+        idx = [self._at(i) for i in range(lo, self.size)]
+        return [self.ts[j] for j in idx], [self.val[j] for j in idx]
+
+
+class LiveBuffer:
+    """Process-wide recent readings, one ring per probe.
+
+    Memory is bounded by capacity * max_probes regardless of the log size;
+    reads return at most the last `window_sec` seconds per probe.
+    """
+    def __init__(self, capacity: int = 3600, window_sec: float = 3600.0, max_probes: int = 256):
+        self.lock = threading.Lock()
+        self._rings: "OrderedDict[str, _Ring]" = OrderedDict()
+        self.generation = 0  # bumped on every accepted point
+        self._subs: List[Callable[[str, float, float], None]] = []
+        self.configure(capacity, window_sec, max_probes)
+
+    def configure(self, capacity: int | None = None, window_sec: float | None = None, max_probes: int | None = None):
+        with self.lock:
+            if capacity is not None and int(capacity) != getattr(self, "capacity", None):
+                self.capacity = max(2, int(capacity))
+                self._rings.clear()
+            if window_sec is not None:
+                self.window_sec = max(1.0, float(window_sec))
+            if max_probes is not None:
+                self.max_probes = max(1, int(max_probes))
+
+    # --- writers ---
+    def append(self, probe_id: str | None, ts, t_c: float) -> bool:
+        """Add one reading; `ts` may be an ISO string or epoch seconds."""
+        pid = probe_id or ""
+        try:
+            t = ts_to_epoch(ts)
+            v = round(float(t_c), 3)  # the precision written to the log
+        except Exception:
+            return False
+        with self.lock:
+            ring = self._rings.get(pid)
+            if ring is None:
+                if len(self._rings) >= self.max_probes:
+                    self._rings.popitem(last=False)  # evict the least recently updated probe
+                ring = self._rings[pid] = _Ring(self.capacity)
+            else:
+                self._rings.move_to_end(pid)
+            ok = ring.append(t, v)
+            if ok:
+                self.generation += 1
+        if ok:
+            for fn in self._subs:
+                try:
+                    fn(pid, t, v)
+                except Exception:
+                    pass
+        return ok
+
+    def subscribe(self, fn: Callable[[str, float, float], None]) -> None:
+        """Call fn(probe_id, epoch, °C) for every accepted point (e.g. the /api/stream bus)."""
+        self._subs.append(fn)
+
+    def extend(self, rows: Iterable[Tuple[str, object, float]]) -> int:
+        return sum(1 for pid, ts, t_c in rows if self.append(pid, ts, t_c))
+
+    def add_rows(self, rows: Iterable[Tuple[str, float, float, str]]) -> int:
+        """Subscriber for CsvTailer: rows are (timestamp, °C, °F, probe_id)."""
+        return self.extend((pid, ts, t_c) for ts, t_c, _t_f, pid in rows)
+
+    # --- readers ---
+    def probes(self) -> List[str]:
+        with self.lock:
+            return list(self._rings.keys())
+
+    def latest(self) -> Optional[Tuple[str, float, float]]:
+        """Newest reading across all probes as (probe_id, epoch, °C)."""
+        best = None
+        with self.lock:
+            for pid, ring in self._rings.items():
+                last = ring.last()
+                if last and (best is None or last[0] > best[1]):
+                    best = (pid, last[0], last[1])
+        return best
+
+    def last_by_probe(self) -> Dict[str, Tuple[float, float]]:
+        with self.lock:
+            return {pid: ring.last() for pid, ring in self._rings.items() if ring.size}
+
+    def window(self, probe_id: str | None = None, since: float | None = None) -> Dict[str, Series]:
+        """Per-probe series within the retained window (optionally narrowed by `since`)."""
+        with self.lock:
+            items = [(probe_id, self._rings[probe_id])] if probe_id in self._rings else (
+                [] if probe_id is not None else list(self._rings.items()))
+            out: Dict[str, Series] = {}
+            for pid, ring in items:
+                last = ring.last()
+                if last is None:
+                    continue
+                t0 = last[0] - self.window_sec
+                if since is not None:
+                    t0 = max(t0, since)
+                out[pid] = ring.since(t0)
+            return out
+
+
+LIVE = LiveBuffer()
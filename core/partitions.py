@@ -0,0 +1,219 @@
+# core/partitions.py
+from __future__ import annotations
+import datetime, itertools, json, os, threading, time, zlib
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from core.storage import Row, Storage, append_csv_rows, iter_csv_file, iter_csv_from, ts_to_epoch
+
+
+class PartitionedCsvStorage(Storage):
+    """Daily CSV partitions (logs/2026-10-17.csv) described by logs/manifest.json.
+
+    A day also rolls over to 2026-10-17.1.csv, .2.csv, ... once its file passes
+    `max_bytes` (0 = no size limit). The manifest records each partition's time
+    range, row count and probes, so range reads open only overlapping files and
+    retention deletes whole files. New partitions use the compact CSV layout
+    (ts_ms, temperature_c, probe_id) unless schema="legacy".
+
+    The in-memory manifest is updated on every append but written to disk only
+    when a partition is added, every `manifest_save_sec`, and on close(). After
+    a crash, entries whose file grew past the recorded size are caught up from
+    the tail at the next start.
+    """
+    name = "partitioned"
+    time_ordered = False  # each file is in arrival order
+    MANIFEST = "manifest.json"
+
+    def __init__(self, log_dir: Path, max_bytes: int = 0, retention_days: int = 0, schema: str = "compact",
+                 manifest_save_sec: float = 30.0):
+        self.log_dir = Path(log_dir)
+        self.schema = schema
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self.retention_days = max(0, int(retention_days or 0))
+        self.lock = threading.Lock()
+        self._parts: Dict[str, dict] = {}    # file name -> manifest entry
+        self._current: Dict[str, str] = {}   # day -> file currently appended to
+        self.manifest_save_sec = max(0.0, float(manifest_save_sec))
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._load_manifest()
+
+    # --- manifest ---
+    @property
+    def manifest_path(self) -> Path:
+        return self.log_dir / self.MANIFEST
+
+    def _load_manifest(self):
+        try:
+            entries = json.loads(self.manifest_path.read_text(encoding="utf-8")).get("partitions", [])
+            self._parts = {e["file"]: e for e in entries if (self.log_dir / e["file"]).exists()}
+        except Exception:
+            self._parts = {}
+        # Rebuild entries for partitions the manifest does not know about (or a lost manifest).
+        dirty = False
+        for path in sorted(self.log_dir.glob("*.csv")):
+            if path.name not in self._parts:
+                self._parts[path.name] = self._scan(path)
+                dirty = True
+            elif self._parts[path.name]["bytes"] != path.stat().st_size:
+                self._catch_up(path, self._parts[path.name])  # appended after the last save
+                dirty = True
+        for name in sorted(self._parts, key=_part_order):
+            self._current[self._parts[name]["day"]] = name
+        if dirty or not self.manifest_path.exists():
+            self._save_manifest()
+
+    def _save_manifest(self):
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        entries = sorted(self._parts.values(), key=lambda e: _part_order(e["file"]))
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"partitions": entries}, indent=1), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def _scan(self, path: Path) -> dict:
+        entry = _new_entry(path.name)
+        for ts, _t_c, _t_f, pid in iter_csv_file(path):
+            try:
+                _widen(entry, ts_to_epoch(ts), pid)
+            except ValueError:
+                continue
+            entry["rows"] += 1
+        entry["bytes"] = path.stat().st_size
+        return entry
+
+    def _catch_up(self, path: Path, entry: dict) -> None:
+        size = path.stat().st_size
+        if size < entry["bytes"]:  # rewritten or truncated: scan it all again
+            entry.clear()
+            entry.update(self._scan(path))
+            return
+        for _end, (ts, _t_c, _t_f, pid) in iter_csv_from(path, offset=entry["bytes"]):
+            try:
+                _widen(entry, ts_to_epoch(ts), pid)
+            except ValueError:
+                continue
+            entry["rows"] += 1
+        entry["bytes"] = size
+
+    def partitions(self) -> List[dict]:
+        with self.lock:
+            return [dict(e) for e in sorted(self._parts.values(), key=lambda e: _part_order(e["file"]))]
+
+    def version(self):
+        with self.lock:
+            parts = sorted((e["file"], e["bytes"]) for e in self._parts.values())
+        return f"{zlib.crc32(repr(parts).encode()):08x}-{sum(b for _f, b in parts):x}"
+
+    # --- writes ---
+    def _file_for(self, day: str) -> str:
+        name = self._current.get(day) or f"{day}.csv"
+        entry = self._parts.get(name)
+        if self.max_bytes and entry and entry["bytes"] >= self.max_bytes:
+            seq = int(entry["seq"]) + 1
+            name = f"{day}.{seq}.csv"
+        self._current[day] = name
+        return name
+
+    def append_many(self, rows: List[Row]) -> None:
+        by_day: Dict[str, List[tuple]] = {}
+        for row in rows:
+            try:
+                t = ts_to_epoch(row[0])
+            except ValueError:
+                t = time.time()
+            day = datetime.date.fromtimestamp(t).isoformat()
+            by_day.setdefault(day, []).append((t, row))
+        with self.lock:
+            new_file = False
+            for day, items in sorted(by_day.items()):
+                name = self._file_for(day)
+                path = self.log_dir / name
+                append_csv_rows(path, [r for _t, r in items], self.schema)
+                entry = self._parts.get(name)
+                if entry is None:
+                    entry = self._parts[name] = _new_entry(name)
+                    new_file = True
+                for t, r in items:
+                    _widen(entry, t, r[3] or "")
+                entry["rows"] += len(items)
+                entry["bytes"] = path.stat().st_size
+            self._dirty = True
+            if new_file:
+                self._prune()
+            if new_file or time.monotonic() - self._saved_at >= self.manifest_save_sec:
+                self._save_manifest()
+
+    def close(self) -> None:
+        with self.lock:
+            if self._dirty:
+                self._save_manifest()
+
+    def _prune(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for name, entry in list(self._parts.items()):
+            if entry["end"] is not None and entry["end"] < cutoff:
+                try:
+                    (self.log_dir / name).unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue  # e.g. open in Excel; try again on the next rotation
+                del self._parts[name]
+                if self._current.get(entry["day"]) == name:
+                    del self._current[entry["day"]]
+
+    # --- reads ---
+    def _select(self, probe_id=None, t0=None, t1=None) -> List[str]:
+        with self.lock:
+            entries = list(self._parts.values())
+        keep = []
+        for e in entries:
+            if e["start"] is None:
+                continue
+            if t0 is not None and e["end"] < t0:
+                continue
+            if t1 is not None and e["start"] >= t1:
+                continue
+            if probe_id is not None and probe_id not in e["probes"]:
+                continue
+            keep.append(e)
+        return [e["file"] for e in sorted(keep, key=lambda e: (e["start"], _part_order(e["file"])))]
+
+    def iter_rows(self, probe_id=None, t0=None, t1=None) -> Iterator[Row]:
+        files = self._select(probe_id, t0, t1)
+        return itertools.chain.from_iterable(iter_csv_file(self.log_dir / f, probe_id, t0, t1) for f in files)
+
+    def iter_positions(self, probe_id=None, t0=None, t1=None, pos=None):
+        # Partitions in name order (day, then rollover seq): stable while
+        # files grow, unlike the start times iter_rows sorts by.
+        files = sorted(self._select(probe_id, t0, t1), key=_part_order)
+        if pos:
+            start = _part_order(pos[0])
+            files = [f for f in files if _part_order(f) >= start]
+        for name in files:
+            offset = int(pos[1]) if pos and name == pos[0] else 0
+            for end, row in iter_csv_from(self.log_dir / name, probe_id, t0, t1, offset):
+                yield [name, end], row
+
+
+def _part_order(name: str):
+    # "2026-10-17.csv" < "2026-10-17.1.csv" < "2026-10-17.2.csv" < "2026-10-18.csv"
+    parts = name[:-4].split(".")
+    return parts[0], int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+
+def _new_entry(name: str) -> dict:
+    day, seq = _part_order(name)
+    return {"file": name, "day": day, "seq": seq, "start": None, "end": None, "rows": 0, "probes": [], "bytes": 0}
+
+
+def _widen(entry: dict, t: float, probe_id: str) -> None:
+    entry["start"] = t if entry["start"] is None else min(entry["start"], t)
+    entry["end"] = t if entry["end"] is None else max(entry["end"], t)
+    if probe_id not in entry["probes"]:
+        entry["probes"].append(probe_id)
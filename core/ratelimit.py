@@ -0,0 +1,73 @@
+# core/ratelimit.py
+from __future__ import annotations
+import math, threading, time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class IngestLimiter:
+    """Token bucket per probe id (or client IP when a request has no id).
+
+    Each key earns `rate_per_sec` tokens up to `burst`; a request spends one.
+    An empty bucket means the caller should come back after the returned
+    number of seconds (HTTP 429 + Retry-After). Memory is bounded by
+    `max_keys` (least recently seen evicted). rate_per_sec <= 0 disables it.
+    """
+    def __init__(self, rate_per_sec: float = 2.0, burst: float = 10, max_keys: int = 4096):
+        self.lock = threading.Lock()
+        # key -> [tokens, last refill, throttled count, last throttled at]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.throttled = 0
+        self.queue_full = 0
+        self.configure(rate_per_sec, burst, max_keys)
+
+    def configure(self, rate_per_sec: float | None = None, burst: float | None = None, max_keys: int | None = None):
+        with self.lock:
+            if rate_per_sec is not None:
+                self.rate = max(0.0, float(rate_per_sec))
+            if burst is not None:
+                self.burst = max(1.0, float(burst))
+            if max_keys is not None:
+                self.max_keys = max(1, int(max_keys))
+
+    def admit(self, key: str, now: Optional[float] = None) -> float:
+        """0.0 if the request may proceed, else seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = [self.burst, now, 0, 0.0]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                b[0] = min(self.burst, b[0] + (now - b[1]) * self.rate)
+                b[1] = now
+            if b[0] >= 1.0:
+                b[0] -= 1.0
+                return 0.0
+            b[2] += 1
+            b[3] = now
+            self.throttled += 1
+            return (1.0 - b[0]) / self.rate
+
+    def recently_throttled(self, within_sec: float = 60.0) -> List[str]:
+        """Keys that hit the limit in the last `within_sec` seconds."""
+        cutoff = time.monotonic() - within_sec
+        with self.lock:
+            return [k for k, b in self._buckets.items() if b[2] and b[3] >= cutoff]
+
+    def min_interval_ms(self) -> int:
+        """Push interval that stays within the limit (0 when unlimited)."""
+        return int(math.ceil(1000.0 / self.rate)) if self.rate > 0 else 0
+
+    def stats(self) -> Dict[str, object]:
+        with self.lock:
+            keys = {k: int(b[2]) for k, b in self._buckets.items() if b[2]}
+        return {"rate_per_sec": self.rate, "burst": self.burst, "throttled": self.throttled,
+                "queue_full": self.queue_full, "throttled_by_key": keys}
+
+
+LIMITER = IngestLimiter()
@@ -0,0 +1,205 @@
+# core/recstore.py
+from __future__ import annotations
+import heapq, mmap, os, threading, zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from core.storage import Row, Storage, ts_to_ms
+
+# One fixed-width record per reading: epoch ms (int64) + °C (float32), little-endian.
+REC = np.dtype([("t", "<i8"), ("c", "<f4")])
+EMPTY_T = np.empty(0, dtype="<i8")
+EMPTY_C = np.empty(0, dtype="<f4")
+
+
+class RecordStorage(Storage):
+    """Per-probe binary record files (records/p_<probe>.rec), read through mmap.
+
+    Files are kept in time order, so a time range is two np.searchsorted calls
+    on the mapped ts column and series() returns views into the page cache: no
+    parsing and no copies, however long the history. Appends are plain file
+    appends; the rare batch that lands before a probe's last record goes to a
+    side file (p_<probe>.late), which is folded into the main file when it can
+    be replaced (not while a mapped view is open on Windows) and merged in at
+    read time until then. float32 keeps ~7 significant digits,
+    plenty for 3-decimal °C; iter_rows rounds back to 3 decimals.
+    """
+    name = "records"
+    SUFFIX = ".rec"
+
+    def __init__(self, rec_dir: Path):
+        self.rec_dir = Path(rec_dir)
+        self.rec_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self._last: Dict[str, int] = {}                       # probe -> newest ts_ms on disk
+        self._maps: Dict[str, Tuple[tuple, np.ndarray]] = {}  # probe -> ((size, late size), records)
+        self._pids: List[str] = []
+        for path in sorted(self.rec_dir.glob("p_*" + self.SUFFIX)):
+            size = path.stat().st_size
+            if size % REC.itemsize:  # torn last record from a crash mid-append
+                with open(path, "r+b") as f:
+                    f.truncate(size - size % REC.itemsize)
+            self._pids.append(unquote(path.name[2:-len(self.SUFFIX)]))
+        for pid in self._pids:
+            if self._late_size(pid):
+                self._compact(pid)  # nothing is mapped yet
+
+    def _path(self, probe_id: str) -> Path:
+        return self.rec_dir / f"p_{quote(probe_id or '', safe='')}{self.SUFFIX}"
+
+    def _late_path(self, probe_id: str) -> Path:
+        return self._path(probe_id).with_suffix(".late")
+
+    def _late_size(self, probe_id: str) -> int:
+        try:
+            size = self._late_path(probe_id).stat().st_size
+        except OSError:
+            return 0
+        return size - size % REC.itemsize
+
+    def probes(self) -> List[str]:
+        return list(self._pids)
+
+    def version(self):
+        state = []
+        for pid in sorted(self.probes()):
+            try:
+                st = self._path(pid).stat()
+            except OSError:
+                continue
+            state.append((pid, st.st_size + self._late_size(pid), st.st_mtime_ns))
+        return f"{zlib.crc32(repr(state).encode()):08x}-{sum(s[1] for s in state):x}"
+
+    # --- writes ---
+    def append_many(self, rows: List[Row]) -> None:
+        by_pid: Dict[str, list] = {}
+        for ts, t_c, _t_f, pid in rows:
+            by_pid.setdefault(pid or "", []).append((ts_to_ms(ts), t_c))
+        with self.lock:
+            for pid, recs in by_pid.items():
+                arr = np.array(recs, dtype=REC)
+                if len(arr) > 1 and (np.diff(arr["t"]) < 0).any():
+                    arr.sort(order="t", kind="stable")
+                path = self._path(pid)
+                last = self._last.get(pid)
+                if last is None:
+                    last = self._read_last(path)
+                if last is None or arr["t"][0] >= last:
+                    with open(path, "ab") as f:
+                        f.write(arr.tobytes())
+                else:
+                    self._add_late(pid, arr)
+                if pid not in self._pids:
+                    self._pids.append(pid)
+                self._last[pid] = max(int(arr["t"][-1]), last if last is not None else int(arr["t"][-1]))
+
+    @staticmethod
+    def _read_last(path: Path):
+        try:
+            with open(path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size < REC.itemsize:
+                    return None
+                f.seek(size - size % REC.itemsize - REC.itemsize)
+                return int(np.frombuffer(f.read(REC.itemsize), dtype=REC)["t"][0])
+        except OSError:
+            return None
+
+    def _add_late(self, pid: str, arr: np.ndarray) -> None:
+        """Late rows: append to the side file, then try to fold it into the main file."""
+        with open(self._late_path(pid), "ab") as f:
+            f.write(arr.tobytes())
+        self._maps.pop(pid, None)
+        self._compact(pid)
+
+    def _compact(self, pid: str) -> bool:
+        """Rewrite the probe's file with its late rows merged in time order.
+        False (side file kept) when the file can't be replaced right now."""
+        path, late = self._path(pid), self._late_path(pid)
+        tmp = path.with_suffix(".tmp")
+        try:
+            merged = _merged(np.fromfile(path, dtype=REC), np.fromfile(late, dtype=REC, count=self._late_size(pid) // REC.itemsize))
+            merged.tofile(tmp)
+            os.replace(tmp, path)  # PermissionError on Windows while a mapped view is alive
+            os.remove(late)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        self._maps.pop(pid, None)
+        return True
+
+    # --- reads ---
+    def _records(self, probe_id: str) -> np.ndarray:
+        """All records of a probe as a read-only view of the mapped file."""
+        path = self._path(probe_id)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return np.empty(0, dtype=REC)
+        size -= size % REC.itemsize
+        key = (size, self._late_size(probe_id))
+        cached = self._maps.get(probe_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        if size == 0:
+            recs = np.empty(0, dtype=REC)
+        else:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            recs = np.frombuffer(mm, dtype=REC, count=size // REC.itemsize)
+        if key[1]:  # late rows not folded in yet: an in-memory merged copy
+            late = np.fromfile(self._late_path(probe_id), dtype=REC, count=key[1] // REC.itemsize)
+            recs = _merged(recs, late)
+            recs.flags.writeable = False
+        self._maps[probe_id] = (key, recs)  # the old map is released once its views are gone
+        return recs
+
+    def series(self, probe_id: str | None, t0: float | None = None,
+               t1: float | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(ts_ms int64, °C float32) views of one probe over [t0, t1); binary search, no copy."""
+        recs = self._records(probe_id or "")
+        if not len(recs):
+            return EMPTY_T, EMPTY_C
+        ts = recs["t"]
+        lo = int(np.searchsorted(ts, int(t0 * 1000), "left")) if t0 is not None else 0
+        hi = int(np.searchsorted(ts, int(t1 * 1000), "left")) if t1 is not None else len(ts)
+        return ts[lo:hi], recs["c"][lo:hi]
+
+    def iter_rows(self, probe_id=None, t0=None, t1=None) -> Iterator[Row]:
+        pids = [probe_id] if probe_id is not None else self.probes()
+        parts = [self._iter_probe(pid, t0, t1) for pid in pids]
+        if len(parts) == 1:
+            return parts[0]
+        # several probes: a lazy k-way merge by time (stable, so ties keep probe
+        # order); only one chunk per probe is materialized at a time
+        return heapq.merge(*parts, key=_row_time)
+
+    def _iter_probe(self, pid: str, t0, t1) -> Iterator[Row]:
+        ts, cs = self.series(pid, t0, t1)
+        for i in range(0, len(ts), 5000):
+            t_chunk = ts[i:i + 5000].tolist()
+            c_chunk = np.round(cs[i:i + 5000].astype(np.float64), 3).tolist()
+            for ms, t_c in zip(t_chunk, c_chunk):
+                yield ms, t_c, t_c * 9.0 / 5.0 + 32.0, pid
+
+    def close(self) -> None:
+        with self.lock:
+            self._maps.clear()
+            for pid in self._pids:
+                if self._late_size(pid):
+                    self._compact(pid)
+
+
+def _merged(old: np.ndarray, late: np.ndarray) -> np.ndarray:
+    merged = np.concatenate([old, late])
+    return merged[np.argsort(merged["t"], kind="stable")]
+
+
+def _row_time(row: Row) -> int:
+    return row[0]
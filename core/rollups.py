@@ -0,0 +1,256 @@
+# core/rollups.py
+from __future__ import annotations
+import csv, itertools, os, threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.storage import ts_to_epoch
+
+# bucket width (seconds) -> file label
+RESOLUTIONS: Dict[int, str] = {60: "1m", 3600: "1h", 86400: "1d"}
+COLS = ["bucket", "probe_id", "min", "max", "mean", "count", "last"]
+DEFAULT_KEEP = {60: 2880, 3600: 2160, 86400: 3650}  # buckets per probe held in memory (2 d / 90 d / 10 y)
+
+# A bucket is [start_epoch, min, max, sum, count, last, t_last].
+Bucket = List[float]
+
+
+def pick_resolution(t0: float, t1: float, width_px: int | float) -> int:
+    """Coarsest rollup whose bucket count still fills `width_px`; 0 means raw rows."""
+    span = max(0.0, float(t1) - float(t0))
+    best = 0
+    for res in sorted(RESOLUTIONS):
+        if span / res >= max(1.0, float(width_px)):
+            best = res
+    return best
+
+
+class RollupEngine:
+    """Incremental min/max/mean/count/last per probe at 1 min, 1 h and 1 day.
+
+    Fed with every row that reaches the log: by the CSV tailer for the csv
+    backend (so PullLogger and other processes count too), otherwise by the
+    ingest writer and the service's synchronous fallback. A bucket is persisted when it
+    closes, to rollups/1m.csv, rollups/1h.csv and rollups/1d.csv next to the
+    raw log. Missing files are rebuilt from the raw log in one pass.
+    Memory holds the newest `keep[res]` buckets per probe; the raw log remains
+    the source of truth for anything older.
+    """
+    def __init__(self, keep: Optional[Dict[int, int]] = None):
+        self.lock = threading.RLock()
+        self.dir: Optional[Path] = None
+        self.keep = dict(DEFAULT_KEEP, **(keep or {}))
+        self._open: Dict[int, Dict[str, Bucket]] = {r: {} for r in RESOLUTIONS}
+        self._closed: Dict[int, Dict[str, deque]] = {r: {} for r in RESOLUTIONS}
+        self._dirty: Dict[int, List[Tuple[str, Bucket]]] = {r: [] for r in RESOLUTIONS}
+        self.late_dropped = 0
+
+    # --- setup / persistence ---
+    def open(self, rollup_dir: Path, storage=None, keep: Optional[Dict[int, int]] = None) -> None:
+        """Load persisted buckets, or rebuild them from `storage` if the files are missing."""
+        with self.lock:
+            if keep:
+                self.keep.update({int(k): int(v) for k, v in keep.items()})
+            self.dir = Path(rollup_dir)
+            self.dir.mkdir(parents=True, exist_ok=True)
+            missing = [res for res, label in RESOLUTIONS.items() if not (self.dir / f"{label}.csv").exists()]
+            if missing and storage is not None:
+                for path in self.dir.glob("*.csv"):
+                    path.unlink()
+                self._reset()
+                rows = iter(storage.iter_rows())
+                while True:
+                    chunk = list(itertools.islice(rows, 50000))
+                    if not chunk:
+                        break
+                    self.add_rows(chunk)
+            else:
+                for res in RESOLUTIONS:
+                    self._load(res)
+
+    def _reset(self):
+        self._open = {r: {} for r in RESOLUTIONS}
+        self._closed = {r: {} for r in RESOLUTIONS}
+        self._dirty = {r: [] for r in RESOLUTIONS}
+
+    def _path(self, res: int) -> Path:
+        return self.dir / f"{RESOLUTIONS[res]}.csv"
+
+    def _load(self, res: int) -> None:
+        path = self._path(res)
+        latest: Dict[Tuple[str, int], Bucket] = {}
+        n_rows = 0
+        try:
+            with open(path, "r", newline="", encoding="utf-8") as f:
+                r = csv.reader(f)
+                next(r, None)
+                for rec in r:
+                    try:
+                        b, pid = int(rec[0]), rec[1]
+                        mn, mx, mean, cnt, last = float(rec[2]), float(rec[3]), float(rec[4]), int(rec[5]), float(rec[6])
+                    except (IndexError, ValueError):
+                        continue
+                    n_rows += 1
+                    latest[(pid, b)] = [b, mn, mx, mean * cnt, cnt, last, b]  # later rows supersede (late merges)
+        except OSError:
+            return
+        by_probe: Dict[str, List[Bucket]] = {}
+        for (pid, _b), bucket in latest.items():
+            by_probe.setdefault(pid, []).append(bucket)
+        keep = self.keep[res]
+        kept = 0
+        for pid, buckets in by_probe.items():
+            buckets.sort(key=lambda x: x[0])
+            self._closed[res][pid] = deque(buckets[-keep:], maxlen=keep)
+            kept += len(self._closed[res][pid])
+        if n_rows > 1.5 * kept + 100:
+            self._rewrite(res)  # compact superseded and out-of-retention rows
+
+    def _rewrite(self, res: int) -> None:
+        path = self._path(res)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(COLS)
+            for pid, dq in self._closed[res].items():
+                w.writerows(_record(pid, b) for b in dq)
+        os.replace(tmp, path)
+
+    def _persist(self) -> None:
+        if self.dir is None:
+            return
+        for res, rows in self._dirty.items():
+            if not rows:
+                continue
+            path = self._path(res)
+            new_file = not path.exists()
+            try:
+                with open(path, "a", newline="", encoding="utf-8") as f:
+                    w = csv.writer(f)
+                    if new_file:
+                        w.writerow(COLS)
+                    w.writerows(_record(pid, b) for pid, b in rows)
+            except OSError:
+                continue  # keep them dirty; retried on the next flush
+            self._dirty[res] = []
+
+    def close(self) -> None:
+        """Persist open buckets too (reloaded as closed and merged on restart)."""
+        with self.lock:
+            for res in RESOLUTIONS:
+                self._dirty[res].extend((pid, b) for pid, b in self._open[res].items())
+            self._persist()
+
+    # --- ingest ---
+    def add_new_rows(self, rows: Iterable[Tuple[str, float, float, str]]) -> None:
+        """Add only rows after each probe's newest 1 min bucket.
+
+        For the tail backfilled at startup: rows written while the hub was
+        down are counted, rows already in the loaded buckets are not.
+        """
+        with self.lock:
+            ends = {pid: b[0] + 60 for pid, b in self._open[60].items()}
+            for pid, dq in self._closed[60].items():
+                if dq and pid not in ends:
+                    ends[pid] = dq[-1][0] + 60
+            fresh = []
+            for row in rows:
+                try:
+                    if ts_to_epoch(row[0]) >= ends.get(row[3] or "", float("-inf")):
+                        fresh.append(row)
+                except (TypeError, ValueError):
+                    continue
+            self.add_rows(fresh)
+
+    def add_rows(self, rows: Iterable[Tuple[str, float, float, str]]) -> None:
+        """Tailer / writer subscriber: rows are (timestamp, °C, °F, probe_id)."""
+        with self.lock:
+            for ts, t_c, _t_f, pid in rows:
+                try:
+                    t, v = ts_to_epoch(ts), float(t_c)
+                except (TypeError, ValueError):
+                    continue
+                for res in RESOLUTIONS:
+                    self._add(res, pid or "", t, v)
+            self._persist()
+
+    def _add(self, res: int, pid: str, t: float, v: float) -> None:
+        start = int(t // res) * res
+        opened = self._open[res]
+        cur = opened.get(pid)
+        closed = self._closed[res].get(pid)
+        if cur is None and closed and closed[-1][0] == start:
+            cur = opened[pid] = closed.pop()  # re-open the bucket saved at shutdown
+        if cur is None or start > cur[0]:
+            if cur is not None:
+                if closed is None:
+                    closed = self._closed[res][pid] = deque(maxlen=self.keep[res])
+                closed.append(cur)
+                self._dirty[res].append((pid, cur))
+            opened[pid] = [start, v, v, v, 1, v, t]
+        elif start == cur[0]:
+            _merge(cur, t, v)
+        else:
+            # late reading for an already closed bucket
+            for b in reversed(closed or ()):
+                if b[0] == start:
+                    _merge(b, t, v)
+                    self._dirty[res].append((pid, b))
+                    return
+                if b[0] < start:
+                    break
+            self.late_dropped += 1
+
+    # --- reads ---
+    def probes(self, res: int = 60) -> List[str]:
+        """Probes with buckets at `res` (1 min by default: the recently active ones)."""
+        with self.lock:
+            return sorted(set(self._open[res]) | set(self._closed[res]))
+
+    def series(self, probe_id: str, res: int, t0: float | None = None, t1: float | None = None) -> Dict[str, list]:
+        """Columnar buckets for one probe: {"t", "min", "max", "mean", "count", "last"}."""
+        out: Dict[str, list] = {k: [] for k in ("t", "min", "max", "mean", "count", "last")}
+        with self.lock:
+            buckets = list(self._closed[res].get(probe_id, ()))
+            cur = self._open[res].get(probe_id)
+            if cur is not None:
+                buckets.append(cur)
+            for b in buckets:
+                if (t0 is not None and b[0] + res <= t0) or (t1 is not None and b[0] >= t1):
+                    continue
+                out["t"].append(b[0]); out["min"].append(b[1]); out["max"].append(b[2])
+                out["mean"].append(b[3] / b[4]); out["count"].append(b[4]); out["last"].append(b[5])
+        return out
+
+    def stats(self, probe_id: str, t0: float, t1: float, width_px: int = 1000) -> Optional[Dict[str, float]]:
+        """min/max/mean/count/last over [t0, t1) from the coarsest fitting rollup."""
+        res = pick_resolution(t0, t1, width_px) or min(RESOLUTIONS)
+        s = self.series(probe_id, res, t0, t1)
+        if not s["t"]:
+            return None
+        n = sum(s["count"])
+        return {
+            "resolution": res,
+            "min": min(s["min"]),
+            "max": max(s["max"]),
+            "mean": sum(m * c for m, c in zip(s["mean"], s["count"])) / n,
+            "count": n,
+            "last": s["last"][-1],
+        }
+
+
+def _merge(b: Bucket, t: float, v: float) -> None:
+    b[1] = min(b[1], v)
+    b[2] = max(b[2], v)
+    b[3] += v
+    b[4] += 1
+    if t >= b[6]:
+        b[5], b[6] = v, t
+
+
+def _record(pid: str, b: Bucket) -> list:
+    return [int(b[0]), pid, f"{b[1]:.3f}", f"{b[2]:.3f}", f"{b[3] / b[4]:.4f}", int(b[4]), f"{b[5]:.3f}"]
+
+
+ROLLUPS = RollupEngine()
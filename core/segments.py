@@ -0,0 +1,258 @@
+# core/segments.py
+"""
+Compressed time-series segments (delta-of-delta timestamps, scaled-int value deltas).
+
+A segment holds up to a few thousand points of one probe:
+
+  header  "<4sHIqqqiiiBBBBI" (54 bytes)
+      magic b"TSG2", probe id length, point count n,
+      t_first / t_last (epoch ms), first delta (ms),
+      v_first / v_min / v_max (milli-°C),
+      ts_bits, val_bits, scale digits (3), reserved, crc32 of the payload
+  probe id (UTF-8)
+  payload: zigzag(delta-of-delta ts)[n-2] packed at ts_bits each, then
+           zigzag(delta value)[n-1] packed at val_bits each (little-endian bit order)
+
+Regular sampling makes the delta-of-delta mostly 0 or a few ms of jitter, and
+slowly varying temperatures give small value deltas, so both columns pack into a
+few bits per point. Values are stored as integer milli-degrees, which is lossless
+for the 3-decimal readings the hub keeps. The header carries the time range and
+min/max, so a reader can skip segments without touching their payload.
+Packing and unpacking are vectorized with NumPy.
+
+A segment file is just segments back to back. The format is standalone: no
+storage backend, export or archive path reads or writes it yet, and the hub
+runs the same without it. Benchmark it against a CSV log:
+
+    python -m core.segments bench temperature_log.csv
+"""
+from __future__ import annotations
+import struct, sys, time, zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"TSG2"
+HEADER = struct.Struct("<4sHIqqqiiiBBBBI")  # first delta is int64: gaps of weeks offline
+SCALE = 1000            # milli-°C
+SEGMENT_POINTS = 4096   # default points per segment
+
+
+class SegmentHeader(NamedTuple):
+    probe_id: str
+    n: int
+    t_first: int
+    t_last: int
+    v_min: float
+    v_max: float
+    offset: int     # file offset of the segment start
+    size: int       # total bytes incl. header
+
+
+def _zigzag(x: np.ndarray) -> np.ndarray:
+    x = x.astype(np.int64)
+    return ((x << 1) ^ (x >> 63)).view(np.uint64)
+
+
+def _unzigzag(u: np.ndarray) -> np.ndarray:
+    u = u.astype(np.uint64)
+    return (u >> np.uint64(1)).view(np.int64) ^ -(u & np.uint64(1)).view(np.int64)
+
+
+def _bits(u: np.ndarray) -> int:
+    return int(u.max()).bit_length() if len(u) else 0
+
+
+def _pack(u: np.ndarray, w: int) -> bytes:
+    if w == 0 or not len(u):
+        return b""
+    bits = ((u[:, None] >> np.arange(w, dtype=np.uint64)) & np.uint64(1)).astype(np.uint8)
+    return np.packbits(bits.ravel(), bitorder="little").tobytes()
+
+
+def _unpack(buf, n: int, w: int) -> np.ndarray:
+    if w == 0 or n <= 0:
+        return np.zeros(max(n, 0), dtype=np.uint64)
+    bits = np.unpackbits(np.frombuffer(buf, dtype=np.uint8), count=n * w, bitorder="little").reshape(n, w)
+    return (bits.astype(np.uint64) << np.arange(w, dtype=np.uint64)).sum(axis=1, dtype=np.uint64)
+
+
+def _packed_len(n: int, w: int) -> int:
+    return (max(n, 0) * w + 7) // 8
+
+
+def encode_segment(probe_id: str, ts_ms, values_c) -> bytes:
+    """One segment from time-ordered epoch-ms timestamps and °C values."""
+    t = np.asarray(ts_ms, dtype=np.int64)
+    v = np.rint(np.asarray(values_c, dtype=np.float64) * SCALE).astype(np.int64)
+    n = len(t)
+    if n == 0 or n != len(v):
+        raise ValueError("need equally long, non-empty ts and values")
+    d = np.diff(t)
+    d_first = int(d[0]) if n > 1 else 0
+    dod = _zigzag(np.diff(d))
+    dv = _zigzag(np.diff(v))
+    ts_bits, val_bits = _bits(dod), _bits(dv)
+    if ts_bits > 64 or val_bits > 64:
+        raise ValueError("delta out of range")
+    payload = _pack(dod, ts_bits) + _pack(dv, val_bits)
+    pid = probe_id.encode("utf-8")
+    head = HEADER.pack(MAGIC, len(pid), n, int(t[0]), int(t[-1]), d_first,
+                       int(v[0]), int(v.min()), int(v.max()), ts_bits, val_bits, 3, 0,
+                       zlib.crc32(payload))
+    return head + pid + payload
+
+
+def _parse_header(buf, pos: int = 0) -> Tuple[tuple, str, int]:
+    h = HEADER.unpack_from(buf, pos)
+    if h[0] != MAGIC:
+        raise ValueError(f"bad segment magic at {pos}")
+    pid_len = h[1]
+    start = pos + HEADER.size
+    pid = bytes(buf[start:start + pid_len]).decode("utf-8")
+    return h, pid, start + pid_len
+
+
+def decode_segment(buf, pos: int = 0) -> Tuple[str, np.ndarray, np.ndarray]:
+    """(probe_id, epoch-ms int64 array, °C float64 array) of the segment at `pos`."""
+    h, pid, body = _parse_header(buf, pos)
+    _m, _pl, n, t_first, _t_last, d_first, v_first, _vmin, _vmax, ts_bits, val_bits, _sc, _r, crc = h
+    n_ts, n_v = _packed_len(n - 2, ts_bits), _packed_len(n - 1, val_bits)
+    payload = memoryview(buf)[body:body + n_ts + n_v]
+    if len(payload) != n_ts + n_v or zlib.crc32(payload) != crc:
+        raise ValueError(f"corrupt segment at {pos}")
+    dod = _unzigzag(_unpack(payload[:n_ts], n - 2, ts_bits))
+    dv = _unzigzag(_unpack(payload[n_ts:], n - 1, val_bits))
+    t = np.empty(n, dtype=np.int64)
+    t[0] = t_first
+    if n > 1:
+        deltas = np.empty(n - 1, dtype=np.int64)
+        deltas[0] = d_first
+        deltas[1:] = d_first + np.cumsum(dod)
+        t[1:] = t_first + np.cumsum(deltas)
+    v = np.empty(n, dtype=np.int64)
+    v[0] = v_first
+    v[1:] = v_first + np.cumsum(dv)
+    return pid, t, v / SCALE
+
+
+def _segment_size(h: tuple) -> int:
+    n, ts_bits, val_bits = h[2], h[9], h[10]
+    return HEADER.size + h[1] + _packed_len(n - 2, ts_bits) + _packed_len(n - 1, val_bits)
+
+
+# --- segment files ---
+def write_segments(f: BinaryIO, rows: Iterable[Tuple[object, float, float, str]],
+                   points: int = SEGMENT_POINTS) -> int:
+    """Append rows (ts, °C, °F, probe_id) as per-probe segments of up to `points`
+    points. Rows must be in time order per probe. Returns segments written."""
+    from core.storage import ts_to_ms
+    pending: Dict[str, Tuple[List[int], List[float]]] = {}
+    written = 0
+    for ts, t_c, _t_f, pid in rows:
+        ts_list, vals = pending.setdefault(pid or "", ([], []))
+        ts_list.append(ts_to_ms(ts))
+        vals.append(float(t_c))
+        if len(ts_list) >= points:
+            f.write(encode_segment(pid or "", ts_list, vals))
+            written += 1
+            pending[pid or ""] = ([], [])
+    for pid, (ts_list, vals) in pending.items():
+        if ts_list:
+            f.write(encode_segment(pid, ts_list, vals))
+            written += 1
+    return written
+
+
+def read_headers(buf) -> Iterator[SegmentHeader]:
+    """Headers of every segment in a file buffer, without decoding payloads."""
+    pos, end = 0, len(buf)
+    while pos + HEADER.size <= end:
+        h, pid, _body = _parse_header(buf, pos)
+        size = _segment_size(h)
+        yield SegmentHeader(pid, h[2], h[3], h[4], h[7] / SCALE, h[8] / SCALE, pos, size)
+        pos += size
+
+
+def iter_segments(path: Path, probe_id: Optional[str] = None, t0: Optional[float] = None,
+                  t1: Optional[float] = None) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """Decoded (probe_id, ts_ms, °C) per segment, skipping segments outside the
+    probe / [t0, t1) filter by header alone; points are trimmed to the range."""
+    buf = Path(path).read_bytes()
+    lo = int(t0 * 1000) if t0 is not None else None
+    hi = int(t1 * 1000) if t1 is not None else None
+    for h in read_headers(buf):
+        if probe_id is not None and h.probe_id != probe_id:
+            continue
+        if (lo is not None and h.t_last < lo) or (hi is not None and h.t_first >= hi):
+            continue
+        pid, t, v = decode_segment(buf, h.offset)
+        if lo is not None or hi is not None:
+            keep = np.ones(len(t), dtype=bool)
+            if lo is not None:
+                keep &= t >= lo
+            if hi is not None:
+                keep &= t < hi
+            t, v = t[keep], v[keep]
+        yield pid, t, v
+
+
+# --- benchmark ---
+def bench(csv_file: Optional[Path] = None, points: int = SEGMENT_POINTS) -> Dict[str, float]:
+    """Bytes/point and decode throughput: segments vs the CSV log."""
+    import io, os
+    from core.storage import iter_csv_file
+    if csv_file is None:
+        csv_file = _sample_csv()
+        try:
+            return bench(csv_file, points)
+        finally:
+            os.unlink(csv_file)
+    csv_file = Path(csv_file)
+
+    t_start = time.perf_counter()
+    rows = list(iter_csv_file(csv_file))
+    csv_sec = time.perf_counter() - t_start
+    buf = io.BytesIO()
+    t_start = time.perf_counter()
+    n_seg = write_segments(buf, rows, points)
+    enc_sec = time.perf_counter() - t_start
+    data = buf.getvalue()
+    t_start = time.perf_counter()
+    n_dec = 0
+    for h in read_headers(data):
+        n_dec += len(decode_segment(data, h.offset)[1])
+    dec_sec = time.perf_counter() - t_start
+    n = max(1, len(rows))
+    return {
+        "points": len(rows),
+        "segments": n_seg,
+        "csv_bytes_per_point": round(csv_file.stat().st_size / n, 2),
+        "segment_bytes_per_point": round(len(data) / n, 2),
+        "ratio": round(csv_file.stat().st_size / max(1, len(data)), 1),
+        "csv_parse_points_per_sec": round(len(rows) / csv_sec) if csv_sec else 0,
+        "segment_encode_points_per_sec": round(len(rows) / enc_sec) if enc_sec else 0,
+        "segment_decode_points_per_sec": round(n_dec / dec_sec) if dec_sec else 0,
+    }
+
+
+def _sample_csv() -> Path:
+    """Temporary compact log: 4 probes, 1 Hz with a little jitter, slow drift plus sensor noise."""
+    import tempfile
+    rng = np.random.default_rng(0)
+    n = 250_000
+    t = 1_792_195_200_000 + np.arange(n) * 1000 + rng.integers(-3, 4, n)
+    c = 20 + 5 * np.sin(np.arange(n) / 5000) + rng.normal(0, 0.05, n)
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="") as tmp:
+        tmp.write("ts_ms,temperature_c,probe_id\n")
+        tmp.writelines(f"{ti},{ci:.3f},p{i % 4}\n" for i, (ti, ci) in enumerate(zip(t, c)))
+    return Path(tmp.name)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "bench":
+        for k, v in bench(Path(sys.argv[2]) if len(sys.argv) > 2 else None).items():
+            print(f"{k:32s} {v}")
+    else:
+        print("usage: python -m core.segments bench [log.csv]")
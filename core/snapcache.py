@@ -0,0 +1,107 @@
+# core/snapcache.py
+from __future__ import annotations
+import threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class SnapshotCache:
+    """Memoized dashboard snapshots (figures, gauge, metrics), LRU-bounded.
+
+    Keys carry a data version (see version()) plus whatever picks the view
+    (window, resolution, point budget): new data means a new key, and old
+    keys simply age out. Many open displays refreshing at the same version
+    share one computation; a caller that misses while another thread is
+    building the same key waits for that result instead of building it again.
+    """
+    def __init__(self, max_entries: int = 64, tick_sec: float = 1.0):
+        self.lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._building: Dict[Hashable, threading.Event] = {}
+        self.max_entries = max(1, int(max_entries))
+        self.tick_sec = max(0.0, float(tick_sec))
+        self._version = 0
+        self._version_gen = -1     # LiveBuffer.generation when the version last moved
+        self._version_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0       # misses served by another thread's build
+        self.evictions = 0
+
+    def configure(self, max_entries: int | None = None, tick_sec: float | None = None):
+        with self.lock:
+            if max_entries is not None:
+                self.max_entries = max(1, int(max_entries))
+                self._trim()
+            if tick_sec is not None:
+                self.tick_sec = max(0.0, float(tick_sec))
+
+    def version(self, generation: int, need: int | None = None) -> int:
+        """Data version for snapshot keys: follows `generation` (LiveBuffer.generation,
+        +1 per reading) but moves at most once per tick_sec, so displays
+        refreshing a moment apart on a busy hub still share. `need` is the
+        generation a pushed /api/stream frame announced: the version moves at
+        once if it does not cover that yet, so a push never shows older data.
+        """
+        with self.lock:
+            if generation != self._version_gen:
+                now = time.monotonic()
+                if (need is not None and need > self._version_gen) or now - self._version_at >= self.tick_sec:
+                    self._version += 1
+                    self._version_gen, self._version_at = generation, now
+            return self._version
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        while True:
+            with self.lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                evt = self._building.get(key)
+                if evt is None:
+                    evt = self._building[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+            evt.wait(10.0)
+            with self.lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key]
+            # the builder failed (or took too long): build it ourselves
+            with self.lock:
+                if self._building.get(key) is evt:
+                    self._building.pop(key, None)
+        try:
+            value = build()
+        except Exception:
+            with self.lock:
+                self._building.pop(key, None)
+            evt.set()
+            raise
+        with self.lock:
+            self._entries[key] = value
+            self._trim()
+            self._building.pop(key, None)
+        evt.set()
+        return value
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.waits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                    "waits": self.waits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": round((self.hits + self.waits) / lookups, 4) if lookups else 0.0}
+
+
+SNAPSHOTS = SnapshotCache()
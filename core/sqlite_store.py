@@ -0,0 +1,101 @@
+# core/sqlite_store.py
+from __future__ import annotations
+import contextlib, sqlite3, threading
+from pathlib import Path
+from typing import Iterator, List
+
+from core.storage import Row, Storage, ts_to_ms
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    probe_id      TEXT    NOT NULL,
+    ts_ms         INTEGER NOT NULL,   -- epoch milliseconds (UTC)
+    temperature_c REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS readings_probe_ts ON readings (probe_id, ts_ms);
+CREATE INDEX IF NOT EXISTS readings_ts ON readings (ts_ms);
+"""
+
+
+class SqliteStorage(Storage):
+    """SQLite backend: WAL journal, one transaction per batch, (probe_id, ts) index.
+
+    Connections come from a small pool: a call borrows one and hands it back
+    when done (a generator when it is exhausted or closed), and at most
+    `pool_size` idle ones are kept open. WAL lets the dashboard read while the
+    writer thread commits.
+    """
+    name = "sqlite"
+
+    def __init__(self, db_file: Path, pool_size: int = 4):
+        self.db_file = Path(db_file)
+        self.pool_size = max(1, int(pool_size))
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        with self._connection() as db, db:
+            db.executescript(SCHEMA)
+
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.db_file), timeout=10.0, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            db = self._idle.pop() if self._idle else None
+        if db is None:
+            db = self._open()
+        try:
+            yield db
+        finally:
+            with self._lock:
+                keep = len(self._idle) < self.pool_size
+                if keep:
+                    self._idle.append(db)
+            if not keep:
+                db.close()
+
+    def append_many(self, rows: List[Row]) -> None:
+        params = [(pid or "", ts_to_ms(ts), float(t_c)) for ts, t_c, _t_f, pid in rows]
+        with self._connection() as db, db:  # one transaction per batch
+            db.executemany("INSERT INTO readings (probe_id, ts_ms, temperature_c) VALUES (?, ?, ?)", params)
+
+    def version(self):
+        # rows are only ever inserted, so the newest rowid identifies the data
+        with self._connection() as db:
+            return str(db.execute("SELECT max(rowid) FROM readings").fetchone()[0] or 0)
+
+    def iter_rows(self, probe_id=None, t0=None, t1=None) -> Iterator[Row]:
+        where, args = [], []
+        if probe_id is not None:
+            where.append("probe_id = ?"); args.append(probe_id)
+        if t0 is not None:
+            where.append("ts_ms >= ?"); args.append(int(t0 * 1000))
+        if t1 is not None:
+            where.append("ts_ms < ?"); args.append(int(t1 * 1000))
+        sql = "SELECT ts_ms, temperature_c, probe_id FROM readings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts_ms, rowid"  # stable among equal timestamps, for the (t, n_same) cursor
+        with self._connection() as db:
+            cur = db.execute(sql, args)
+            try:
+                while True:
+                    batch = cur.fetchmany(5000)
+                    if not batch:
+                        break
+                    for ts_ms, t_c, pid in batch:
+                        yield ts_ms, t_c, t_c * 9.0 / 5.0 + 32.0, pid
+            finally:
+                cur.close()  # a half-read cursor must not go back to the pool
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for db in idle:
+            try:
+                db.close()
+            except Exception:
+                pass
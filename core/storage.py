@@ -1,50 +1,151 @@
 # core/storage.py
 from __future__ import annotations
 from pathlib import Path
-import pandas as pd
-import datetime
+import csv, datetime, functools, io, itertools, os, threading, time
+from typing import Iterable, Iterator, List, Tuple, Union
 
 REQUIRED_COLS = ["timestamp","temperature_c","temperature_f"]
 OPTIONAL_COLS = ["probe_id"]
+# Compact on-disk layout: epoch milliseconds + °C; °F and ISO time are derived on read/export.
+COMPACT_COLS = ["ts_ms","temperature_c","probe_id"]
 
-def ensure_csv(csv_file: Path) -> None:
+# Header cache: path -> (st_dev, st_ino, size at last check, columns).
+# Invalidated when the file is replaced (rotation) or shrinks (truncation).
+_HEADER_CACHE: dict[str, tuple[int, int, int, list[str]]] = {}
+_SCHEMA_LOCK = threading.Lock()
+
+def ensure_csv(csv_file: Path, schema: str = "compact") -> None:
+    """Create the log with the header for `schema` ("compact" or "legacy"), or
+    upgrade an existing legacy log in place (see migrate_csv)."""
     if not csv_file.exists():
-        cols = REQUIRED_COLS + OPTIONAL_COLS
-        pd.DataFrame(columns=cols).to_csv(csv_file, index=False)
+        cols = COMPACT_COLS if schema != "legacy" else REQUIRED_COLS + OPTIONAL_COLS
+        with open(csv_file, "w", newline="", encoding="utf-8") as f:
+            f.write(",".join(cols) + "\n")
+    else:
+        migrate_csv(csv_file)
+
+def csv_schema(csv_file: Path) -> str:
+    """"compact" (ts_ms, temperature_c, probe_id) or "legacy" (ISO timestamp + °C + °F)."""
+    return "compact" if "ts_ms" in read_header(csv_file) else "legacy"
+
+def read_header(csv_file: Path) -> list[str]:
+    """Column names of csv_file, re-read only after rotation/truncation."""
+    key = str(csv_file)
+    try:
+        st = os.stat(csv_file)
+    except OSError:
+        _HEADER_CACHE.pop(key, None)
+        return []
+    hit = _HEADER_CACHE.get(key)
+    if hit and hit[0] == st.st_dev and hit[1] == st.st_ino and st.st_size >= hit[2]:
+        _HEADER_CACHE[key] = (st.st_dev, st.st_ino, st.st_size, hit[3])
+        return hit[3]
+    with open(csv_file, "r", newline="", encoding="utf-8") as f:
+        cols = next(csv.reader([f.readline()]), [])
+    cols = [c.strip() for c in cols]
+    _HEADER_CACHE[key] = (st.st_dev, st.st_ino, st.st_size, cols)
+    return cols
+
+def migrate_csv(csv_file: Path) -> bool:
+    """Upgrade a legacy 3-column log to the current schema in one streaming pass.
+
+    Returns True when the file was rewritten.
+    """
+    with _SCHEMA_LOCK:
+        cols = read_header(csv_file)
+        missing = [c for c in OPTIONAL_COLS if c not in cols]
+        if not cols or not missing or "ts_ms" in cols:
+            return False
+        tmp = csv_file.with_name(csv_file.name + ".migrating")
+        pad = "," * len(missing)
+        with open(csv_file, "r", newline="", encoding="utf-8") as src, \
+             open(tmp, "w", newline="", encoding="utf-8") as dst:
+            dst.write(",".join(cols + missing) + "\n")
+            src.readline()
+            for line in src:
+                line = line.rstrip("\r\n")
+                if line:
+                    dst.write(line + pad + "\n")
+        os.replace(tmp, csv_file)
+        _HEADER_CACHE.pop(str(csv_file), None)
+        return True
+
+def compact_csv(csv_file: Path) -> bool:
+    """Rewrite a legacy log (ISO timestamp, °C, °F) as ts_ms,temperature_c,probe_id
+    in one streaming pass. Each distinct timestamp string is parsed once.
+    Unparseable rows are kept out. Returns True when the file was rewritten.
+    """
+    with _SCHEMA_LOCK:
+        cols = read_header(csv_file)
+        if not cols or "ts_ms" in cols or "timestamp" not in cols:
+            return False
+        tmp = csv_file.with_name(csv_file.name + ".migrating")
+        with open(tmp, "w", newline="", encoding="utf-8") as dst:
+            w = csv.writer(dst)
+            w.writerow(COMPACT_COLS)
+            w.writerows([ts_to_ms(ts), f"{t_c:.3f}", pid] for ts, t_c, _t_f, pid in iter_csv_file(csv_file))
+        os.replace(tmp, csv_file)
+        _HEADER_CACHE.pop(str(csv_file), None)
+        return True
 
-def _ensure_column(csv_file: Path, col: str) -> None:
-    # Upgrade-in-place to add a missing column (keeps data). Small file friendly.
+def ensure_schema(csv_file: Path) -> None:
+    # Cheap per-write guard: a cached header lookup, plus a migration only if
+    # a legacy file was swapped in underneath us.
     try:
-        df = pd.read_csv(csv_file)
-        if col not in df.columns:
-            df[col] = ""
-            df.to_csv(csv_file, index=False)
+        if "probe_id" not in read_header(csv_file):
+            migrate_csv(csv_file)
     except Exception:
         # If anything goes wrong, leave file as-is; app will still run.
         pass
 
 # Backwards compatible append: probe_id is optional
-def append_row(csv_file: Path, ts: str, t_c: float, t_f: float, probe_id: str|None = None) -> None:
+def append_row(csv_file: Path, ts, t_c: float, t_f: float, probe_id: str|None = None) -> None:
+    append_csv_rows(Path(csv_file), [(ts, t_c, t_f, probe_id or "")])
+
+@functools.lru_cache(maxsize=8192)
+def _iso_to_epoch(ts: str) -> float:
+    return datetime.datetime.fromisoformat(ts.strip().replace("Z", "+00:00")).timestamp()
+
+def ts_to_epoch(ts) -> float:
+    """Epoch seconds from an ISO string (naive = local time) or a number (s or ms)."""
+    if isinstance(ts, (int, float)):
+        t = float(ts)
+        return t / 1000.0 if t > 1e11 else t
+    s = str(ts).strip()
+    if s.replace(".", "", 1).isdigit():
+        return ts_to_epoch(float(s))
+    return _iso_to_epoch(s)
+
+def ts_to_ms(ts) -> int:
+    """Epoch milliseconds (the internal timestamp) from anything ts_to_epoch takes."""
+    if isinstance(ts, int) and ts > 100_000_000_000:
+        return ts
+    return int(round(ts_to_epoch(ts) * 1000))
+
+def ts_to_iso(ts) -> str:
+    """Local ISO seconds for display/export; ISO strings pass through unchanged."""
+    if isinstance(ts, str) and not ts.strip().replace(".", "", 1).isdigit():
+        return ts
+    return datetime.datetime.fromtimestamp(ts_to_epoch(ts)).isoformat(timespec="seconds")
+
+def client_ts_ms(ts):
+    """A client-supplied timestamp as epoch ms, None if empty or unparseable."""
+    if not ts:
+        return None
     try:
-        # If probe_id present, make sure file has that column
-        if probe_id is not None:
-            _ensure_column(csv_file, "probe_id")
-            df = pd.DataFrame([[ts, t_c, t_f, probe_id]], columns=REQUIRED_COLS + ["probe_id"])
-        else:
-            df = pd.DataFrame([[ts, t_c, t_f]], columns=REQUIRED_COLS)
-        # Write with header only if file empty (pandas handles this automatically when mode='a' with header=False)
-        df.to_csv(csv_file, mode="a", header=False, index=False)
-    except Exception:
-        # Last-resort fallback (try without probe_id)
-        pd.DataFrame([[ts, t_c, t_f]], columns=REQUIRED_COLS).to_csv(csv_file, mode="a", header=False, index=False)
+        return ts_to_ms(ts)
+    except (TypeError, ValueError, OverflowError):
+        return None
 
 def normalize_payload(payload: dict):
     """
     Accepts keys like temperature_c/temp_c/t_c or temperature_f/temp_f/t_f.
-    Returns (timestamp_iso, celsius, fahrenheit)
+    Returns (epoch_ms, celsius, fahrenheit). The timestamp (ISO string or epoch
+    s/ms) is parsed here, once; missing or unparseable means arrival time.
     """
-    now = datetime.datetime.now().isoformat(timespec="seconds")
-    ts = payload.get("timestamp") or payload.get("ts") or now
+    ts = client_ts_ms(payload.get("timestamp") or payload.get("ts"))
+    if ts is None:
+        ts = int(time.time() * 1000)
 
     c_keys = ["temperature_c","temp_c","t_c","c"]
     f_keys = ["temperature_f","temp_f","t_f","f"]
@@ -61,3 +162,266 @@ def normalize_payload(payload: dict):
         t_f = (t_c * 9.0 / 5.0) + 32.0
 
     return ts, float(t_c), float(t_f)
+
+
+# ---- Storage backends ---------------------------------------------------------
+# Rows are (timestamp, celsius, fahrenheit, probe_id), the same shape
+# normalize_payload() produces. The timestamp is epoch ms (int) from ingest and
+# the compact/SQLite readers, or the ISO string read back from a legacy log;
+# ts_to_epoch()/ts_to_ms() take either. Time filters are epoch seconds.
+Row = Tuple[Union[int, str], float, float, str]
+
+
+class Storage:
+    """Interface shared by the storage backends (see open_storage)."""
+    name = "base"
+    time_ordered = True  # iter_rows yields rows in time order (False: file/arrival order)
+
+    def append_many(self, rows: List[Row]) -> None:
+        raise NotImplementedError
+
+    def iter_rows(self, probe_id: str | None = None, t0: float | None = None,
+                  t1: float | None = None) -> Iterator[Row]:
+        """Rows in time order (file order for CSV), filtered by probe and [t0, t1)."""
+        raise NotImplementedError
+
+    def iter_positions(self, probe_id: str | None = None, t0: float | None = None,
+                       t1: float | None = None, pos: list | None = None) -> Iterator[Tuple[list, Row]]:
+        """(position after the row, row) in file order, resuming at `pos`.
+
+        Only the file-backed backends (time_ordered = False) implement this; a
+        position is [file name, byte offset] and stays valid while rows are
+        appended, so paging does not depend on timestamps at all.
+        """
+        raise NotImplementedError
+
+    def query(self, probe_id: str | None = None, t0: float | None = None,
+              t1: float | None = None, limit: int | None = None) -> List[Row]:
+        return list(itertools.islice(self.iter_rows(probe_id, t0, t1), limit))
+
+    def series(self, probe_id: str | None, t0: float | None = None, t1: float | None = None):
+        """(ts_ms int64, °C) NumPy arrays of one probe over [t0, t1).
+
+        Built from iter_rows here; the records backend returns mmap views instead.
+        """
+        import numpy as np
+        ts, cs = [], []
+        for ts_, t_c, _t_f, _pid in self.iter_rows(probe_id or "", t0, t1):
+            ts.append(ts_to_ms(ts_)); cs.append(t_c)
+        return np.asarray(ts, dtype=np.int64), np.asarray(cs, dtype=np.float64)
+
+    def series_many(self, probe_ids: Iterable[str], t0: float | None = None, t1: float | None = None):
+        """{probe_id: series(probe_id, t0, t1)}; one series() call per probe here,
+        which the indexed backends answer without a full scan."""
+        return {pid: self.series(pid, t0, t1) for pid in probe_ids}
+
+    def version(self) -> str | None:
+        """Changes whenever stored data changes (None = unknown). Exports use it
+        as their ETag, so an interrupted download resumes only onto the same data."""
+        return None
+
+    def iter_csv(self, probe_id: str | None = None, t0: float | None = None,
+                 t1: float | None = None, chunk_rows: int = 5000) -> Iterator[str]:
+        """CSV export (Excel-friendly, same columns as temperature_log.csv) in text chunks."""
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(REQUIRED_COLS + OPTIONAL_COLS)
+        yield buf.getvalue()  # header right away, so big exports start immediately
+        buf.seek(0); buf.truncate()
+        n = 0
+        for ts, t_c, t_f, pid in self.iter_rows(probe_id, t0, t1):
+            w.writerow([ts_to_iso(ts), f"{t_c:.3f}", f"{t_f:.3f}", pid])
+            n += 1
+            if n % chunk_rows == 0:
+                yield buf.getvalue()
+                buf.seek(0); buf.truncate()
+        yield buf.getvalue()
+
+    def close(self) -> None:
+        pass
+
+
+class CsvStorage(Storage):
+    """The original single-file CSV log (temperature_log.csv).
+
+    New logs use the compact layout unless schema="legacy". An existing log
+    keeps its layout; schema="compact" converts a legacy one once at open.
+    """
+    name = "csv"
+    time_ordered = False  # client timestamps can arrive late or out of order
+
+    def __init__(self, csv_file: Path, schema: str = ""):
+        self.csv_file = Path(csv_file)
+        ensure_csv(self.csv_file, schema or "compact")
+        if schema == "compact":
+            compact_csv(self.csv_file)
+
+    def append_many(self, rows: List[Row]) -> None:
+        append_csv_rows(self.csv_file, rows)
+
+    def iter_rows(self, probe_id=None, t0=None, t1=None) -> Iterator[Row]:
+        # No index: a streaming scan of the whole file.
+        return iter_csv_file(self.csv_file, probe_id, t0, t1)
+
+    def series_many(self, probe_ids, t0=None, t1=None):
+        # one scan for all probes instead of one per probe, each in time order
+        import numpy as np
+        want = {pid: ([], []) for pid in probe_ids}
+        for ts_, t_c, _t_f, pid in self.iter_rows(None, t0, t1):
+            cols = want.get(pid)
+            if cols is not None:
+                cols[0].append(ts_to_ms(ts_)); cols[1].append(t_c)
+        out = {}
+        for pid, (ts, cs) in want.items():
+            ts, cs = np.asarray(ts, dtype=np.int64), np.asarray(cs, dtype=np.float64)
+            order = np.argsort(ts, kind="stable")
+            out[pid] = ts[order], cs[order]
+        return out
+
+    def version(self):
+        return _file_version(self.csv_file)
+
+    def iter_positions(self, probe_id=None, t0=None, t1=None, pos=None):
+        offset = int(pos[1]) if pos else 0
+        name = self.csv_file.name
+        return (([name, end], row) for end, row in iter_csv_from(self.csv_file, probe_id, t0, t1, offset))
+
+
+def _file_version(path: Path) -> str | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def append_csv_rows(csv_file: Path, rows: List[Row], schema: str = "compact") -> None:
+    """Append rows to a CSV log with one write(), in the file's own layout
+    (a new file gets the header for `schema`)."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    if not csv_file.exists() or csv_file.stat().st_size == 0:
+        compact = schema != "legacy"
+        w.writerow(COMPACT_COLS if compact else REQUIRED_COLS + OPTIONAL_COLS)
+    else:
+        compact = "ts_ms" in read_header(csv_file)
+        if not compact:
+            ensure_schema(csv_file)
+    if compact:
+        w.writerows([ts_to_ms(ts), f"{t_c:.3f}", pid or ""] for ts, t_c, _t_f, pid in rows)
+    else:
+        w.writerows([ts_to_iso(ts), f"{t_c:.3f}", f"{t_f:.3f}", pid or ""] for ts, t_c, t_f, pid in rows)
+    with open(csv_file, "a", newline="", encoding="utf-8") as f:
+        f.write(buf.getvalue())
+
+
+def iter_csv_file(csv_file: Path, probe_id: str | None = None, t0: float | None = None,
+                  t1: float | None = None) -> Iterator[Row]:
+    """Stream rows of one CSV log (either layout), filtered by probe and [t0, t1)."""
+    try:
+        f = open(csv_file, "r", newline="", encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        r = csv.reader(f)
+        cols = [c.strip() for c in next(r, [])]
+        yield from _iter_records(r, cols, probe_id, t0, t1)
+
+
+def iter_csv_from(csv_file: Path, probe_id: str | None = None, t0: float | None = None,
+                  t1: float | None = None, offset: int = 0) -> Iterator[Tuple[int, Row]]:
+    """iter_csv_file from byte `offset` on, as (byte offset after the row, row).
+
+    A trailing line without its newline (an append in progress) is left for
+    the next call.
+    """
+    try:
+        f = open(csv_file, "rb")
+    except OSError:
+        return
+    with f:
+        header = f.readline()
+        cols = [c.strip() for c in next(csv.reader([header.decode("utf-8")]), [])]
+        end = max(int(offset), len(header))
+        f.seek(end)
+
+        def lines():
+            nonlocal end
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    return
+                end += len(raw)
+                yield raw.decode("utf-8")
+
+        # csv.reader pulls one line per record, so `end` is just past the row yielded
+        for row in _iter_records(csv.reader(lines()), cols, probe_id, t0, t1):
+            yield end, row
+
+
+def _iter_records(r, cols: List[str], probe_id, t0, t1) -> Iterator[Row]:
+    if "ts_ms" in cols:
+        yield from _iter_compact(r, cols, probe_id, t0, t1)
+        return
+    try:
+        i_ts, i_c = cols.index("timestamp"), cols.index("temperature_c")
+    except ValueError:
+        return
+    i_f = cols.index("temperature_f") if "temperature_f" in cols else -1
+    i_p = cols.index("probe_id") if "probe_id" in cols else -1
+    for rec in r:
+        try:
+            ts, t_c = rec[i_ts], float(rec[i_c])
+            pid = rec[i_p] if 0 <= i_p < len(rec) else ""
+            if probe_id is not None and pid != probe_id:
+                continue
+            if t0 is not None or t1 is not None:
+                t = ts_to_epoch(ts)
+                if (t0 is not None and t < t0) or (t1 is not None and t >= t1):
+                    continue
+            t_f = float(rec[i_f]) if 0 <= i_f < len(rec) and rec[i_f] else t_c * 9.0 / 5.0 + 32.0
+        except (IndexError, ValueError):
+            continue
+        yield ts, t_c, t_f, pid
+
+
+def _iter_compact(r, cols: List[str], probe_id, t0, t1) -> Iterator[Row]:
+    i_ts, i_c = cols.index("ts_ms"), cols.index("temperature_c")
+    i_p = cols.index("probe_id") if "probe_id" in cols else -1
+    lo = int(t0 * 1000) if t0 is not None else None
+    hi = int(t1 * 1000) if t1 is not None else None
+    for rec in r:
+        try:
+            pid = rec[i_p] if 0 <= i_p < len(rec) else ""
+            if probe_id is not None and pid != probe_id:
+                continue
+            ms = int(rec[i_ts])
+            if (lo is not None and ms < lo) or (hi is not None and ms >= hi):
+                continue
+            t_c = float(rec[i_c])
+        except (IndexError, ValueError):
+            continue
+        yield ms, t_c, t_c * 9.0 / 5.0 + 32.0, pid
+
+
+def open_storage(backend: str, csv_file: Path, sqlite_file: Path | None = None, log_dir: Path | None = None,
+                 max_bytes: int = 0, retention_days: int = 0, csv_schema: str = "",
+                 rec_dir: Path | None = None) -> Storage:
+    """Build the storage selected by STORAGE_BACKEND ("csv", "sqlite", "partitioned" or "records").
+
+    `csv_schema` (CSV_SCHEMA) picks the CSV layout: "" = compact for new files,
+    "compact" = also convert an existing legacy log, "legacy" = ISO + °F columns.
+    """
+    backend = (backend or "csv").strip().lower()
+    csv_schema = (csv_schema or "").strip().lower()
+    if backend == "sqlite":
+        from core.sqlite_store import SqliteStorage
+        return SqliteStorage(sqlite_file or Path(csv_file).with_suffix(".db"))
+    if backend == "partitioned":
+        from core.partitions import PartitionedCsvStorage
+        return PartitionedCsvStorage(log_dir or Path(csv_file).parent / "logs",
+                                     max_bytes=max_bytes, retention_days=retention_days,
+                                     schema=csv_schema or "compact")
+    if backend == "records":
+        from core.recstore import RecordStorage
+        return RecordStorage(rec_dir or Path(csv_file).parent / "records")
+    return CsvStorage(csv_file, schema=csv_schema)
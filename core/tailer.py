@@ -0,0 +1,115 @@
+# core/tailer.py
+from __future__ import annotations
+import csv, os, threading
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+from core.storage import read_header
+
+TailRow = Tuple[Union[int, str], float, float, str]  # (epoch ms or ISO timestamp, °C, °F, probe_id)
+
+
+class CsvTailer:
+    """Follow a growing CSV log by byte offset.
+
+    Only bytes appended since the last poll are parsed. A new inode (rotation,
+    migration) or a file shorter than the saved offset (truncation) restarts
+    from the top of the new file. The first open can start `backfill_bytes`
+    before EOF so a restart does not re-parse the whole history.
+    Rows are handed to subscribers, so the in-process writer, PullLogger and
+    other processes writing the same file all reach the UI the same way.
+    """
+    def __init__(self, csv_file: Path, backfill_bytes: Optional[int] = None):
+        self.csv_file = Path(csv_file)
+        self.backfill_bytes = backfill_bytes
+        self.offset = 0
+        self.inode: Optional[Tuple[int, int]] = None
+        self._partial = b""
+        self._subs: List[Callable[[List[TailRow]], None]] = []
+        self.lock = threading.Lock()
+        self.stop_evt = threading.Event()
+        self.th = None
+
+    def subscribe(self, fn: Callable[[List[TailRow]], None]) -> None:
+        self._subs.append(fn)
+
+    def _reset(self, st: os.stat_result, first_open: bool) -> None:
+        self.inode = (st.st_dev, st.st_ino)
+        self._partial = b""
+        self.offset = 0
+        if first_open and self.backfill_bytes is not None and st.st_size > self.backfill_bytes:
+            self.offset = st.st_size - self.backfill_bytes
+            self._partial = None  # drop the first (likely cut) line
+
+    def _parse(self, lines: List[bytes]) -> List[TailRow]:
+        cols = read_header(self.csv_file)
+        compact = "ts_ms" in cols
+        try:
+            i_ts, i_c = cols.index("ts_ms" if compact else "timestamp"), cols.index("temperature_c")
+        except ValueError:
+            return []
+        i_f = cols.index("temperature_f") if "temperature_f" in cols else -1
+        i_p = cols.index("probe_id") if "probe_id" in cols else -1
+        header = ",".join(cols)
+        rows: List[TailRow] = []
+        for rec in csv.reader(l.decode("utf-8", "ignore") for l in lines):
+            if len(rec) <= max(i_ts, i_c) or ",".join(rec) == header:
+                continue
+            try:
+                t_c = float(rec[i_c])
+                ts = int(rec[i_ts]) if compact else rec[i_ts]
+            except ValueError:
+                continue
+            t_f = float(rec[i_f]) if 0 <= i_f < len(rec) and rec[i_f] else t_c * 9.0 / 5.0 + 32.0
+            pid = rec[i_p] if 0 <= i_p < len(rec) else ""
+            rows.append((ts, t_c, t_f, pid))
+        return rows
+
+    def poll(self) -> List[TailRow]:
+        """Parse newly appended complete lines and notify subscribers."""
+        with self.lock:
+            try:
+                st = os.stat(self.csv_file)
+            except OSError:
+                return []
+            if self.inode != (st.st_dev, st.st_ino) or st.st_size < self.offset:
+                self._reset(st, first_open=self.inode is None)
+            if st.st_size == self.offset:
+                return []
+            with open(self.csv_file, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read(st.st_size - self.offset)
+            self.offset += len(chunk)
+            if self._partial is None:
+                cut = chunk.find(b"\n")
+                if cut < 0:
+                    return []
+                chunk, self._partial = chunk[cut + 1:], b""
+            data = self._partial + chunk
+            end = data.rfind(b"\n")
+            self._partial = data[end + 1:]
+            if end < 0:
+                return []
+            rows = self._parse(data[:end].splitlines())
+        for fn in self._subs:
+            try:
+                fn(rows)
+            except Exception:
+                pass
+        return rows
+
+    def _loop(self, period_sec: float):
+        while not self.stop_evt.wait(period_sec):
+            try:
+                self.poll()
+            except Exception:
+                pass
+
+    def start(self, period_sec: float = 1.0):
+        if self.th and self.th.is_alive(): return
+        self.stop_evt.clear()
+        self.th = threading.Thread(target=self._loop, args=(max(0.1, float(period_sec)),), name="csv-tailer", daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.stop_evt.set()
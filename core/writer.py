@@ -0,0 +1,124 @@
+# core/writer.py
+from __future__ import annotations
+import queue, threading
+from typing import Callable, List
+
+from core.storage import Row, Storage
+
+
+class IngestWriter:
+    """Write-behind queue for ingest rows (group commit).
+
+    HTTP handlers call submit(), which only enqueues. One flusher thread drains
+    the bounded queue and hands each batch to the storage backend in one call
+    (one write() for CSV, one transaction for SQLite), either every
+    `flush_interval_sec` or as soon as `flush_rows` are waiting.
+    """
+    def __init__(self, storage: Storage, flush_interval_sec: float = 1.0, flush_rows: int = 500, queue_max: int = 20000):
+        self.storage = storage
+        self.flush_interval_sec = max(0.05, float(flush_interval_sec))
+        self.flush_rows = max(1, int(flush_rows))
+        self.queue_max = max(1, int(queue_max))
+        self._q: "queue.Queue[Row]" = queue.Queue(maxsize=self.queue_max)
+        self._pending: List[Row] = []      # rows from a failed flush, retried first
+        self._flush_lock = threading.Lock()
+        self._full_evt = threading.Event()  # set once flush_rows are waiting
+        self.stop_evt = threading.Event()
+        self.th = None
+        self._subs: List[Callable[[List[Row]], None]] = []
+        # counters (read without locking; approximate is fine)
+        self.rows_written = 0
+        self.flushes = 0
+        self.rejected = 0
+        self.write_errors = 0
+
+    @classmethod
+    def from_config(cls, storage: Storage, cfg) -> "IngestWriter":
+        return cls(
+            storage,
+            flush_interval_sec=float(cfg.get("writer_flush_interval_sec", 1.0)),
+            flush_rows=int(cfg.get("writer_flush_rows", 500)),
+            queue_max=int(cfg.get("writer_queue_max", 20000)),
+        )
+
+    # --- producer side ---
+    def submit(self, ts: str, t_c: float, t_f: float, probe_id: str | None = "") -> bool:
+        """Enqueue one row. Returns False (never blocks) when the queue is full."""
+        return self.submit_many([(ts, t_c, t_f, probe_id or "")]) == 1
+
+    def submit_many(self, rows: List[Row]) -> int:
+        """Enqueue rows in order; returns how many fit before the queue filled up.
+
+        Rows queued together are flushed together (one storage write)."""
+        n = 0
+        for ts, t_c, t_f, pid in rows:
+            try:
+                self._q.put_nowait((ts, float(t_c), float(t_f), pid or ""))
+            except queue.Full:
+                self.rejected += len(rows) - n
+                break
+            n += 1
+        if self._q.qsize() >= self.flush_rows:
+            self._full_evt.set()
+        return n
+
+    def subscribe(self, fn: Callable[[List[Row]], None]) -> None:
+        """Call fn(rows) after every successful flush (rollups and other derived data)."""
+        self._subs.append(fn)
+
+    def depth(self) -> int:
+        return self._q.qsize() + len(self._pending)
+
+    # --- flusher ---
+    def _take(self, limit: int) -> List[Row]:
+        rows: List[Row] = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._q.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def flush(self) -> int:
+        """Write everything currently queued. Safe to call from any thread."""
+        with self._flush_lock:
+            rows = self._pending + self._take(self.queue_max)
+            self._pending = []
+            if not rows:
+                return 0
+            try:
+                self.storage.append_many(rows)
+            except Exception:
+                # e.g. file locked by Excel on Windows: keep rows (bounded) and retry next cycle
+                self.write_errors += 1
+                self._pending = rows[-self.queue_max:]
+                return 0
+            self.rows_written += len(rows)
+            self.flushes += 1
+        for fn in self._subs:
+            try:
+                fn(rows)
+            except Exception:
+                pass
+        return len(rows)
+
+    def _loop(self):
+        while not self.stop_evt.is_set():
+            # Flush once per interval, or early when a full batch is waiting.
+            self._full_evt.wait(self.flush_interval_sec)
+            self._full_evt.clear()
+            self.flush()
+
+    def start(self):
+        if self.th and self.th.is_alive(): return
+        self.stop_evt.clear()
+        self.th = threading.Thread(target=self._loop, name="ingest-writer", daemon=True)
+        self.th.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the flusher and write whatever is still queued."""
+        self.stop_evt.set()
+        self._full_evt.set()
+        if self.th:
+            self.th.join(timeout)
+        self.flush()
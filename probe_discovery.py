@@ -1,13 +1,15 @@
 # probe_discovery.py
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Callable, Dict, Optional
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Mapping, Optional
 from zeroconf import ServiceBrowser, Zeroconf, ServiceStateChange, ServiceInfo
 import socket
 import threading
 import time
 
 SERVICE_TYPE = "_temps-probe._tcp.local."
+STALE_SEC = 15.0   # the Devices page shows a probe as live for this long after its last reading
 
 @dataclass
 class ProbeInfo:
@@ -18,12 +20,87 @@ class ProbeInfo:
     properties: Dict[str, str] = field(default_factory=dict)
     last_seen: float = field(default_factory=time.time)
 
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    probes: Mapping[str, ProbeInfo]    # key (host) -> probe
+    by_id: Mapping[str, ProbeInfo]     # TXT id, then name
+    by_host: Mapping[str, ProbeInfo]   # host without trailing dot, lower-case
+    by_ip: Mapping[str, ProbeInfo]
+
+
+def _host_key(host: str) -> str:
+    return (host or "").rstrip(".").lower()
+
+
+class ProbeRegistry:
+    """Known probes with exact-match indexes by probe id, host and IP.
+
+    Writers (discovery add/remove, rare) rebuild the indexes under a lock and
+    swap in a new immutable snapshot; readers just take the current snapshot
+    reference, no lock and no copy. `touch` is the ingest hot path: one dict
+    lookup plus a last_seen store on the matched ProbeInfo.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snap = self._build({})
+
+    @staticmethod
+    def _build(probes: Dict[str, ProbeInfo]) -> RegistrySnapshot:
+        by_id: Dict[str, ProbeInfo] = {}
+        by_host: Dict[str, ProbeInfo] = {}
+        by_ip: Dict[str, ProbeInfo] = {}
+        for p in probes.values():
+            if p.name:
+                by_id.setdefault(p.name, p)
+            if p.host:
+                by_host[_host_key(p.host)] = p
+            if p.ip:
+                by_ip[p.ip] = p
+        for p in probes.values():
+            pid = (p.properties or {}).get("id")
+            if pid:
+                by_id[pid] = p  # the TXT id wins over a name that happens to collide
+        return RegistrySnapshot(MappingProxyType(dict(probes)), MappingProxyType(by_id),
+                                MappingProxyType(by_host), MappingProxyType(by_ip))
+
+    def snapshot(self) -> RegistrySnapshot:
+        return self._snap
+
+    def put(self, key: str, probe: ProbeInfo) -> None:
+        with self._lock:
+            probes = dict(self._snap.probes)
+            probes[key] = probe
+            self._snap = self._build(probes)
+
+    def remove(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            probes = dict(self._snap.probes)
+            for k in keys:
+                probes.pop(k, None)
+            self._snap = self._build(probes)
+
+    def find(self, probe_id: str = "", host: str = "", ip: str = "") -> Optional[ProbeInfo]:
+        snap = self._snap
+        return ((probe_id and snap.by_id.get(probe_id))
+                or (host and snap.by_host.get(_host_key(host)))
+                or (ip and snap.by_ip.get(ip))
+                or None)
+
+    def touch(self, probe_id: str, ts: Optional[float] = None, ip: str = "") -> bool:
+        """Mark a probe as seen now (or at `ts`). False if it is not a known probe."""
+        p = self.find(probe_id=probe_id, ip=ip)
+        if p is None:
+            return False
+        p.last_seen = time.time() if ts is None else float(ts)
+        return True
+
+
 class ProbeDiscovery:
     def __init__(self):
         self._zc = Zeroconf()
         self._browser = None
         self._lock = threading.RLock()
-        self._probes: Dict[str, ProbeInfo] = {}  # key by host
+        self.registry = ProbeRegistry()  # key by host
         self.on_change: Optional[Callable[[Dict[str, ProbeInfo]], None]] = None
 
     def _resolve_ip(self, host: str) -> Optional[str]:
@@ -64,24 +141,21 @@ class ProbeDiscovery:
             if not probe:
                 return
             with self._lock:
-                self._probes[probe.host] = probe
-                snapshot = dict(self._probes)
+                self.registry.put(probe.host, probe)
             if self.on_change:
-                self.on_change(snapshot)
+                self.on_change(dict(self.registry.snapshot().probes))
 
         elif state_change == ServiceStateChange.Removed:
             with self._lock:
                 # name is like "TempSensor-9A3F._temps-probe._tcp.local."
                 # We don’t always get host here; remove by prefix match
                 to_delete = []
-                for host, p in self._probes.items():
+                for host, p in self.registry.snapshot().probes.items():
                     if name.startswith(p.name):
                         to_delete.append(host)
-                for host in to_delete:
-                    self._probes.pop(host, None)
-                snapshot = dict(self._probes)
+                self.registry.remove(to_delete)
             if self.on_change:
-                self.on_change(snapshot)
+                self.on_change(dict(self.registry.snapshot().probes))
     # --- zeroconf callback compatibility wrapper ---
     def _handle_compat(self, *args, **kwargs):
         """Accept both new-style keyword args (zeroconf=..., service_type=..., name=..., state_change=...)
@@ -125,6 +199,19 @@ class ProbeDiscovery:
             # Best-effort; ignore
             pass
 
-    def list_probes(self) -> Dict[str, ProbeInfo]:
-        with self._lock:
-            return dict(self._probes)
+    def list_probes(self) -> Mapping[str, ProbeInfo]:
+        """Read-only view of the current snapshot (no lock, no copy)."""
+        return self.registry.snapshot().probes
+
+    def touch(self, probe_id: str, ts: Optional[float] = None, ip: str = "") -> bool:
+        p = self.registry.find(probe_id=probe_id, ip=ip)
+        was = getattr(p, "last_seen", None) if p is not None else None
+        if not self.registry.touch(probe_id, ts, ip):
+            return False
+        # a probe coming back after a silence is a state change worth announcing
+        if self.on_change and (not was or time.time() - float(was) > STALE_SEC):
+            try:
+                self.on_change(dict(self.registry.snapshot().probes))
+            except Exception:
+                pass
+        return True
@@ -0,0 +1,67 @@
+import importlib
+import os
+
+import pytest
+
+pytest.importorskip("starlette")
+from starlette.testclient import TestClient  # noqa: E402
+
+TOKEN = "t0k"
+
+
+@pytest.fixture(scope="module")
+def hub(tmp_path_factory):
+    """asgi.py (and the app.py it wraps) against a throwaway log, imported once."""
+    d = tmp_path_factory.mktemp("hub")
+    env = {"CSV_FILE": str(d / "log.csv"), "ROLLUP_DIR": str(d / "rollups"), "LOG_DIR": str(d / "logs"),
+           "SERVER_TOKEN": TOKEN, "MDNS_ENABLE": "0"}
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        asgi = importlib.import_module("asgi")
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    asgi.hub.LIMITER.configure(rate_per_sec=0)
+    with TestClient(asgi.app) as client:
+        yield asgi, client
+
+
+def _flushed_rows(asgi, probe_id):
+    asgi.hub.writer.flush()
+    return [r[1] for r in asgi.hub.storage.iter_rows(probe_id)]
+
+
+def test_ingest_needs_the_token(hub):
+    _asgi, client = hub
+    assert client.post("/api/ingest", json={"temperature_c": 20.0}).status_code == 401
+    assert client.post("/api/ingest", json={"temperature_c": 20.0, "token": TOKEN}).status_code == 200
+
+
+def test_single_batch_and_csv_ingest_share_the_writer(hub):
+    asgi, client = hub
+    auth = {"X-Token": TOKEN}
+    r = client.post("/api/ingest", json={"temperature_c": 21.0}, headers=dict(auth, **{"X-Probe-ID": "as-1"}))
+    assert r.json() == {"ok": True}
+    r = client.get("/api/ingest", params={"temperature_c": 21.5, "probe_id": "as-1", "token": TOKEN})
+    assert r.status_code == 200
+    r = client.post("/api/ingest_batch", content=b'[{"c": 22.0}, {"c": 22.5}]',
+                    headers=dict(auth, **{"X-Probe-ID": "as-1", "Content-Type": "application/json"}))
+    assert r.json()["accepted"] == 2
+    r = client.post("/api/ingest_csv", content=b"23.0,as-1\n", headers=auth)
+    assert r.json()["accepted"] == 1
+    assert _flushed_rows(asgi, "as-1") == [21.0, 21.5, 22.0, 22.5, 23.0]
+    assert asgi.hub.LIVE.last_by_probe()["as-1"][1] == 23.0
+
+
+def test_read_endpoints_and_the_mounted_flask_app(hub):
+    _asgi, client = hub
+    assert client.get("/api/health").json()["ok"] is True
+    metrics = client.get("/api/metrics").json()
+    assert metrics["ok"] and "writer" in metrics and "stream" in metrics
+    assert isinstance(client.get("/api/probes").json(), list)
+    r = client.get("/api/readings", params={"probe_id": "as-1"})  # served by Flask through WSGI
+    assert r.status_code == 200 and "t" in r.json()
@@ -0,0 +1,50 @@
+import pytest
+
+from api.service import ApiService
+from core import binproto
+from core.storage import CsvStorage
+
+
+@pytest.mark.parametrize("content_type,temps", [
+    ("application/x-temps-v1", [21.5, -40.25, 0.0]),
+    ("application/x-temps-v1f", [21.5, 1250.0, -3.75]),
+])
+def test_encode_decode_round_trip(content_type, temps):
+    records = [("probe-rt", 1767225600 + i, t, 65534 + i) for i, t in enumerate(temps)]
+    body = binproto.encode_records(records, content_type)
+    assert len(body) % len(binproto.encode_records(records[:1], content_type)) == 0
+    out = list(binproto.decode(body, content_type))
+    assert [(h, e, round(t, 2), s) for h, e, t, s in out] == [
+        (binproto.probe_hash("probe-rt"), e, t, s & 0xFFFF) for _pid, e, t, s in records]
+
+
+def test_truncated_body_rejected():
+    body = binproto.encode_records([("p", 1, 20.0, 1)])
+    with pytest.raises(ValueError):
+        list(binproto.decode(body[:-1], "application/x-temps-v1"))
+
+
+def test_binary_ingest_resolves_seeded_ids(tmp_path):
+    storage = CsvStorage(tmp_path / "log.csv")
+    svc = ApiService({}, str(tmp_path / "log.csv"), storage=storage)
+    binproto.remember_many(["bin-known"])  # e.g. from discovery or the stored history
+    body = binproto.encode_records([("bin-known", 1767225600, 21.25, 1), ("bin-known", 1767225601, 21.5, 2),
+                                    ("bin-unknown", 1767225602, 19.0, 1)])
+    status, reply, _headers = svc.ingest_batch(body, "application/x-temps-v1")
+    assert status == 200 and reply["accepted"] == 3
+    again = svc.ingest_batch(body[:12], "application/x-temps-v1")[1]
+    assert again["duplicates"] == 1
+    rows = [(pid, round(t_c, 2)) for _ts, t_c, _t_f, pid in storage.iter_rows()]
+    unknown = "#%08x" % binproto.probe_hash("bin-unknown")
+    assert rows == [("bin-known", 21.25), ("bin-known", 21.5), (unknown, 19.0)]
+
+
+def test_names_evict_least_recently_used(monkeypatch):
+    monkeypatch.setattr(binproto, "_MAX_NAMES", 3)
+    monkeypatch.setattr(binproto, "_names", binproto.OrderedDict())
+    for pid in ("a", "b", "c"):
+        binproto.remember(pid)
+    binproto.resolve(binproto.probe_hash("a"))  # recently used: kept
+    binproto.remember("d")
+    assert binproto.resolve(binproto.probe_hash("a")) == "a"
+    assert binproto.resolve(binproto.probe_hash("b")).startswith("#")
@@ -0,0 +1,37 @@
+import os
+
+from core.storage import CsvStorage, append_csv_rows, append_row, compact_csv, csv_schema, migrate_csv
+
+LEGACY3 = "timestamp,temperature_c,temperature_f\n2026-10-17T08:00:00,20.000,68.000\n2026-10-17T08:00:05,20.500,68.900\n"
+
+
+def test_three_column_log_is_migrated_once(tmp_path):
+    log = tmp_path / "log.csv"
+    log.write_text(LEGACY3)
+    assert migrate_csv(log) is True
+    assert log.read_text().splitlines()[:2] == ["timestamp,temperature_c,temperature_f,probe_id",
+                                                "2026-10-17T08:00:00,20.000,68.000,"]
+    assert migrate_csv(log) is False
+
+
+def test_tagged_appends_do_not_rewrite_the_log(tmp_path):
+    log = tmp_path / "log.csv"
+    log.write_text(LEGACY3)
+    append_row(log, "2026-10-17T08:00:10", 21.0, 69.8, probe_id="a")  # migrates here
+    inode = os.stat(log).st_ino
+    for i in range(20):
+        append_row(log, f"2026-10-17T08:01:{i:02d}", 21.0, 69.8, probe_id="a")
+    assert os.stat(log).st_ino == inode  # appended in place, never replaced
+    lines = log.read_text().splitlines()
+    assert len(lines) == 1 + 2 + 21 and lines[-1] == "2026-10-17T08:01:19,21.000,69.800,a"
+
+
+def test_compact_conversion_keeps_rows(tmp_path):
+    log = tmp_path / "log.csv"
+    log.write_text(LEGACY3 + "garbage,x,y\n")
+    migrate_csv(log)
+    assert compact_csv(log) is True and csv_schema(log) == "compact"
+    rows = list(CsvStorage(log).iter_rows())
+    assert [r[1] for r in rows] == [20.0, 20.5] and all(isinstance(r[0], int) for r in rows)
+    append_csv_rows(log, [(rows[-1][0] + 5000, 21.0, 69.8, "b")])
+    assert log.read_text().splitlines()[-1].endswith(",21.000,b")
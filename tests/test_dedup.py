@@ -0,0 +1,35 @@
+from core.dedup import SEQ_MOD_BINARY, SeqTracker
+
+
+def test_retries_are_dropped():
+    seqs = SeqTracker(window=64)
+    assert [seqs.accept("p", n) for n in (1, 2, 3)] == [True] * 3
+    assert [seqs.accept("p", n) for n in (3, 2)] == [False, False]
+    assert seqs.accept("p", 5) and seqs.accept("p", 4)  # late, fills the gap
+    assert seqs.stats("p")["duplicates"] == 2
+
+
+def test_reboot_to_small_seq_is_not_a_duplicate():
+    seqs = SeqTracker(window=1024)
+    for n in range(1, 50):
+        assert seqs.accept("p", n)
+    assert [seqs.accept("p", n) for n in range(1, 6)] == [True] * 5
+    assert seqs.stats("p")["resets"] == 1
+    assert seqs.accept("p", 5) is False  # a retry after the reboot is still caught
+
+
+def test_client_timestamp_tells_retry_from_reboot():
+    seqs = SeqTracker(window=1024)
+    for n in range(100, 120):
+        assert seqs.accept("p", n, stamp=1000 + n)
+    assert seqs.accept("p", 110, stamp=1110) is False      # same reading again
+    assert seqs.accept("p", 110, stamp=9000) is True       # rebooted into a seq already used
+    assert seqs.accept("p", 111, stamp=9001) is True
+    assert seqs.accept("p", 111, stamp=9001) is False
+
+
+def test_binary_seq_wraps():
+    seqs = SeqTracker(window=64)
+    assert seqs.accept("p", SEQ_MOD_BINARY - 1, SEQ_MOD_BINARY)
+    assert seqs.accept("p", 0, SEQ_MOD_BINARY)
+    assert seqs.accept("p", SEQ_MOD_BINARY - 1, SEQ_MOD_BINARY) is False
@@ -0,0 +1,26 @@
+import numpy as np
+
+from core.downsample import lttb, lttb_indices, point_budget
+
+
+def test_point_budget():
+    assert point_budget(800) == 1600
+    assert point_budget(10) == 100  # floor
+    assert point_budget() == 2000
+
+
+def test_short_series_are_returned_whole():
+    assert lttb_indices([1, 2, 3], [1, 2, 3], 10).tolist() == [0, 1, 2]
+    assert lttb_indices(np.arange(10), np.arange(10), 2).tolist() == list(range(10))
+
+
+def test_lttb_keeps_ends_and_spikes():
+    x = 1792195200.0 + np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[4321], y[7777] = 50.0, -50.0
+    idx = lttb_indices(x, y, 200)
+    assert len(idx) == 200 and idx[0] == 0 and idx[-1] == len(x) - 1
+    assert (np.diff(idx) > 0).all()  # strictly increasing, no repeats
+    assert {4321, 7777} <= set(idx.tolist())
+    xs, ys = lttb(x, y, 200)
+    assert ys.max() == 50.0 and ys.min() == -50.0 and xs[0] == x[0]
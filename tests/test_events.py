@@ -0,0 +1,55 @@
+import json
+
+from core.events import EventBus
+
+
+def _frames(text):
+    out = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def test_readings_are_coalesced_into_one_frame():
+    bus = EventBus(coalesce_sec=0)
+    client = bus.open()
+    bus.reading("a", 1792195200.12345, 20.5)
+    bus.reading("b", 1792195201.0, 21.0)
+    bus.probes_changed({"tp-2": 1, "tp-1": 1})
+    frames = _frames(bus.drain(client, generation=7))
+    assert frames[0] == ("readings", {"gen": 7, "rows": [["a", 1792195200.123, 20.5], ["b", 1792195201.0, 21.0]],
+                                      "resync": False})
+    assert frames[1][0] == "probes" and frames[1][1]["probes"] == ["tp-1", "tp-2"]
+    assert bus.drain(client) == ""
+
+
+def test_slow_client_gets_a_resync_instead_of_blocking():
+    bus = EventBus(queue_len=10)
+    client = bus.open()
+    for i in range(25):
+        bus.reading("a", 1792195200.0 + i, 20.0)
+    (readings, probes) = _frames(bus.drain(client, generation=25))
+    assert readings[1]["resync"] is True and len(readings[1]["rows"]) == 10
+    assert probes[0] == "probes"
+    assert bus.drain(client) == ""  # resync is reported once
+
+
+def test_client_cap_and_hello():
+    bus = EventBus(max_clients=1, refresh_ms=1500)
+    first = bus.open()
+    assert bus.open() is None and bus.stats()["refused"] == 1
+    assert _frames(bus.hello(3)) == [("hello", {"gen": 3, "retry_ms": 3000, "refresh_ms": 1500})]
+    bus.close(first)
+    assert bus.open() is not None
+
+
+def test_wsgi_stream_ends_when_closed():
+    bus = EventBus(coalesce_sec=0, heartbeat_sec=1)
+    client = bus.open()
+    gen = bus.stream(client, generation=lambda: 1)
+    assert next(gen).startswith("retry: 3000\nevent: hello")
+    bus.reading("a", 1792195200.0, 20.0)
+    assert _frames(next(gen))[0][0] == "readings"
+    bus.close_all()
+    assert list(gen) == [] and bus.stats()["clients"] == 0
@@ -0,0 +1,19 @@
+from core.storage import CsvStorage
+from tests.test_readings import _client
+
+
+def test_generated_export_resumes_with_range(tmp_path):
+    storage = CsvStorage(tmp_path / "log.csv")
+    storage.append_many([(1700000000000 + i * 1000, 20.0 + i % 7, 0.0, "p%d" % (i % 3)) for i in range(3000)])
+    client = _client(storage, tmp_path / "log.csv")
+    for enc in ("identity", "gzip"):
+        full = client.get("/api/export.csv", headers={"Accept-Encoding": enc})
+        etag = full.headers["ETag"]
+        part = client.get("/api/export.csv", headers={"Accept-Encoding": enc, "Range": "bytes=1000-",
+                                                      "If-Range": etag})
+        assert part.status_code == 206
+        assert part.data == full.data[1000:]
+        storage.append_many([(1800000000000, 30.0, 86.0, "p0")])
+        stale = client.get("/api/export.csv", headers={"Accept-Encoding": enc, "Range": "bytes=1000-",
+                                                       "If-Range": etag})
+        assert stale.status_code == 200  # data changed: the whole export again
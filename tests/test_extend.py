@@ -0,0 +1,47 @@
+import pytest
+
+from components import temp_graph
+from components.temp_graph import live_cursor, live_extend
+from core.live_buffer import LiveBuffer
+
+T = 1792195200.0
+
+
+@pytest.fixture
+def live(monkeypatch):
+    buf = LiveBuffer(capacity=1000, window_sec=3600)
+    monkeypatch.setattr(temp_graph, "LIVE", buf)
+    return buf
+
+
+def test_only_new_points_are_sent(live):
+    live.extend([("a", T, 20.0), ("b", T, 21.0)])
+    cursor = live_cursor(live.window(), key="k")
+    assert live_extend(cursor, 100, key="k") == (None, cursor)  # nothing new
+    live.extend([("b", T + 1, 21.5), ("b", T + 2, 22.0)])
+    ext, cursor = live_extend(cursor, 100, key="k")
+    assert ext == ({"x": [[T + 1, T + 2]], "y": [[21.5, 22.0]]}, [1], 150)  # trace 1 = "b"
+    assert cursor["sent"] == 2 and cursor["last"]["b"] == T + 2
+    live.append("a", T + 3, 20.5)
+    ext, cursor = live_extend(cursor, 100, key="k", x_of=lambda ts: [t * 1000 for t in ts])
+    assert ext[0] == {"x": [[(T + 3) * 1000]], "y": [[20.5]]} and ext[1] == [0]
+
+
+def test_full_figure_is_due(live):
+    live.extend([("a", T, 20.0)])
+    cursor = live_cursor(live.window(), key="k")
+    assert live_extend(None, 100, key="k") == (None, None)          # first load
+    assert live_extend(cursor, 100, key="other") == (None, None)    # width/window changed
+    live.append("b", T, 21.0)
+    assert live_extend(cursor, 100, key="k") == (None, None)        # new probe -> new trace
+    cursor = live_cursor(live.window(), key="k")
+    live.extend(("a", T + i, 20.0) for i in range(1, 52))
+    assert live_extend(cursor, 100, key="k") == (None, None)        # tail > max_points / 2
+
+
+def test_since_keeps_quiet_probes_from_being_resent(live):
+    live.extend([("a", T, 20.0), ("a", T + 10, 20.5), ("b", T + 10, 21.0)])
+    cursor = live_cursor(live.window(since=T + 5), key="k")
+    live.append("b", T + 11, 21.5)
+    ext, _ = live_extend(cursor, 100, key="k", since=T + 5)
+    assert ext[0]["x"] == [[T + 11]]
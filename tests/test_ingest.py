@@ -0,0 +1,73 @@
+import time
+
+from api.service import ApiService
+from core.ratelimit import LIMITER
+from core.storage import CsvStorage
+
+
+def _service(tmp_path, monkeypatch):
+    monkeypatch.setattr(LIMITER, "rate", 0)  # unlimited
+    storage = CsvStorage(tmp_path / "log.csv")
+    return ApiService({}, str(tmp_path / "log.csv"), storage=storage), storage
+
+
+def test_unparseable_timestamp_falls_back_to_arrival_time(tmp_path, monkeypatch):
+    svc, storage = _service(tmp_path, monkeypatch)
+    before = time.time()
+    status, body, _ = svc.ingest_one({"temperature_c": 21.5, "timestamp": "not a time"}, "ts-a")
+    assert status == 200 and body == {"ok": True}
+    (row,) = list(storage.iter_rows("ts-a"))
+    assert row[1] == 21.5 and before - 1 <= row[0] / 1000 <= time.time() + 1
+
+
+def test_missing_temperature_is_a_400(tmp_path, monkeypatch):
+    svc, _storage = _service(tmp_path, monkeypatch)
+    status, body, _ = svc.ingest_one({"timestamp": 1792195200}, "ts-b")
+    assert status == 400 and "temperature" in body["error"]
+
+
+def test_batch_json_array_and_wrapped_readings(tmp_path, monkeypatch):
+    svc, storage = _service(tmp_path, monkeypatch)
+    body = b'[{"temperature_c": 21.4, "timestamp": 1792195200}, {"temp_f": 70.7, "timestamp": 1792195205}]'
+    status, reply, _ = svc.ingest_batch(body, "application/json", probe_id="bj-1")
+    assert status == 200 and (reply["accepted"], reply["rejected"]) == (2, 0)
+    wrapped = b'{"probe_id": "bj-2", "readings": [{"c": 19.0, "ts": 1792195210000, "probe_id": "bj-3"}, {"c": 19.5}]}'
+    assert svc.ingest_batch(wrapped, "application/json")[1]["accepted"] == 2
+    got = {(r[3], r[1]) for r in storage.iter_rows()}
+    assert {("bj-1", 21.4), ("bj-1", 21.5), ("bj-3", 19.0), ("bj-2", 19.5)} == got
+
+
+def test_batch_ndjson_reports_bad_rows_by_index(tmp_path, monkeypatch):
+    svc, storage = _service(tmp_path, monkeypatch)
+    body = b'{"c": 20.0, "probe_id": "nd"}\nnot json\n{"probe_id": "nd"}\n{"c": 21.0, "probe_id": "nd"}\n'
+    status, reply, _ = svc.ingest_batch(body, "application/x-ndjson")
+    assert status == 200 and reply["accepted"] == 2
+    assert [e["index"] for e in reply["errors"]] == [1, 2]
+    assert [r[1] for r in storage.iter_rows("nd")] == [20.0, 21.0]
+
+
+def test_batch_limits(tmp_path, monkeypatch):
+    svc, _storage = _service(tmp_path, monkeypatch)
+    assert svc.ingest_batch(b"not json at all", "application/json")[0] == 400
+    monkeypatch.setattr("api.service.BATCH_MAX_ROWS", 2)
+    assert svc.ingest_batch(b'[{"c": 1}, {"c": 2}, {"c": 3}]', "application/json")[0] == 413
+
+
+def test_csv_ingest_headerless_and_with_header(tmp_path, monkeypatch):
+    svc, storage = _service(tmp_path, monkeypatch)
+    status, reply, _ = svc.ingest_csv("20.5,cv-1\n21.0\nabc,cv-1\n", probe_id="cv-0")
+    assert status == 200 and (reply["accepted"], reply["rejected"]) == (2, 1)
+    assert reply["errors"][0]["index"] == 2
+    text = "probe_id,temperature_f,timestamp\ncv-2,68.0,2026-10-17T08:00:00\ncv-2,69.8,1792195205\n"
+    assert svc.ingest_csv(text)[1]["accepted"] == 2
+    assert [(r[3], r[1]) for r in storage.iter_rows("cv-2")] == [("cv-2", 20.0), ("cv-2", 21.0)]
+    assert {r[3] for r in storage.iter_rows() if r[3].startswith("cv-")} == {"cv-0", "cv-1", "cv-2"}
+
+
+def test_csv_ingest_is_one_storage_write(tmp_path, monkeypatch):
+    svc, storage = _service(tmp_path, monkeypatch)
+    calls = []
+    append_many = storage.append_many
+    monkeypatch.setattr(storage, "append_many", lambda rows: calls.append(len(rows)) or append_many(rows))
+    svc.ingest_csv("".join(f"{20 + i / 100:.2f},bulk\n" for i in range(500)))
+    assert calls == [500]
@@ -0,0 +1,47 @@
+from components.temp_graph import _badge_row, _build_figure, _live_frame
+from core.live_buffer import LiveBuffer
+
+T = 1792195200.0
+
+
+def test_ring_keeps_the_newest_points_in_time_order():
+    live = LiveBuffer(capacity=4, window_sec=3600)
+    for i in range(6):
+        assert live.append("a", T + i, 20 + i)
+    assert live.window()["a"] == ([T + 2, T + 3, T + 4, T + 5], [22.0, 23.0, 24.0, 25.0])
+    assert live.append("a", T + 1, 1.0) is False        # late point
+    assert live.append("a", T + 5, 25.0) is False       # same row from ingest and the tailer
+    assert live.last_by_probe() == {"a": (T + 5, 25.0)}
+
+
+def test_window_and_since():
+    live = LiveBuffer(capacity=100, window_sec=10)
+    live.extend(("a", T + i, 20.0) for i in range(30))
+    assert live.window()["a"][0][0] == T + 19            # last 10 s only
+    assert live.window(since=T + 25)["a"][0] == [T + 25, T + 26, T + 27, T + 28, T + 29]
+    assert live.window("missing") == {}
+
+
+def test_probe_cap_evicts_the_least_recently_updated():
+    live = LiveBuffer(capacity=10, max_probes=2)
+    live.append("a", T, 1.0); live.append("b", T, 2.0); live.append("a", T + 1, 1.5)
+    live.append("c", T + 2, 3.0)
+    assert sorted(live.probes()) == ["a", "c"]
+    assert live.latest() == ("c", T + 2, 3.0)
+
+
+def test_subscribers_and_generation():
+    live, seen = LiveBuffer(), []
+    live.subscribe(lambda pid, t, v: seen.append((pid, t, v)))
+    live.add_rows([(T, 20.1234, 68.0, "a"), (T, 20.1234, 68.0, "a")])
+    assert seen == [("a", T, 20.123)] and live.generation == 1
+
+
+def test_graph_builds_from_the_live_window():
+    live = LiveBuffer()
+    live.extend([("b", T, 21.0), ("a", T, 20.0), ("a", T + 1, 20.5)])
+    df = _live_frame(live.window())
+    assert list(df["probe_id"]) == ["a", "a", "b"]
+    fig = _build_figure(df, max_points=100)
+    assert [t.name for t in fig.data] == ["a", "b"]
+    assert len(_badge_row(df).children) == 2
@@ -0,0 +1,30 @@
+import json
+import time
+
+from core.partitions import PartitionedCsvStorage
+
+
+def _manifest(log_dir):
+    return json.loads((log_dir / "manifest.json").read_text())["partitions"]
+
+
+def test_manifest_is_saved_on_new_file_and_close_only(tmp_path):
+    store = PartitionedCsvStorage(tmp_path, manifest_save_sec=3600)
+    now = time.time()
+    store.append_many([(now - 5, 20.0, 68.0, "a")])
+    assert _manifest(tmp_path)[0]["rows"] == 1
+    store.append_many([(now, 21.0, 69.8, "b")])
+    assert _manifest(tmp_path)[0]["rows"] == 1  # not rewritten on every flush
+    store.close()
+    assert _manifest(tmp_path)[0]["rows"] == 2
+
+
+def test_unsaved_appends_are_caught_up_on_open(tmp_path):
+    store = PartitionedCsvStorage(tmp_path, manifest_save_sec=3600)
+    now = time.time()
+    store.append_many([(now - 5, 20.0, 68.0, "a")])
+    store.append_many([(now, 21.0, 69.8, "b")])  # no close(): as after a crash
+    entry = PartitionedCsvStorage(tmp_path).partitions()[0]
+    assert entry["rows"] == 2 and entry["probes"] == ["a", "b"]
+    assert entry["end"] >= now - 0.01
+    assert len(list(PartitionedCsvStorage(tmp_path).iter_rows(t0=now - 1))) == 1
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import auto_provisioner
+from auto_provisioner import AutoProvisioner
+from core.ratelimit import IngestLimiter
+
+
+class _Discovery:
+    def __init__(self):
+        self.probes = {"tp-1": SimpleNamespace(name="tp-1", ip="10.0.0.5", port=80, properties={"id": "aa"})}
+
+    def list_probes(self):
+        return dict(self.probes)
+
+
+def _provisioner(monkeypatch, cfg, limiter=None):
+    posts = []
+    monkeypatch.setattr(auto_provisioner, "provision_probe",
+                        lambda host, port, base, token="", interval_ms=0, verbose=True: posts.append(interval_ms) or True)
+    prov = AutoProvisioner(_Discovery(), lambda: "http://hub:8080", period_sec=0, limiter=limiter, cfg=cfg)
+    return prov, posts
+
+
+def test_pushes_only_when_settings_change(monkeypatch):
+    cfg = {"auto_provision": True, "interval_sec": 5}
+    prov, posts = _provisioner(monkeypatch, cfg)
+    for _ in range(3):
+        prov.cycle()
+    assert posts == [5000]
+    cfg["interval_sec"] = 30  # read on the next cycle, no restart
+    prov.cycle(); prov.cycle()
+    assert posts == [5000, 30000]
+    cfg["auto_provision"] = False
+    cfg["interval_sec"] = 60
+    prov.cycle()
+    assert posts == [5000, 30000]
+
+
+def test_throttled_probe_backs_off(monkeypatch):
+    limiter = IngestLimiter(rate_per_sec=2.0, burst=1)
+    prov, posts = _provisioner(monkeypatch, {"interval_sec": 5}, limiter)
+    prov.cycle()
+    limiter.admit("aa"); limiter.admit("aa")  # second one is throttled
+    prov.period_sec = 1
+    prov._sent_at["tp-1"] -= 1
+    prov.cycle()
+    assert posts == [5000, 10000]
+    prov.cycle()  # not throttled again: nothing to send
+    assert posts == [5000, 10000]
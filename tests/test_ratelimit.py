@@ -0,0 +1,46 @@
+from api.service import ApiService
+from core.ratelimit import LIMITER, IngestLimiter
+from core.storage import Storage
+from core.writer import IngestWriter
+
+
+def test_token_bucket_per_key():
+    lim = IngestLimiter(rate_per_sec=2.0, burst=3)
+    assert [lim.admit("a", now=100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert lim.admit("a", now=100.0) == 0.5          # next token in half a second
+    assert lim.admit("b", now=100.0) == 0.0          # other probes are not affected
+    assert lim.admit("a", now=100.5) == 0.0          # refilled
+    assert lim.stats()["throttled_by_key"] == {"a": 1}
+    assert lim.min_interval_ms() == 500
+
+
+def test_disabled_and_bounded():
+    assert IngestLimiter(rate_per_sec=0).admit("a") == 0.0
+    lim = IngestLimiter(max_keys=2)
+    for key in ("a", "b", "c"):
+        lim.admit(key, now=1.0)
+    assert len(lim._buckets) == 2 and "a" not in lim._buckets
+
+
+class _NullStorage(Storage):
+    def append_many(self, rows):
+        pass
+
+
+def test_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(LIMITER, "rate", 1.0)
+    monkeypatch.setattr(LIMITER, "burst", 1.0)
+    monkeypatch.setattr(LIMITER, "_buckets", type(LIMITER._buckets)())
+    svc = ApiService({}, "unused.csv", storage=_NullStorage())
+    assert svc.ingest_one({"temperature_c": 20.0}, "rl-1")[0] == 200
+    status, body, headers = svc.ingest_one({"temperature_c": 20.0}, "rl-1")
+    assert status == 429 and headers["Retry-After"] == "1" and body["retry_after"] > 0
+
+
+def test_429_when_the_write_queue_is_nearly_full(monkeypatch):
+    monkeypatch.setattr(LIMITER, "rate", 0.0)
+    writer = IngestWriter(_NullStorage(), queue_max=10)
+    svc = ApiService({"ingest_queue_high_water": 0.5}, "unused.csv", writer=writer)
+    writer.submit_many([(1792195200000 + i, 20.0, 68.0, "x") for i in range(5)])
+    status, _body, headers = svc.ingest_one({"temperature_c": 20.0}, "rl-2")
+    assert status == 429 and int(headers["Retry-After"]) >= 1
@@ -0,0 +1,80 @@
+from flask import Flask
+
+from api.routes import create_api
+from core.partitions import PartitionedCsvStorage
+from core.sqlite_store import SqliteStorage
+from core.storage import CsvStorage
+
+
+def _client(storage, csv_path):
+    app = Flask(__name__)
+    app.register_blueprint(create_api({}, str(csv_path), None, lambda: "", storage=storage))
+    return app.test_client()
+
+
+def _pull(client, limit, **args):
+    seen, cursor = [], None
+    for _ in range(100):
+        q = dict(args, limit=limit, **({"cursor": cursor} if cursor else {}))
+        body = client.get("/api/readings", query_string=q).get_json()
+        seen.extend(zip(body["t"], body["c"]))
+        cursor = body["next_cursor"]
+        if not cursor:
+            return seen
+    raise AssertionError("pagination did not terminate")
+
+
+OUT_OF_ORDER = [(1792198021955, 21.0, 69.8, "a"), (1700000000000, 22.0, 71.6, "a"),
+                (1767225600000, 23.0, 73.4, "b")]
+
+
+def test_csv_pages_out_of_order_rows_once(tmp_path):
+    storage = CsvStorage(tmp_path / "log.csv")
+    storage.append_many(OUT_OF_ORDER)
+    client = _client(storage, tmp_path / "log.csv")
+    for limit in (1, 2, 3, 5):
+        assert sorted(c for _t, c in _pull(client, limit)) == [21.0, 22.0, 23.0]
+    assert [c for _t, c in _pull(client, 1, probe_id="a")] == [21.0, 22.0]
+
+
+def test_csv_cursor_survives_appends(tmp_path):
+    storage = CsvStorage(tmp_path / "log.csv")
+    storage.append_many(OUT_OF_ORDER[:2])
+    client = _client(storage, tmp_path / "log.csv")
+    body = client.get("/api/readings", query_string={"limit": 1}).get_json()
+    storage.append_many(OUT_OF_ORDER[2:])
+    rest = _pull(client, 1, cursor=body["next_cursor"])
+    assert body["c"] + [c for _t, c in rest] == [21.0, 22.0, 23.0]
+
+
+def test_partitioned_pages_out_of_order_rows_once(tmp_path):
+    storage = PartitionedCsvStorage(tmp_path / "logs")
+    storage.append_many(OUT_OF_ORDER)
+    storage.append_many([(1792198022955, 24.0, 75.2, "a")])
+    client = _client(storage, tmp_path / "log.csv")
+    got = _pull(client, 2)
+    assert sorted(c for _t, c in got) == [21.0, 22.0, 23.0, 24.0]
+    assert sorted(c for _t, c in _pull(client, 1, **{"from": 1767225600})) == [21.0, 23.0, 24.0]
+
+
+def test_time_cursor_rejected_for_file_order(tmp_path):
+    storage = CsvStorage(tmp_path / "log.csv")
+    storage.append_many(OUT_OF_ORDER)
+    client = _client(storage, tmp_path / "log.csv")
+    from api.routes import _encode_cursor
+    assert client.get("/api/readings", query_string={"cursor": _encode_cursor(1.0, 0)}).status_code == 400
+
+
+def test_bad_width_is_a_400(tmp_path):
+    client = _client(CsvStorage(tmp_path / "log.csv"), tmp_path / "log.csv")
+    resp = client.get("/api/readings", query_string={"resolution": "auto", "width": "abc"})
+    assert resp.status_code == 400 and resp.get_json()["ok"] is False
+
+
+def test_sqlite_pages_equal_timestamps_once(tmp_path):
+    storage = SqliteStorage(tmp_path / "log.db")
+    storage.append_many([(1792198021955, 20.0 + i, 0.0, "p%d" % (i % 3)) for i in range(7)])
+    storage.append_many([(1792198022955, 30.0, 0.0, "a")])
+    client = _client(storage, tmp_path / "log.csv")
+    for limit in (1, 2, 3):
+        assert [c for _t, c in _pull(client, limit)] == [20.0 + i for i in range(7)] + [30.0]
@@ -0,0 +1,37 @@
+from core import recstore
+from core.recstore import RecordStorage
+
+T = 1792195200000
+
+
+def _rows(*pairs):
+    return [(T + dt, c, 0.0, pid) for pid, dt, c in pairs]
+
+
+def test_late_rows_are_merged_in_time_order(tmp_path):
+    store = RecordStorage(tmp_path)
+    store.append_many(_rows(("a", 0, 1.0), ("a", 2000, 3.0), ("b", 500, 9.0)))
+    store.append_many(_rows(("a", 1000, 2.0)))
+    assert [r[1] for r in store.iter_rows("a")] == [1.0, 2.0, 3.0]
+    assert [r[3] for r in store.iter_rows()] == ["a", "b", "a", "a"]  # merged across probes by time
+    assert not any(tmp_path.glob("*.late"))
+
+
+def test_late_rows_wait_in_side_file_while_replace_fails(tmp_path, monkeypatch):
+    store = RecordStorage(tmp_path)
+    store.append_many(_rows(("a", 0, 1.0), ("a", 2000, 3.0)))
+    view, _ = store.series("a")
+
+    def locked(src, dst):  # what Windows does while a mapped view is open
+        raise PermissionError(src)
+    monkeypatch.setattr(recstore.os, "replace", locked)
+    store.append_many(_rows(("a", 1000, 2.0)))  # must not raise (the writer would retry forever)
+    store.append_many(_rows(("a", 3000, 4.0)))
+    assert view.tolist() == [T, T + 2000]
+    assert store.series("a")[1].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert (tmp_path / "p_a.late").exists() and not any(tmp_path.glob("*.tmp"))
+
+    monkeypatch.undo()
+    store.close()
+    assert not (tmp_path / "p_a.late").exists()
+    assert RecordStorage(tmp_path).series("a")[1].tolist() == [1.0, 2.0, 3.0, 4.0]
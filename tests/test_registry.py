@@ -0,0 +1,38 @@
+from probe_discovery import ProbeInfo, ProbeRegistry
+
+
+def _probe(name, host, ip, pid=None):
+    return ProbeInfo(name, host, ip, 80, {"id": pid} if pid else {}, last_seen=0.0)
+
+
+def test_find_by_id_name_host_and_ip():
+    reg = ProbeRegistry()
+    a = _probe("TempSensor-9A3F", "temps-probe-9a3f.local.", "10.0.0.5", pid="9a3f")
+    b = _probe("TempSensor-1111", "temps-probe-1111.local.", "10.0.0.6")
+    reg.put(a.host, a); reg.put(b.host, b)
+    assert reg.find(probe_id="9a3f") is a
+    assert reg.find(probe_id="TempSensor-9A3F") is a
+    assert reg.find(host="TEMPS-PROBE-1111.local") is b
+    assert reg.find(probe_id="unknown", ip="10.0.0.6") is b
+    assert reg.find(probe_id="unknown") is None
+
+
+def test_txt_id_wins_over_a_colliding_name():
+    reg = ProbeRegistry()
+    named = _probe("kitchen", "a.local.", "10.0.0.1")
+    tagged = _probe("other", "b.local.", "10.0.0.2", pid="kitchen")
+    reg.put(named.host, named); reg.put(tagged.host, tagged)
+    assert reg.find(probe_id="kitchen") is tagged
+
+
+def test_touch_and_remove():
+    reg = ProbeRegistry()
+    p = _probe("p", "p.local.", "10.0.0.9")
+    reg.put(p.host, p)
+    snap = reg.snapshot()
+    assert reg.touch("p", ts=123.0) and p.last_seen == 123.0
+    assert reg.touch("", ts=456.0, ip="10.0.0.9") and p.last_seen == 456.0
+    assert not reg.touch("nobody")
+    reg.remove([p.host])
+    assert reg.find(probe_id="p") is None
+    assert snap.by_id["p"] is p  # readers keep an immutable snapshot
@@ -0,0 +1,25 @@
+from core.rollups import RollupEngine
+from core.storage import append_csv_rows
+from core.tailer import CsvTailer
+
+
+def test_tailer_feeds_rows_from_other_writers(tmp_path):
+    log = tmp_path / "log.csv"
+    append_csv_rows(log, [(1_790_000_000_000, 20.0, 68.0, "a")], schema="compact")
+    rollups = RollupEngine()
+    tailer = CsvTailer(log)
+    tailer.subscribe(rollups.add_rows)
+    tailer.poll()
+    append_csv_rows(log, [(1_790_000_010_000, 22.0, 71.6, "a")], schema="compact")  # e.g. PullLogger
+    tailer.poll()
+    s = rollups.series("a", 60)
+    assert s["count"] == [2] and s["max"] == [22.0]
+
+
+def test_startup_backfill_skips_rows_already_in_buckets():
+    rollups = RollupEngine()
+    old = [(1_790_000_000_000, 20.0, 68.0, "a"), (1_790_000_030_000, 21.0, 69.8, "a")]
+    rollups.add_rows(old)
+    rollups.add_new_rows(old + [(1_790_000_090_000, 23.0, 73.4, "a"), (1_790_000_000_000, 19.0, 66.2, "b")])
+    assert rollups.series("a", 60)["count"] == [2, 1]
+    assert rollups.series("b", 60)["count"] == [1]
@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+import pytest
+
+from core.segments import decode_segment, encode_segment, iter_segments, read_headers, write_segments
+
+
+@pytest.mark.parametrize("ts, cs", [
+    ([1792195200000], [20.5]),                                        # n=1
+    ([1792195200000, 1792195201000], [20.5, 20.25]),                  # n=2
+    ([1792195200000, 1792195201003, 1792195201998], [20.5, 19.0, 21.125]),
+    ([5000, 4000, 1000, 0], [-10.0, -20.5, -5.25, -40.0]),            # negative deltas
+    ([0, 3_000_000_000, 3_000_001_000], [1.0, 2.0, 3.0]),             # ~35 days offline
+])
+def test_round_trip(ts, cs):
+    buf = encode_segment("p1", ts, cs)
+    pid, t, c = decode_segment(buf)
+    assert pid == "p1" and t.tolist() == ts and c.tolist() == cs
+    (h,) = read_headers(buf)
+    assert (h.n, h.t_first, h.t_last, h.v_min, h.v_max) == (len(ts), ts[0], ts[-1], min(cs), max(cs))
+
+
+def test_corrupt_payload_is_rejected():
+    buf = bytearray(encode_segment("p1", [0, 1000, 2010, 3000], [1.0, 1.5, 1.25, 2.0]))
+    buf[-1] ^= 0xFF
+    with pytest.raises(ValueError):
+        decode_segment(bytes(buf))
+
+
+def test_file_filters_by_probe_and_range(tmp_path):
+    rows = [(1792195200000 + i * 1000, 20 + i / 1000, 0.0, f"p{i % 2}") for i in range(100)]
+    f = io.BytesIO()
+    assert write_segments(f, rows, points=16) == 8
+    path = tmp_path / "x.seg"
+    path.write_bytes(f.getvalue())
+    got = list(iter_segments(path, "p1", t0=1792195210, t1=1792195220))
+    t = np.concatenate([seg[1] for seg in got])
+    assert all(seg[0] == "p1" for seg in got)
+    assert t.tolist() == list(range(1792195211000, 1792195220000, 2000))
@@ -0,0 +1,24 @@
+from core.snapcache import SnapshotCache
+
+
+def test_version_moves_at_most_once_per_tick():
+    cache = SnapshotCache(tick_sec=3600)
+    v = cache.version(1)
+    assert [cache.version(g) for g in (2, 3, 4)] == [v, v, v]  # busy hub: still shared
+
+
+def test_pushed_frame_forces_newer_data():
+    cache = SnapshotCache(tick_sec=3600)
+    v = cache.version(10)
+    assert cache.version(12, need=10) == v       # the version already covers gen 10
+    v2 = cache.version(15, need=12)
+    assert v2 == v + 1
+    assert cache.version(16, need=14) == v2      # built from gen 15 >= 14
+
+
+def test_builds_once_per_key():
+    cache = SnapshotCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get(("k", 1), lambda: calls.append(1) or "fig") == "fig"
+    assert len(calls) == 1 and cache.stats()["hits"] == 2
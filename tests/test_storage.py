@@ -0,0 +1,17 @@
+from core.storage import CsvStorage
+
+ROWS = [(1792198021955, 21.0, 69.8, "a"), (1700000000000, 22.0, 71.6, "a"),
+        (1767225600000, 23.0, 73.4, "b"), (1767225601000, 24.0, 75.2, "c")]
+
+
+def test_csv_series_many_scans_once(tmp_path):
+    storage = CsvStorage(tmp_path / "log.csv")
+    storage.append_many(ROWS)
+    scans = []
+    iter_rows = storage.iter_rows
+    storage.iter_rows = lambda *a: scans.append(a) or iter_rows(*a)
+    got = storage.series_many(["a", "b", "x"], t0=1600000000)
+    assert len(scans) == 1
+    assert got["a"][0].tolist() == [1700000000000, 1792198021955]  # time order
+    assert got["a"][1].tolist() == [22.0, 21.0]
+    assert got["b"][1].tolist() == [23.0] and len(got["x"][0]) == 0
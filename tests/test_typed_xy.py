@@ -0,0 +1,37 @@
+import json
+import time
+
+import numpy as np
+import plotly.graph_objs as go
+import pytest
+
+from components.temp_graph import local_ms, typed_xy, utc_offsets
+
+
+@pytest.fixture
+def berlin(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset is POSIX only")
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_each_point_gets_its_own_utc_offset(berlin):
+    winter, summer = 1767225600.0, 1782864000.0   # 2026-01-01, 2026-07-01 (UTC)
+    dst_start = 1774746000.0                       # 2026-03-29 01:00 UTC
+    ts = [winter, summer, dst_start - 1, dst_start]
+    assert utc_offsets(ts).tolist() == [3600.0, 7200.0, 3600.0, 7200.0]
+    assert utc_offsets([]).tolist() == []
+
+
+def test_traces_serialize_as_typed_arrays(berlin):
+    x, y = typed_xy([1767225600.0, 1767225601.5], [20.125, 21.0])
+    assert x.dtype == np.float64 and y.dtype == np.float32
+    assert x.tolist() == [1767229200000.0, 1767229201500.0]   # local wall clock, ms
+    assert local_ms([1767225600.0]) == [1767229200000.0]
+    trace = json.loads(go.Figure(go.Scatter(x=x, y=y)).to_json())["data"][0]
+    assert trace["x"]["dtype"] == "f8" and "bdata" in trace["x"]
+    assert trace["y"]["dtype"] == "f4" and "bdata" in trace["y"]
@@ -0,0 +1,66 @@
+import time
+
+from core.storage import Storage
+from core.writer import IngestWriter
+
+T = 1792195200000
+
+
+class _ListStorage(Storage):
+    def __init__(self, fail=0):
+        self.batches, self.fail = [], fail
+
+    def append_many(self, rows):
+        if self.fail:
+            self.fail -= 1
+            raise OSError("locked")
+        self.batches.append(list(rows))
+
+
+def _rows(n, start=0):
+    return [(T + i, 20.0 + i, 68.0, "p") for i in range(start, start + n)]
+
+
+def test_rows_queued_together_are_one_write():
+    store = _ListStorage()
+    writer = IngestWriter(store)
+    seen = []
+    writer.subscribe(seen.append)
+    assert writer.submit_many(_rows(3)) == 3
+    assert writer.submit(T + 3, 23.0, 68.0, "p")
+    assert store.batches == [] and writer.depth() == 4  # nothing written until a flush
+    assert writer.flush() == 4
+    assert store.batches == [_rows(4)] and seen == store.batches
+    assert writer.flush() == 0
+
+
+def test_full_queue_rejects_instead_of_blocking():
+    writer = IngestWriter(_ListStorage(), queue_max=5)
+    assert writer.submit_many(_rows(8)) == 5
+    assert writer.rejected == 3
+
+
+def test_failed_flush_is_retried_first():
+    store = _ListStorage(fail=1)
+    writer = IngestWriter(store)
+    writer.submit_many(_rows(2))
+    assert writer.flush() == 0 and writer.write_errors == 1 and writer.depth() == 2
+    writer.submit_many(_rows(1, start=2))
+    assert writer.flush() == 3
+    assert store.batches == [_rows(3)]
+
+
+def test_flusher_thread_and_stop_drain_the_queue():
+    store = _ListStorage()
+    writer = IngestWriter(store, flush_interval_sec=10, flush_rows=3)
+    writer.start()
+    try:
+        writer.submit_many(_rows(3))  # a full batch wakes the flusher early
+        deadline = time.time() + 5
+        while not store.batches and time.time() < deadline:
+            time.sleep(0.01)
+        assert store.batches == [_rows(3)]
+        writer.submit_many(_rows(1, start=3))
+    finally:
+        writer.stop()
+    assert sum(len(b) for b in store.batches) == 4